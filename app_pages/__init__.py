@@ -0,0 +1,25 @@
+# App pages, one module each, imported the first time a session opens them
+import importlib
+from collections import namedtuple
+
+# `topics` are the change-feed topics a page shows, so a session only reruns for changes it would display
+Page = namedtuple('Page', ['module', 'topics'])
+
+PAGES = {
+    "Timetable & Rostering": Page('timetable', {'timetable', 'workers', 'shop_jobs'}),
+    "Worker Management": Page('workers', {'workers'}),
+    "Order Management": Page('orders', {'orders'}),
+    "New Order": Page('new_order', set()),
+    "Standing Orders": Page('standing', {'standing'}),
+    "Production Plan": Page('production', {'orders'}),
+    "KPI Dashboard": Page('kpi', {'orders'}),
+    "Products & Pricing": Page('products', {'products'}),
+    "Stock & Ordering": Page('stock', {'orders', 'stock', 'products'}),
+    "Shop Jobs": Page('shop_jobs', {'shop_jobs'}),
+    "Import / Export": Page('import_export', set()),
+}
+
+
+def load_page(title):
+    # Python keeps the module after the first import, so a page's imports and definitions cost once per process
+    return importlib.import_module(f"{__name__}.{PAGES[title].module}")
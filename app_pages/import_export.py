@@ -0,0 +1,58 @@
+# Bulk Import / Export Page
+import streamlit as st
+
+from app_pages.resources import get_pricing_engine
+from larder import bulk_io
+
+
+def render(store, profile):
+    st.header("📁 Bulk Import & Export")
+
+    importers = {
+        "Order lines": (bulk_io.import_order_lines, bulk_io.ORDER_LINE_FIELDS),
+        "Workers": (bulk_io.import_workers, bulk_io.WORKER_FIELDS),
+        "Timetable shifts": (bulk_io.import_shifts, bulk_io.SHIFT_FIELDS),
+    }
+    exporters = {
+        "Order lines": (bulk_io.export_order_lines, "orders.csv"),
+        "Workers": (bulk_io.export_workers, "workers.csv"),
+        "Timetable shifts": (bulk_io.export_shifts, "timetable.csv"),
+    }
+
+    tab1, tab2 = st.tabs(["Import", "Export"])
+
+    with tab1:
+        import_kind = st.selectbox("What are you importing?", list(importers))
+        importer, columns = importers[import_kind]
+        st.caption("Expected columns: " + ", ".join(columns) +
+                   (". Lines of the same order must be next to each other; use order_ref to group lines without an order_id." if import_kind == "Order lines" else ""))
+        uploaded = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"])
+
+        if uploaded is not None and st.button("Import"):
+            progress_bar = st.progress(0.0, text="Importing...")
+            file_size = max(uploaded.size, 1)
+
+            def report_progress(rows_read, imported):
+                done = min(uploaded.tell() / file_size, 1.0) if not uploaded.closed else 1.0
+                progress_bar.progress(done, text=f"Read {rows_read} rows, imported {imported}")
+
+            try:
+                import_options = {'pricing': get_pricing_engine()} if import_kind == "Order lines" else {}
+                result = importer(store, bulk_io.iter_rows(uploaded, uploaded.name), progress=report_progress,
+                                  **import_options)
+            except RuntimeError as exc:
+                st.error(str(exc))
+            else:
+                progress_bar.progress(1.0, text="Done")
+                st.success(f"Imported {result.imported} records from {result.rows_read} rows.")
+                if result.error_count:
+                    st.warning(f"{result.error_count} rows were skipped.")
+                    st.dataframe([{'Line': line, 'Problem': problem} for line, problem in result.errors],
+                                 hide_index=True)
+
+    with tab2:
+        export_kind = st.selectbox("What are you exporting?", list(exporters))
+        exporter, file_name = exporters[export_kind]
+        if st.button("Prepare Export"):
+            with bulk_io.export_to_file(exporter, store) as export_file:
+                st.download_button(f"Download {file_name}", export_file, file_name=file_name, mime="text/csv")
@@ -0,0 +1,54 @@
+# KPI Dashboard Page
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app_pages.resources import get_order_metrics, get_store
+from larder.metrics import order_history, weekly_trends
+from larder.orders import OPEN_STATUSES, ORDER_PRIORITIES, ORDER_STATUSES
+
+
+@st.cache_data(max_entries=2)
+def order_trends(orders_seq):
+    # Resampled once per change to the orders, not per session or rerun
+    return weekly_trends(order_history(get_store()))
+
+
+def render(store, profile):
+    st.header("📊 KPI Dashboard")
+    metrics = get_order_metrics()
+    open_orders = sum(metrics.count(status=status) for status in OPEN_STATUSES)
+    high_open = sum(metrics.count(status=status, priority='High') for status in OPEN_STATUSES)
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Open Orders", open_orders)
+    col2.metric("Pending", metrics.count(status='Pending'))
+    col3.metric("High Priority Open", high_open)
+    col4.metric("Open Order Value", f"£{metrics.takings(OPEN_STATUSES):,.2f}")
+    col5.metric("Completed Takings", f"£{metrics.takings(['Completed']):,.2f}")
+
+    st.subheader("Orders by Status and Priority")
+    st.dataframe(pd.DataFrame([[metrics.count(status=status, priority=priority) for priority in ORDER_PRIORITIES]
+                               for status in ORDER_STATUSES], index=ORDER_STATUSES, columns=ORDER_PRIORITIES))
+
+    st.subheader("Open Orders Due, Next 14 Days")
+    due_counts = metrics.due_counts(datetime.now().date(), 14)
+    st.bar_chart(pd.DataFrame({'Orders due': list(due_counts.values())},
+                              index=[d.strftime('%a %d/%m') for d in due_counts]), sort=False)
+
+    st.subheader("Weekly Trends")
+    trends = order_trends(store.change_seq('orders'))
+    trend_weeks = st.selectbox("Show", ["Last 12 weeks", "Last 26 weeks", "Last 52 weeks", "All history"])
+    if trend_weeks != "All history":
+        trends = trends.tail(int(trend_weeks.split()[1]))
+    if trends.empty:
+        st.info("No order history yet.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("**Revenue per week (£)**")
+            st.line_chart(trends['Revenue (£)'])
+        with col2:
+            st.write("**Orders placed per week**")
+            st.bar_chart(trends['Orders'])
@@ -0,0 +1,87 @@
+# Enhanced New Order Page
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from app_pages.orders import generate_order_id
+from app_pages.resources import get_notifications, get_pricing_engine
+from larder.orders import ORDER_PRIORITIES, ORDER_UNITS, as_order
+from larder.products import DEFAULT_PRICE_PER_KG
+
+
+def render(store, profile):
+    st.header("🆕 Create New Order")
+
+    with st.form("new_order"):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            customer_name = st.text_input("Customer Name*")
+            customer_contact = st.text_input("Contact Number*")
+            customer_email = st.text_input("Email Address")
+            priority = st.selectbox("Priority*", ORDER_PRIORITIES)
+
+        with col2:
+            due_date = st.date_input("Due Date*", datetime.now() + timedelta(days=1))
+            due_time = st.time_input("Due Time", datetime.now().time())
+            notes = st.text_area("Order Notes")
+
+        # Order items
+        st.subheader("Order Items")
+        items = []
+
+        with st.container():
+            st.write("Add items to the order:")
+            num_items = st.number_input("Number of Items", min_value=1, max_value=20, value=1)
+
+            for i in range(num_items):
+                col1, col2, col3, col4 = st.columns([3, 1, 1, 2])
+                with col1:
+                    item_name = st.text_input(f"Item Name {i+1}", key=f"name_{i}")
+                with col2:
+                    quantity = st.number_input(f"Qty {i+1}", min_value=0.1, value=1.0, step=0.1, key=f"qty_{i}")
+                with col3:
+                    unit = st.selectbox(f"Unit {i+1}", ORDER_UNITS, key=f"unit_{i}")
+                with col4:
+                    item_notes = st.text_input(f"Notes {i+1}", key=f"notes_{i}")
+
+                if item_name:
+                    items.append({
+                        'name': item_name,
+                        'quantity': quantity,
+                        'unit': unit,
+                        'notes': item_notes
+                    })
+
+        if st.form_submit_button("Create Order"):
+            if customer_name and customer_contact and items:
+                # Price each item from the product catalogue and the customer's price list
+                total_price, priced_items = get_pricing_engine().price_items(customer_name, items)
+                unpriced = priced_items.loc[~priced_items['priced'], 'name'].tolist()
+
+                new_order = {
+                    'order_id': generate_order_id(store),
+                    'customer_name': customer_name,
+                    'customer_contact': customer_contact,
+                    'customer_email': customer_email,
+                    'items': items,
+                    'total_price': total_price,
+                    'due_date': datetime.combine(due_date, due_time),
+                    'status': 'Pending',
+                    'priority': priority,
+                    'notes': notes,
+                    'created_date': datetime.now()
+                }
+
+                store.orders.add(new_order)
+                get_notifications()[0].order_created(as_order(new_order))
+                st.success(f"✅ Order {new_order['order_id']} created successfully!")
+                if unpriced:
+                    st.warning(f"Not in the product catalogue, charged at £{DEFAULT_PRICE_PER_KG:.2f}/kg: {', '.join(unpriced)}")
+                st.balloons()
+
+                # Show order summary
+                st.subheader("Order Summary")
+                st.json(new_order)
+            else:
+                st.error("Please fill in all required fields (marked with *) and add at least one item.")
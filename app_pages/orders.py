@@ -0,0 +1,240 @@
+# Enhanced Order Management Page
+from datetime import datetime
+
+import streamlit as st
+
+from app_pages.resources import get_notifications, get_standing_orders
+from larder.orders import (DUE_WINDOWS, ORDER_PAGE_SIZES, ORDER_PRIORITIES, ORDER_STATUSES, StaleOrderError,
+                           due_window_bounds, next_week_due)
+from larder.search import SEARCH_LIMIT
+
+
+# Helper function to generate order ID
+def generate_order_id(store):
+    return store.orders.next_ids(1)[0]
+
+
+# Customer message queue: a one-line summary, with failed messages listed when there are any
+def render_outbox():
+    notifications, problem = get_notifications()
+    if problem:
+        st.caption(f"Customer messages are off ({problem}).")
+        return
+    if not notifications.enabled:
+        return
+    counts = notifications.counts()
+    st.caption(f"Customer messages: {counts.get('queued', 0) + counts.get('sending', 0)} waiting, "
+               f"{counts.get('sent', 0)} sent, {counts.get('failed', 0)} failed")
+    if notifications.worker_errors:
+        st.warning(f"The message sender has failed {notifications.worker_errors} times since the app started "
+                   f"(latest: {notifications.last_worker_error}). See the server log.")
+    if counts.get('failed'):
+        with st.expander(f"⚠️ {counts['failed']} customer messages could not be sent"):
+            st.dataframe([{
+                'Order': message.order_id,
+                'Message': message.subject,
+                'To': message.recipient,
+                'Attempts': message.attempts,
+                'Error': message.error,
+            } for message in notifications.messages(status='failed')], hide_index=True)
+            if st.button("Retry failed messages"):
+                notifications.retry_failed()
+                st.rerun()
+
+
+# Helper function to render one order's details and actions
+def render_order_detail(store, order):
+    # Actions apply to the version this session last showed, so a change made
+    # elsewhere in between is reported instead of silently overwritten
+    shown_versions = st.session_state.setdefault('shown_order_versions', {})
+    expected_version = shown_versions.get(order.order_id, order.version)
+    shown_versions[order.order_id] = order.version
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write(f"**Customer:** {order.customer_name}")
+        st.write(f"**Contact:** {order.customer_contact}")
+        st.write(f"**Email:** {order.customer_email}")
+        st.write(f"**Priority:** {order.priority}")
+        st.write(f"**Created:** {order.created_date.strftime('%d/%m/%Y %H:%M')}")
+
+    with col2:
+        st.write(f"**Due Date:** {order.due_date.strftime('%d/%m/%Y')}")
+        st.write(f"**Status:** {order.status}")
+        st.write(f"**Total Price:** £{order.total_price:.2f}")
+        st.write(f"**Notes:** {order.notes or 'None'}")
+
+    # Order items
+    st.write("**Items:**")
+    for item in order.items:
+        st.write(f"- {item.quantity} {item.unit} {item.name} ({item.notes or 'No notes'})")
+
+    # Order actions
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        new_status = st.selectbox("Update Status",
+                                ORDER_STATUSES,
+                                index=ORDER_STATUSES.index(order.status),
+                                key=f"status_{order.order_id}")
+        if st.button("Update Status", key=f"update_{order.order_id}"):
+            try:
+                store.orders.update_status(order.order_id, new_status, expected_version=expected_version)
+            except StaleOrderError:
+                st.warning(f"{order.order_id} was changed in another session. Check the details above and try again.")
+            else:
+                get_notifications()[0].status_changed(order, new_status)
+                st.success(f"Updated {order.order_id} status to {new_status}")
+                st.rerun()
+
+    with col2:
+        if st.button("Mark Complete", key=f"complete_{order.order_id}"):
+            try:
+                store.orders.update_status(order.order_id, 'Completed', expected_version=expected_version)
+            except StaleOrderError:
+                st.warning(f"{order.order_id} was changed in another session. Check the details above and try again.")
+            else:
+                get_notifications()[0].status_changed(order, 'Completed')
+                st.success(f"Marked {order.order_id} as completed")
+                st.rerun()
+
+    with col3:
+        if st.button("Duplicate Order", key=f"duplicate_{order.order_id}"):
+            # Records are read-only, so the copy shares the original's items rather than aliasing a list;
+            # it is due the same weekday and time in the next week that hasn't passed
+            now = datetime.now()
+            new_order = order.duplicate(generate_order_id(store), now, next_week_due(order.due_date, now))
+            store.orders.add(new_order)
+            get_notifications()[0].order_created(new_order)
+            st.success(f"Duplicated order as {new_order.order_id}, due {new_order.due_date.strftime('%d/%m/%Y')}")
+            st.rerun()
+        if st.button("Repeat Weekly", key=f"standing_{order.order_id}"):
+            get_standing_orders().from_order(order)
+            st.success(f"Made a weekly standing order for {order.customer_name}; see Standing Orders")
+
+    with col4:
+        if st.button("Delete Order", key=f"delete_{order.order_id}"):
+            try:
+                store.orders.delete(order.order_id, expected_version=expected_version)
+            except StaleOrderError:
+                st.warning(f"{order.order_id} was changed in another session. Check the details above and try again.")
+            else:
+                st.success(f"Deleted order {order.order_id}")
+                st.rerun()
+
+    # Audit trail from the history log, only read when asked for
+    if st.toggle("Show history", key=f"history_{order.order_id}"):
+        st.dataframe([{
+            'When': entry.at.strftime('%d/%m/%Y %H:%M:%S'),
+            'Change': entry.action,
+            'Details': entry.details,
+        } for entry in store.history.order_log(order.order_id)], hide_index=True)
+        messages = get_notifications()[0].messages(order_id=order.order_id)
+        if messages:
+            st.write("**Customer messages:**")
+            st.dataframe([{
+                'Queued': message.created_at.strftime('%d/%m/%Y %H:%M'),
+                'Message': message.subject,
+                'To': message.recipient,
+                'Status': message.status,
+                'Attempts': message.attempts,
+                'Error': message.error,
+            } for message in messages], hide_index=True)
+
+
+def render(store, profile):
+    st.header("📦 Order Management")
+    render_outbox()
+
+    # Full-text search; the filters below still apply to its results
+    search_text = st.text_input("Search orders", placeholder="Order number, customer, email, item or note")
+
+    # Order filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        status_filter = st.selectbox("Filter by Status", ["All"] + ORDER_STATUSES)
+    with col2:
+        priority_filter = st.selectbox("Filter by Priority", ["All"] + ORDER_PRIORITIES)
+    with col3:
+        days_filter = st.selectbox("Due Within", DUE_WINDOWS)
+
+    # Filter orders with an indexed query (status/priority lookup + due date range)
+    due_from, due_before = due_window_bounds(days_filter, datetime.now().date())
+    order_filters = {
+        'status': None if status_filter == "All" else status_filter,
+        'priority': None if priority_filter == "All" else priority_filter,
+        'due_from': due_from,
+        'due_before': due_before,
+    }
+
+    # Pagination settings
+    col1, col2 = st.columns(2)
+    with col1:
+        view_mode = st.radio("View", ["Detailed", "Compact Table"], horizontal=True)
+    with col2:
+        page_size = st.selectbox("Orders per page", ORDER_PAGE_SIZES, index=1)
+
+    snippets = {}
+    if search_text.strip():
+        # Ranked matches instead of pages; typos and partial words still find orders
+        results = store.orders.search(search_text, **order_filters, with_items=(view_mode == "Detailed"))
+        page_orders = [order for _, order in results]
+        snippets = {order.order_id: hit.snippet for hit, order in results}
+        profile.lap("order filtering")
+        more = "+" if len(results) == SEARCH_LIMIT else ""
+        st.subheader(f"Search Results ({len(results)}{more} found)")
+    else:
+        # Keyset cursors for the pages visited so far; reset whenever the filters change
+        filter_key = (status_filter, priority_filter, days_filter, page_size)
+        if st.session_state.get('order_filter_key') != filter_key:
+            st.session_state.order_filter_key = filter_key
+            st.session_state.order_cursors = [None]
+        cursors = st.session_state.order_cursors
+        page_number = len(cursors)
+
+        page_orders, next_cursor = store.orders.query_page(
+            **order_filters, after=cursors[-1], limit=page_size, with_items=(view_mode == "Detailed"))
+
+        # Display orders
+        total_orders = store.orders.count(**order_filters)
+        profile.lap("order filtering")
+        st.subheader(f"Orders ({total_orders} found)")
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅ Previous", disabled=page_number == 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.write(f"Page {page_number} of {max(1, -(-total_orders // page_size))}")
+        with col3:
+            if st.button("Next ➡", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+
+    if view_mode == "Detailed":
+        for order in page_orders:
+            with st.expander(f"📦 {order.order_id} - {order.customer_name} - Due: {order.due_date.strftime('%d/%m/%Y')}"):
+                if order.order_id in snippets:
+                    st.caption(snippets[order.order_id])
+                render_order_detail(store, order)
+    else:
+        # One dataframe for the whole page; only the selected order's detail is loaded
+        table = [{
+            'Order': o.order_id,
+            'Customer': o.customer_name,
+            'Due': o.due_date.strftime('%d/%m/%Y'),
+            'Status': o.status,
+            'Priority': o.priority,
+            'Total (£)': round(o.total_price, 2),
+            **({'Match': snippets[o.order_id].replace('**', '')} if snippets else {}),
+        } for o in page_orders]
+        selection = st.dataframe(table, hide_index=True,
+                                 on_select="rerun", selection_mode="single-row", key="order_table")
+        selected_rows = selection.selection.rows
+        if selected_rows:
+            order = store.orders.get(page_orders[selected_rows[0]].order_id)
+            if order:
+                st.markdown(f"#### 📦 {order.order_id} - {order.customer_name}")
+                render_order_detail(store, order)
+    profile.lap("order rendering")
@@ -0,0 +1,29 @@
+# Production Plan Page
+from datetime import datetime
+
+import streamlit as st
+
+from app_pages.resources import get_production_plan
+from larder.orders import DUE_WINDOWS, due_window_bounds
+
+
+def render(store, profile):
+    st.header("🥩 Production Plan")
+    st.write("What open (pending and in progress) orders need prepared, by product and due date.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        plan_window = st.selectbox("Due Within", DUE_WINDOWS, key="plan_window")
+    with col2:
+        plan_view = st.radio("Show", ["By Due Date", "Totals"], horizontal=True)
+
+    due_from, due_before = due_window_bounds(plan_window, datetime.now().date())
+    production_plan = get_production_plan()
+    plan_args = (due_from and due_from.date(), due_before and due_before.date())
+    plan = production_plan.plan(*plan_args) if plan_view == "By Due Date" else production_plan.totals(*plan_args)
+
+    if plan.empty:
+        st.info("No open orders to prepare in this window.")
+    else:
+        st.dataframe(plan.rename(columns={'product': 'Product', 'unit': 'Unit', 'due': 'Due', 'quantity': 'Quantity'}),
+                     hide_index=True)
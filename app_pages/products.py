@@ -0,0 +1,74 @@
+# Products & Pricing Page
+import pandas as pd
+import streamlit as st
+
+from app_pages.resources import get_pricing_engine
+from larder.products import PRICE_UNITS
+
+
+def render(store, profile):
+    st.header("🏷️ Products & Pricing")
+    pricing = get_pricing_engine()
+    products = store.products.list_products()
+
+    tab1, tab2, tab3 = st.tabs(["Catalogue", "Customer Prices", "Price Change"])
+
+    with tab1:
+        st.subheader("Product Catalogue")
+        if products:
+            st.dataframe(pd.DataFrame([{
+                'Product': p['display_name'],
+                'Price (£)': p['price'],
+                'Per': p['price_unit'],
+                'Nominal weight (kg)': p['nominal_weight_kg'],
+            } for p in products]), hide_index=True)
+
+        with st.form("product"):
+            st.write("Add or update a product")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                product_name = st.text_input("Product Name")
+            with col2:
+                product_price = st.number_input("Price (£)", min_value=0.0, value=10.0, step=0.05)
+            with col3:
+                price_unit = st.selectbox("Priced per", PRICE_UNITS)
+            with col4:
+                nominal_weight = st.number_input("Nominal weight each/pack (kg)", min_value=0.0, value=0.0, step=0.1)
+            if st.form_submit_button("Save Product") and product_name:
+                store.products.upsert(product_name, product_price, price_unit, nominal_weight or None)
+                st.success(f"Saved {product_name}")
+                st.rerun()
+
+    with tab2:
+        st.subheader("Customer Price Lists")
+        customer_prices = store.products.list_customer_prices()
+        if customer_prices:
+            st.dataframe(pd.DataFrame(customer_prices), hide_index=True)
+        if products:
+            with st.form("customer_price"):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    price_customer = st.text_input("Customer Name")
+                with col2:
+                    price_product = st.selectbox("Product", [p['display_name'] for p in products])
+                with col3:
+                    special_price = st.number_input("Customer Price (£)", min_value=0.0, value=10.0, step=0.05)
+                if st.form_submit_button("Save Customer Price") and price_customer:
+                    store.products.set_customer_price(price_customer, price_product, special_price)
+                    st.success(f"Saved {price_product} price for {price_customer}")
+                    st.rerun()
+
+    with tab3:
+        st.subheader("Apply a Price Change")
+        if products:
+            changed_products = st.multiselect("Products", [p['display_name'] for p in products],
+                                              default=[p['display_name'] for p in products])
+            percent_change = st.number_input("Change (%)", min_value=-90.0, max_value=200.0, value=5.0, step=0.5)
+            if st.button("Apply and Reprice Open Orders") and changed_products:
+                current = {p['display_name']: p['price'] for p in products}
+                store.products.set_prices({name: round(current[name] * (1 + percent_change / 100), 2)
+                                           for name in changed_products})
+                repriced = pricing.reprice_orders()
+                st.success(f"Updated {len(changed_products)} prices and repriced {repriced} open orders.")
+        if st.button("Reprice Open Orders"):
+            st.success(f"Repriced {pricing.reprice_orders()} open orders.")
@@ -0,0 +1,136 @@
+# Process-wide resources shared by every page and session, each built once and cached by Streamlit
+import os
+
+import streamlit as st
+
+from larder.assistant import ShopAssistant
+from larder.chat import ChatAssistant, model_from_env
+from larder.metrics import OrderMetrics
+from larder.profiling import ProfileLog
+from larder.store import LarderStore
+from larder.timetable import TimetableRenderer
+from larder.validation import RosterChecks
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared persistent store (one per server process)
+DB_PATH = os.environ.get('LARDER_DB', os.path.join(APP_DIR, 'larder.db'))
+
+# Rerun timings are appended here as JSON lines (rotated at 2 MB); set LARDER_PROFILE_LOG= to turn off
+PROFILE_LOG_PATH = os.environ.get('LARDER_PROFILE_LOG', os.path.join(APP_DIR, 'larder_profile.jsonl'))
+
+# The default notification transport writes customer messages here instead of sending them
+OUTBOX_PATH = os.environ.get('LARDER_OUTBOX', os.path.join(APP_DIR, 'larder_outbox.jsonl'))
+
+
+@st.cache_resource
+def get_profile_log():
+    return ProfileLog(PROFILE_LOG_PATH or None)
+
+
+@st.cache_resource
+def get_store():
+    # Seed data goes in once, the first time any session in this process asks
+    store = LarderStore(DB_PATH)
+    store.seed_if_empty()
+    return store
+
+
+@st.cache_resource
+def get_timetable_renderer():
+    return TimetableRenderer(get_store())
+
+
+@st.cache_resource
+def get_roster_checks():
+    return RosterChecks(get_store())
+
+
+@st.cache_resource
+def get_pricing_engine():
+    # Pricing works on pandas frames, so it is only imported by the pages that price orders
+    from larder.pricing import PricingEngine
+    return PricingEngine(get_store())
+
+
+@st.cache_resource
+def get_production_plan():
+    from larder.production import ProductionPlan
+    return ProductionPlan(get_store())
+
+
+@st.cache_resource
+def get_stock_ledger():
+    from larder.stock import StockLedger
+    return StockLedger(get_store())
+
+
+@st.cache_resource
+def get_demand_forecast():
+    # Keeps its fit until new orders arrive, shared by every session
+    from larder.forecast import DemandForecast
+    return DemandForecast(get_store())
+
+
+@st.cache_resource
+def get_standing_orders():
+    # Prices the orders it writes, so it shares the pricing engine's catalogue frames
+    from larder.standing import StandingOrders
+    return StandingOrders(get_store(), get_pricing_engine())
+
+
+@st.cache_resource
+def get_order_metrics():
+    return OrderMetrics(get_store())
+
+
+@st.cache_resource
+def get_assistant():
+    # LARDER_ASSISTANT_MODEL (stub or openai) puts a chat model behind the assistant;
+    # returns (assistant, why the chat model couldn't be used)
+    store = get_store()
+    built_in = ShopAssistant(store, get_order_metrics(), get_production_plan, shop_jobs)
+    try:
+        model = model_from_env()
+    except (RuntimeError, ValueError) as e:
+        return built_in, str(e)
+    return (ChatAssistant(store, model, built_in) if model else built_in), None
+
+
+
+@st.cache_resource
+def get_notifications():
+    # One sending thread per server process, started with the app so the morning reminders go out unattended;
+    # returns (queue, why sending is off)
+    from larder.notifications import NotificationQueue, transport_from_env
+    try:
+        transport = transport_from_env(OUTBOX_PATH)
+    except ValueError as e:
+        return NotificationQueue(get_store(), None), str(e)
+    queue = NotificationQueue(get_store(), transport)
+    queue.start()
+    return queue, None
+
+
+# Reference data, read from the store once per change rather than on every rerun
+@st.cache_data(max_entries=2)
+def shop_jobs(shop_jobs_seq):
+    return get_store().get_shop_jobs()
+
+
+@st.cache_data(max_entries=2)
+def job_descriptions(shop_jobs_seq):
+    return get_store().get_job_descriptions()
+
+
+@st.cache_data(max_entries=4)
+def quick_stats(change_seq):
+    # Shared by every session until the feed moves on; order counts come from the maintained metrics
+    store = get_store()
+    metrics = get_order_metrics()
+    return {
+        'workers': len(store.worker_registry()),
+        'pending': metrics.count(status='Pending'),
+        'high_priority': metrics.count(priority='High', exclude_status='Completed'),
+        'shop_jobs': store.count_job_descriptions(),
+    }
@@ -0,0 +1,58 @@
+# Shop Jobs Page
+import streamlit as st
+
+from app_pages.resources import job_descriptions, shop_jobs
+
+
+def render(store, profile):
+    st.header("🏪 Daily Shop Jobs & Tasks")
+
+    jobs_seq = store.change_seq('shop_jobs')
+    day_jobs_by_day = shop_jobs(jobs_seq)
+    descriptions = job_descriptions(jobs_seq)
+    tab1, tab2, tab3 = st.tabs(["View Daily Jobs", "Modify Jobs", "Job Descriptions"])
+
+    with tab1:
+        st.subheader("Daily Job Schedule")
+        selected_day = st.selectbox("Select Day", list(day_jobs_by_day.keys()))
+
+        if selected_day:
+            day_jobs = day_jobs_by_day[selected_day]
+            for time_period, jobs in day_jobs.items():
+                with st.expander(f"{time_period.title()} Jobs"):
+                    for job in jobs:
+                        description = descriptions.get(job, "No description available")
+                        st.write(f"**{job.replace('_', ' ').title()}**: {description}")
+
+    with tab2:
+        st.subheader("Modify Daily Jobs")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            modify_day = st.selectbox("Day to Modify", list(day_jobs_by_day.keys()), key="modify_day")
+            time_period = st.selectbox("Time Period", ["morning", "afternoon", "evening"])
+        with col2:
+            action = st.radio("Action", ["Add Job", "Remove Job"])
+
+            if action == "Add Job":
+                new_job = st.text_input("New Job Name")
+                new_description = st.text_area("Job Description")
+
+                if st.button("Add Job") and new_job:
+                    job_key = new_job.lower().replace(' ', '_')
+                    store.add_shop_job(modify_day, time_period, job_key, new_description)
+                    st.success(f"Added {new_job} to {modify_day} {time_period}")
+
+            else:
+                existing_jobs = day_jobs_by_day[modify_day].get(time_period, [])
+                if existing_jobs:
+                    job_to_remove = st.selectbox("Select Job to Remove", existing_jobs)
+                    if st.button("Remove Job"):
+                        store.remove_shop_job(modify_day, time_period, job_to_remove)
+                        st.success(f"Removed {job_to_remove} from {modify_day} {time_period}")
+
+    with tab3:
+        st.subheader("Job Descriptions")
+        for job, description in descriptions.items():
+            with st.expander(job.replace('_', ' ').title()):
+                st.write(description)
@@ -0,0 +1,134 @@
+# Standing Orders Page
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from app_pages.resources import get_standing_orders
+from larder.orders import ORDER_PRIORITIES, ORDER_UNITS
+from larder.standing import HORIZON_WEEKS, MAX_HORIZON_WEEKS
+from larder.timetable import DAYS
+
+TEMPLATE_ITEM_ROWS = 6
+
+
+def render(store, profile):
+    st.header("🔁 Standing Orders")
+    standing = get_standing_orders()
+    today = datetime.now().date()
+
+    # Fill the order book from the templates; running it again only adds what is missing
+    st.subheader("Generate Orders")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        weeks = st.slider("Weeks ahead", 1, MAX_HORIZON_WEEKS, HORIZON_WEEKS)
+    due, skipped, until = standing.pending(today, weeks)
+    with col2:
+        generate = st.button("Generate", disabled=not due)
+    if generate:
+        result = standing.materialise(today, weeks)
+        st.success(f"Wrote {result.created} orders in {result.elapsed * 1000:.0f} ms")
+        due, skipped, until = standing.pending(today, weeks)
+    st.caption(f"{len(due)} orders to write up to {until.strftime('%d/%m/%Y')}"
+               + (f", {skipped} holiday dates skipped" if skipped else ""))
+
+    templates = standing.templates()
+    if templates:
+        st.subheader("Templates")
+        st.dataframe([{
+            'Customer': template.customer_name,
+            'Days': ', '.join(day[:3] for day in template.days),
+            'Due': template.due_time.strftime('%H:%M'),
+            'Every': f"{template.every_weeks} weeks" if template.every_weeks > 1 else "week",
+            'Items': ', '.join(f"{item.quantity:g} {item.unit} {item.name}" for item in template.items),
+            'From': template.starts_on.strftime('%d/%m/%Y'),
+            'Until': template.ends_on.strftime('%d/%m/%Y') if template.ends_on else '',
+            'Holidays': 'Skip' if template.skip_holidays else 'Deliver',
+            'Active': template.active,
+        } for template in templates], hide_index=True)
+
+        labels = {template.id: f"{template.customer_name} ({', '.join(day[:3] for day in template.days)})"
+                  for template in templates}
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            chosen = st.selectbox("Template", list(labels), format_func=labels.get)
+        template = next(t for t in templates if t.id == chosen)
+        with col2:
+            if st.button("Resume" if not template.active else "Pause"):
+                standing.set_active(template.id, not template.active)
+                st.rerun()
+        with col3:
+            if st.button("Remove"):
+                standing.remove(template.id)
+                st.rerun()
+        last = standing.last_run_day(template.id)
+        st.caption(f"Orders written up to {last.strftime('%d/%m/%Y')}" if last else "No orders written yet")
+
+    # New template
+    st.subheader("New Standing Order")
+    # Set on save, just before the rerun that would otherwise wipe the message
+    saved = st.session_state.pop('standing_saved', None)
+    if saved:
+        st.success(saved)
+    with st.form("new_standing_order"):
+        col1, col2 = st.columns(2)
+        with col1:
+            customer_name = st.text_input("Customer Name*")
+            customer_contact = st.text_input("Contact Number*")
+            customer_email = st.text_input("Email Address")
+            priority = st.selectbox("Priority", ORDER_PRIORITIES, index=1)
+        with col2:
+            days = st.multiselect("Days*", DAYS)
+            due_time = st.time_input("Due Time", datetime.strptime("09:00", "%H:%M").time())
+            every_weeks = st.number_input("Every how many weeks", min_value=1, max_value=8, value=1)
+            skip_holidays = st.checkbox("Skip holidays", value=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            starts_on = st.date_input("Starts", today)
+        with col2:
+            ends_on = st.date_input("Ends (optional)", value=None, min_value=today)
+        notes = st.text_area("Order Notes")
+
+        st.write("Items:")
+        items = []
+        for i in range(TEMPLATE_ITEM_ROWS):
+            col1, col2, col3, col4 = st.columns([3, 1, 1, 2])
+            with col1:
+                item_name = st.text_input(f"Item Name {i+1}", key=f"standing_name_{i}")
+            with col2:
+                quantity = st.number_input(f"Qty {i+1}", min_value=0.1, value=1.0, step=0.1, key=f"standing_qty_{i}")
+            with col3:
+                unit = st.selectbox(f"Unit {i+1}", ORDER_UNITS, key=f"standing_unit_{i}")
+            with col4:
+                item_notes = st.text_input(f"Notes {i+1}", key=f"standing_notes_{i}")
+            if item_name:
+                items.append({'name': item_name, 'quantity': quantity, 'unit': unit, 'notes': item_notes})
+
+        if st.form_submit_button("Save Standing Order"):
+            try:
+                standing.add(customer_name, customer_contact, items, days, due_time, customer_email, priority, notes,
+                             every_weeks, skip_holidays, starts_on, ends_on)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.session_state.standing_saved = (
+                    f"Saved the standing order for {customer_name}; generate orders above to fill the book.")
+                st.rerun()
+
+    # Shop holidays: standing orders set to skip them write nothing on these days
+    st.subheader("Holidays")
+    holidays = standing.holidays(today - timedelta(days=7))
+    if holidays:
+        st.dataframe([{'Date': h.day.strftime('%a %d/%m/%Y'), 'Holiday': h.name} for h in holidays], hide_index=True)
+    col1, col2, col3, col4 = st.columns([2, 3, 1, 1])
+    with col1:
+        holiday = st.date_input("Date", today + timedelta(days=1), key="holiday_day")
+    with col2:
+        holiday_name = st.text_input("Name", key="holiday_name")
+    with col3:
+        if st.button("Add holiday"):
+            standing.add_holiday(holiday, holiday_name)
+            st.rerun()
+    with col4:
+        if st.button("Remove holiday", disabled=holiday not in {h.day for h in holidays}):
+            standing.remove_holiday(holiday)
+            st.rerun()
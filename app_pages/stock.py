@@ -0,0 +1,91 @@
+# Stock & Ordering Page
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app_pages.resources import get_demand_forecast, get_stock_ledger, shop_jobs
+from larder.forecast import next_ordering_date, ordering_day
+from larder.stock import STOCK_KINDS, STOCK_UNITS
+
+
+def render(store, profile):
+    st.header("📋 Stock & Ordering")
+    ledger = get_stock_ledger()
+    forecast = get_demand_forecast()
+    today = datetime.now().date()
+    names = {p['name']: p['display_name'] for p in store.products.list_products()}
+    levels = ledger.levels()
+
+    # Reorder suggestions for the weekly ordering job
+    order_day = ordering_day(shop_jobs(store.change_seq('shop_jobs')))
+    order_date = next_ordering_date(today, order_day)
+    suggestions = forecast.suggestions(today, levels)
+    fit = forecast.fit(today)
+    st.subheader(f"Supplier Order for {order_day} {order_date.strftime('%d/%m/%Y')}")
+    st.caption(f"Covers the week starting {fit.target_week.strftime('%d/%m/%Y')}; "
+               f"fitted on {len(fit.weekly)} weeks of orders in {fit.elapsed * 1000:.0f} ms")
+    if suggestions.empty:
+        st.info("No order history to forecast from yet.")
+    else:
+        to_order = suggestions[suggestions['order'] > 0]
+        st.dataframe(pd.DataFrame({
+            'Product': [names.get(p, p.title()) for p in to_order['product']],
+            'Unit': to_order['unit'],
+            'Order': to_order['order'],
+            'On hand': to_order['on_hand'].round(1),
+            'Counted': to_order['counted'].map({True: 'Yes', False: 'No'}),
+            'Forecast next week': to_order['needed'].round(1),
+            'Booked next week': to_order['booked'].round(1),
+            'Safety stock': to_order['safety'].round(1),
+        }), hide_index=True)
+        if not to_order['counted'].all():
+            st.caption("Products never counted are taken as out of stock; record a stocktake below.")
+
+        # Weekly history behind one product's forecast
+        keys = list(zip(suggestions['product'], suggestions['unit']))
+        shown = st.selectbox("Demand history", keys, format_func=lambda k: f"{names.get(k[0], k[0].title())} ({k[1]})")
+        if shown in fit.weekly.columns:
+            st.line_chart(fit.weekly[shown].rename('Weekly demand'))
+
+    # Stock ledger entries: the inventory check, deliveries and adjustments
+    st.subheader("Record Stock")
+    with st.form("stock_move"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            product = st.selectbox("Product", sorted(names.values()) + ["Other"])
+            other = st.text_input("Other product")
+        with col2:
+            kind = st.selectbox("Entry", STOCK_KINDS, format_func=str.capitalize)
+        with col3:
+            quantity = st.number_input("Quantity", value=0.0, step=0.5)
+        with col4:
+            unit = st.selectbox("Unit", list(STOCK_UNITS))
+        note = st.text_input("Note")
+        if st.form_submit_button("Record"):
+            product = other if product == "Other" else product
+            if not product:
+                st.error("Name the product.")
+            elif kind != 'adjustment' and quantity < 0:
+                st.error("Only adjustments can be negative.")
+            else:
+                ledger.record(product, unit, quantity, kind, note)
+                st.success(f"Recorded {kind} of {quantity:g} {unit} {product}")
+                st.rerun()
+
+    if levels:
+        st.subheader("Stock on Hand")
+        st.dataframe([{
+            'Product': names.get(level.product, level.product.title()),
+            'Unit': level.unit,
+            'On hand': level.on_hand,
+            'Last counted': level.counted_at.strftime('%d/%m/%Y %H:%M') if level.counted_at else 'Never',
+        } for level in sorted(levels.values(), key=lambda level: level.product)], hide_index=True)
+        with st.expander("Recent entries"):
+            st.dataframe([{
+                'When': move.at.strftime('%d/%m/%Y %H:%M'),
+                'Product': names.get(move.product, move.product.title()),
+                'Entry': move.kind.capitalize(),
+                'Quantity': f"{move.quantity:g} {move.unit}",
+                'Note': move.note,
+            } for move in ledger.moves()], hide_index=True)
@@ -0,0 +1,163 @@
+# Enhanced Timetable & Rostering Page with color blocks
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from app_pages.resources import get_roster_checks, get_timetable_renderer, shop_jobs
+from larder.roster import solve_week
+from larder.shifts import minute_to_slot, slot_range_to_interval
+from larder.timetable import DAYS, TIME_SLOTS, week_key_for
+from larder.validation import validate_weeks
+
+
+def render(store, profile):
+    st.header("📅 Timetable & Worker Rostering")
+
+    # Week selection
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_date = st.date_input("Select Week Starting", datetime.now())
+
+    # Calculate week dates
+    start_of_week = selected_date - timedelta(days=selected_date.weekday())
+    days = DAYS
+
+    # Time slots
+    time_slots = TIME_SLOTS
+
+    # Create weekly timetable
+    st.subheader(f"Weekly Timetable: {start_of_week.strftime('%d %b %Y')} - {(start_of_week + timedelta(days=6)).strftime('%d %b %Y')}")
+
+    week_key = week_key_for(start_of_week)
+    registry = store.worker_registry()
+
+    # Display the cached grid; only cells touched since the last render are rebuilt
+    with profile.section("timetable grid"):
+        st.markdown(get_timetable_renderer().render(start_of_week), unsafe_allow_html=True)
+
+    # Worker color legend
+    st.subheader("Worker Color Legend")
+    week_shifts = store.get_week_shifts(week_key)
+    hours_this_week = week_shifts.hours_by_worker()
+    col_legend = st.columns(4)
+    for idx, worker in enumerate(registry.workers):
+        with col_legend[idx % 4]:
+            st.markdown(
+                f'<span style="background-color: {worker.color}; color: white; padding: 5px 10px; border-radius: 5px; display: inline-block; margin: 2px;">{worker.name}</span>',
+                unsafe_allow_html=True
+            )
+            st.caption(f"{hours_this_week.get(worker.id, 0):g}h of {worker.hours_per_week}h this week")
+
+    # Shift assignment interface
+    st.subheader("Assign Shifts")
+    # Set on assignment, just before the rerun that would otherwise wipe the messages
+    assigned = st.session_state.pop('shift_assigned', None)
+    if assigned:
+        merge_note, message = assigned
+        if merge_note:
+            st.info(merge_note)
+        st.success(message)
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        selected_day = st.selectbox("Day", days)
+    with col2:
+        selected_worker_id = st.selectbox("Worker", registry.ids, format_func=registry.label)
+    with col3:
+        start_time = st.selectbox("Start Time", time_slots, index=16)  # Default to 9:00
+    with col4:
+        end_time = st.selectbox("End Time", time_slots, index=22)  # Default to 12:00
+
+    if st.button("Assign Shift"):
+        if selected_worker_id is not None and start_time and end_time:
+            worker = registry.get(selected_worker_id)
+
+            if worker and time_slots.index(end_time) < time_slots.index(start_time):
+                st.error("End time must not be before start time.")
+            elif worker:
+                # Store the shift as one interval; an overlapping shift for the same worker is merged
+                start, end = slot_range_to_interval(start_time, end_time)
+                merge_note = None
+                if week_shifts.overlapping(selected_day, start, end, worker_id=worker.id):
+                    merge_note = f"{worker.name} already has an overlapping shift on {selected_day}; merging them."
+                store.add_shift(week_key, selected_day, worker.id, start, end)
+
+                st.session_state.shift_assigned = (
+                    merge_note, f"Assigned {worker.name} to {selected_day} from {start_time} to {end_time}")
+                st.rerun()
+
+    # Automatic roster generation
+    st.subheader("Auto-generate Week")
+    st.write("Fill this week so every shop job has a skilled worker, respecting availability, days off and weekly hours.")
+    replace_existing = st.checkbox("Replace the shifts already assigned this week")
+    if st.button("Auto-generate week", disabled=not replace_existing and len(week_shifts.hours_by_worker()) > 0):
+        solution = solve_week(registry.workers, shop_jobs(store.change_seq('shop_jobs')), start_of_week)
+        store.replace_week_shifts(week_key, solution.shifts)
+        st.session_state.roster_report = (week_key, solution)
+        st.rerun()
+
+    report = st.session_state.get('roster_report')
+    if report and report[0] == week_key:
+        solution = report[1]
+        st.caption(f"Generated {len(solution.shifts)} shifts in {solution.elapsed * 1000:.0f} ms")
+        if solution.uncovered:
+            st.warning("No qualified worker available for: " + ", ".join(
+                f"{day} {period} {job.replace('_', ' ')}" for day, period, job in solution.uncovered))
+        else:
+            st.success("Every shop job is covered by a qualified worker.")
+
+    # Roster checks, kept up to date shift by shift
+    st.subheader("Roster Checks")
+    validator = get_roster_checks().for_week(start_of_week)
+    violations = validator.violations()
+    gaps = validator.coverage_gaps()
+    if not violations and not gaps:
+        st.success("No availability, hours or coverage problems this week.")
+    for violation in violations:
+        st.warning(violation.message)
+    if gaps:
+        with st.expander(f"{len(gaps)} shop jobs without a qualified worker on shift"):
+            for day, period, job in gaps:
+                st.write(f"- {day} {period}: {job.replace('_', ' ').title()}")
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        weeks_ahead = st.number_input("Weeks to check", min_value=1, max_value=52, value=4)
+    with col2:
+        st.write("")
+        run_batch_check = st.button("Check upcoming weeks")
+    if run_batch_check:
+        week_keys = [week_key_for(start_of_week + timedelta(weeks=i)) for i in range(weeks_ahead)]
+        reports = validate_weeks(store, week_keys)
+        st.dataframe([{
+            'Week': r.week_key,
+            'Violations': len(r.violations),
+            'Uncovered jobs': len(r.gaps),
+            'Rostered hours': sum(r.hours.values()),
+        } for r in reports], hide_index=True)
+
+    # The roster as it stood at an earlier moment, rebuilt from the history log only when asked for
+    st.subheader("Roster History")
+    if st.toggle("Show roster history", key="roster_history"):
+        col1, col2 = st.columns(2)
+        with col1:
+            as_of_date = st.date_input("As of", datetime.now() - timedelta(days=1), key="roster_as_of_date")
+        with col2:
+            as_of_time = st.time_input("Time", datetime.now().time(), key="roster_as_of_time")
+        as_of = datetime.combine(as_of_date, as_of_time)
+        started = store.history.started()
+        if started is None or as_of < started:
+            st.info("History for this database starts " +
+                    (f"on {started.strftime('%d/%m/%Y %H:%M')}." if started else "with the next change."))
+        else:
+            past_names = {w.id: w.name for w in store.history.workers_at(as_of)}
+            past_shifts = list(store.history.roster_at(week_key, as_of))
+            st.caption(f"{len(past_shifts)} shifts this week at {as_of.strftime('%d/%m/%Y %H:%M')}, "
+                       f"{sum(1 for _ in week_shifts)} now")
+            st.dataframe([{
+                'Day': shift.day,
+                'Worker': past_names.get(shift.worker_id) or registry.label(shift.worker_id),
+                'From': minute_to_slot(shift.start),
+                'To': minute_to_slot(shift.end),
+            } for shift in past_shifts], hide_index=True)
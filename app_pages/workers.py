@@ -0,0 +1,61 @@
+# Worker Management Page
+import streamlit as st
+
+from app_pages.resources import job_descriptions
+from larder.timetable import DAYS
+
+
+def render(store, profile):
+    st.header("👥 Worker Management")
+    workers = list(store.worker_registry().workers)
+
+    # Add new worker
+    st.subheader("Add New Worker")
+    with st.form("add_worker"):
+        col1, col2 = st.columns(2)
+        with col1:
+            new_name = st.text_input("Full Name")
+            new_position = st.selectbox("Position", ["Butcher", "Shop Assistant", "Manager", "Cleaner"])
+        with col2:
+            availability = st.multiselect("Availability", DAYS)
+            hours = st.number_input("Hours per Week", min_value=10, max_value=60, value=40)
+
+        # Skills selection
+        all_skills = list(set([skill for worker in workers for skill in worker.skills] +
+                             list(job_descriptions(store.change_seq('shop_jobs')).keys())))
+        selected_skills = st.multiselect("Skills", all_skills)
+
+        # Color selection
+        color_options = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8', '#F7DC6F']
+        selected_color = st.selectbox("Color for Timetable", color_options)
+
+        if st.form_submit_button("Add Worker"):
+            if new_name:
+                new_worker = {
+                    'id': max([w.id for w in workers], default=0) + 1,
+                    'name': new_name,
+                    'position': new_position,
+                    'availability': availability,
+                    'unavailable_dates': [],
+                    'hours_per_week': hours,
+                    'skills': selected_skills,
+                    'color': selected_color
+                }
+                workers.append(store.worker_registry().get(store.add_worker(new_worker)))
+                st.success(f"Added {new_name} to workers!")
+
+    # Display current workers
+    st.subheader("Current Workers")
+    for worker in workers:
+        with st.expander(f"{worker.name} - {worker.position}"):
+            col1, col2, col3 = st.columns([3, 2, 1])
+            with col1:
+                st.write(f"**Availability:** {', '.join(worker.availability)}")
+                st.write(f"**Hours/Week:** {worker.hours_per_week}")
+                st.write(f"**Skills:** {', '.join(worker.skills)}")
+            with col2:
+                st.markdown(f"**Color:** <span style='background-color: {worker.color}; padding: 5px 10px; border-radius: 5px; color: white;'>{worker.color}</span>", unsafe_allow_html=True)
+            with col3:
+                if st.button(f"Remove", key=f"remove_{worker.id}"):
+                    store.remove_worker(worker.id)
+                    st.rerun()
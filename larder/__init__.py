@@ -0,0 +1 @@
+# Shop logic for David's Larder, kept separate from the Streamlit pages
@@ -0,0 +1,343 @@
+# Sidebar assistant: intents matched against an entity index, answered from maintained order metrics
+import re
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+from larder.metrics import OrderMetrics
+from larder.orders import OPEN_STATUSES
+from larder.search import allowed_typos, edit_distance
+from larder.shifts import minute_to_slot
+from larder.timetable import DAYS, week_key_for
+
+Entity = namedtuple('Entity', ['kind', 'value', 'label'])
+
+# Words that pick what the question is about; a matched entity usually decides first
+INTENT_WORDS = {
+    'shifts': {'work', 'works', 'working', 'shift', 'shifts', 'rota', 'rostered', 'hours'},
+    'orders': {'order', 'orders', 'due', 'delivery', 'deliveries', 'collection', 'urgent'},
+    'jobs': {'job', 'jobs', 'task', 'tasks', 'duty', 'duties'},
+    'workers': {'worker', 'workers', 'staff', 'employee', 'employees', 'team'},
+    'timetable': {'timetable', 'roster', 'schedule'},
+    'production': {'much', 'many', 'need', 'prepare', 'make', 'quantity'},
+}
+
+# Words never fuzzy-matched to a name
+STOP_WORDS = {'what', 'does', 'when', 'which', 'who', 'whos', 'the', 'this', 'next', 'week', 'today', 'tomorrow',
+              'for', 'have', 'there', 'any', 'are', 'and', 'with', 'from', 'about', 'show', 'tell', 'list'}
+STOP_WORDS |= {word for words in INTENT_WORDS.values() for word in words}
+
+# Jaccard similarity of trigram sets needed to accept a misspelt name, unless every word of it is within the
+# typos search allows ("Higland Hotl" for Highland Hotel shares too few trigrams but is one slip per word)
+FUZZY_THRESHOLD = 0.5
+MAX_PHRASE_WORDS = 3
+
+
+def normalise(text):
+    return ' '.join(re.findall(r'[a-z0-9]+', (text or '').lower().replace("'s", '')))
+
+
+def close_words(typed, name):
+    # Each typed word within its allowed typos of the name's word in the same place
+    return all(a == b or edit_distance(a, b, allowed_typos(a)) <= allowed_typos(a)
+               for a, b in zip(typed.split(), name.split()))
+
+
+def trigrams(phrase):
+    padded = f"  {phrase} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def period_label(minutes):
+    return f"{minute_to_slot(minutes[0])}-{minute_to_slot(minutes[1])}"
+
+
+def job_label(job):
+    return job.replace('_', ' ').title()
+
+
+class EntityIndex:
+    """Phrase lookup for names in questions, exact first and then by trigrams.
+
+    Phrases are normalised names (workers, first names, customers, products,
+    jobs, weekdays); the trigram postings only cover phrases, so a fuzzy
+    match compares against the handful of names sharing a trigram.
+    """
+
+    def __init__(self):
+        self.phrases = {}
+        self.postings = {}
+
+    def add(self, phrase, entity):
+        phrase = normalise(phrase)
+        if not phrase:
+            return
+        if phrase not in self.phrases:
+            self.phrases[phrase] = set()
+            for gram in trigrams(phrase):
+                self.postings.setdefault(gram, set()).add(phrase)
+        self.phrases[phrase].add(entity)
+
+    def _fuzzy(self, phrase):
+        grams = trigrams(phrase)
+        scores = Counter(p for gram in grams for p in self.postings.get(gram, ()))
+        best, best_score = None, 0.0
+        for candidate, shared in scores.items():
+            if candidate.count(' ') != phrase.count(' '):
+                continue
+            score = shared / len(grams | trigrams(candidate))
+            if score >= best_score and (score >= FUZZY_THRESHOLD or close_words(phrase, candidate)):
+                best, best_score = candidate, score
+        return best
+
+    def find(self, question):
+        # Longest phrases first; each word belongs to at most one match
+        words = normalise(question).split()
+        used = [False] * len(words)
+        found = []
+        for size in range(MAX_PHRASE_WORDS, 0, -1):
+            for start in range(len(words) - size + 1):
+                if any(used[start:start + size]):
+                    continue
+                phrase = ' '.join(words[start:start + size])
+                match = phrase if phrase in self.phrases else None
+                if match is None and len(phrase) >= 4 and not set(words[start:start + size]) & STOP_WORDS:
+                    match = self._fuzzy(phrase)
+                if match is not None:
+                    found.extend(self.phrases[match])
+                    used[start:start + size] = [True] * size
+        return found
+
+
+class ShopAssistant:
+    """Answers sidebar questions about staff, shifts, orders and shop jobs.
+
+    The entity index is rebuilt only when workers, products or shop jobs
+    change in the feed; new customers are added to it as orders arrive.
+    Product questions are answered from the production plan, which
+    `production` returns when first needed so pandas loads only then.
+    `shop_jobs(seq)` gives the shop jobs as of that 'shop_jobs' feed
+    position, so a caller can share a cache keyed on it.
+    """
+
+    def __init__(self, store, metrics=None, production=None, shop_jobs=None):
+        self.store = store
+        self.orders = metrics or OrderMetrics(store)
+        self._production = production
+        self._shop_jobs_source = shop_jobs
+        self._shop_jobs_cached = (None, None)
+        self._index = None
+        self._index_key = None
+        self._indexed_customers = set()
+        self._lock = threading.Lock()
+
+    def _current_shop_jobs(self):
+        seq = self.store.change_seq('shop_jobs')
+        if self._shop_jobs_source:
+            return self._shop_jobs_source(seq)
+        cached_seq, shop_jobs = self._shop_jobs_cached
+        if cached_seq != seq:
+            shop_jobs = self.store.get_shop_jobs()
+            self._shop_jobs_cached = (seq, shop_jobs)
+        return shop_jobs
+
+    def _entity_index(self):
+        key = tuple(self.store.change_seq(topic) for topic in ('workers', 'products', 'shop_jobs'))
+        with self._lock:
+            if self._index_key != key:
+                index = EntityIndex()
+                for worker in self.store.worker_registry().workers:
+                    entity = Entity('worker', worker.id, worker.name)
+                    index.add(worker.name, entity)
+                    for part in worker.name.split():
+                        index.add(part, entity)
+                for product in self.store.products.list_products():
+                    index.add(product['display_name'], Entity('product', product['name'], product['display_name']))
+                for periods in self._current_shop_jobs().values():
+                    for jobs in periods.values():
+                        for job in jobs:
+                            index.add(job.replace('_', ' '), Entity('job', job, job_label(job)))
+                for day in DAYS:
+                    index.add(day, Entity('day', day, day))
+                self._index, self._index_key, self._indexed_customers = index, key, set()
+            for name in set(self.orders.customer_names()) - self._indexed_customers:
+                self._index.add(name, Entity('customer', name, name))
+                self._indexed_customers.add(name)
+            return self._index
+
+    @staticmethod
+    def _window(words, today):
+        # (label, first date, date after) named in the question, if any
+        start_of_week = today - timedelta(days=today.weekday())
+        if 'today' in words:
+            return 'today', today, today + timedelta(days=1)
+        if 'tomorrow' in words:
+            return 'tomorrow', today + timedelta(days=1), today + timedelta(days=2)
+        if 'next week' in ' '.join(words):
+            return 'next week', start_of_week + timedelta(days=7), start_of_week + timedelta(days=14)
+        if 'week' in words:
+            return 'this week', start_of_week, start_of_week + timedelta(days=7)
+        return None
+
+    def ask(self, question, today=None):
+        # Same shape as ChatAssistant.ask(); the built-in answers have no model to fail
+        return self.answer(question, today), None
+
+    def answer(self, question, today=None):
+        today = today or datetime.now().date()
+        words = normalise(question).split()
+        intents = {intent for intent, keys in INTENT_WORDS.items() if keys & set(words)}
+        entities = self._entity_index().find(question)
+        by_kind = {}
+        for entity in entities:
+            by_kind.setdefault(entity.kind, []).append(entity)
+        days = [e.value for e in by_kind.get('day', [])]
+        window = self._window(words, today)
+
+        if 'worker' in by_kind and ('jobs' not in intents or 'shifts' in intents or days):
+            return self._worker_shifts(by_kind['worker'], days, window, today)
+        if 'customer' in by_kind:
+            return self._customer_orders(by_kind['customer'], window, days, today)
+        if 'product' in by_kind and ('production' in intents or 'orders' in intents):
+            return self._product_needed(by_kind['product'], window, days, today)
+        if 'shifts' in intents and (days or 'today' in words or 'tomorrow' in words):
+            if not days:
+                days = [(today + timedelta(days=1 if 'tomorrow' in words else 0)).strftime('%A')]
+            return self._on_shift(days, today)
+        if 'jobs' in intents or ('day' in by_kind and not intents & {'orders', 'workers'}):
+            if not days:
+                days = [(today + timedelta(days=1 if 'tomorrow' in words else 0)).strftime('%A')]
+            return self._shop_jobs(days)
+        if 'workers' in intents:
+            names = [w.name for w in self.store.worker_registry().workers]
+            return f"We have {len(names)} workers: {', '.join(names)}"
+        if 'timetable' in intents:
+            return ("You can view and manage the detailed timetable with specific time slots in the "
+                    "'Timetable & Rostering' section.")
+        if 'orders' in intents:
+            return self._order_summary(window, today)
+        return ("I can help with worker shifts, orders, customers and daily shop jobs. Try 'what does Sarah "
+                "work Thursday', 'Highland Hotel orders this week' or 'today's jobs'.")
+
+    @staticmethod
+    def _day_date(day, today):
+        # The next date (from today) falling on `day`
+        return today + timedelta(days=(DAYS.index(day) - today.weekday()) % 7)
+
+    def _worker_shifts(self, workers, days, window, today):
+        replies = []
+        for worker in {w.value: w for w in workers}.values():
+            if days:
+                dates = [self._day_date(day, today) for day in days]
+            else:
+                label, first, after = window or ('this week', today - timedelta(days=today.weekday()), None)
+                dates = [first + timedelta(days=i) for i in range(((after or first + timedelta(days=7)) - first).days)]
+            lines = []
+            weeks = {}
+            for date in dates:
+                start_of_week = date - timedelta(days=date.weekday())
+                week_key = week_key_for(start_of_week)
+                if week_key not in weeks:
+                    weeks[week_key] = self.store.get_week_shifts(week_key)
+                day = DAYS[date.weekday()]
+                shifts = [s for s in weeks[week_key] if s.worker_id == worker.value and s.day == day]
+                if shifts:
+                    times = ', '.join(period_label((s.start, s.end)) for s in sorted(shifts, key=lambda s: s.start))
+                    lines.append(f"{day} {date.strftime('%d/%m')}: {times}")
+                elif days:
+                    lines.append(f"{day} {date.strftime('%d/%m')}: not rostered")
+            if lines:
+                replies.append(f"{worker.label}'s shifts:\n\n" + '\n'.join(f"- {line}" for line in lines))
+            else:
+                replies.append(f"{worker.label} has no shifts rostered then.")
+        return '\n\n'.join(replies)
+
+    def _on_shift(self, days, today):
+        # Who is rostered on each day, from that week's interval index
+        registry = self.store.worker_registry()
+        replies = []
+        for day in dict.fromkeys(days):
+            date = self._day_date(day, today)
+            week = self.store.get_week_shifts(week_key_for(date - timedelta(days=date.weekday())))
+            shifts = sorted(week.overlapping(day, 0, 24 * 60), key=lambda s: (s.start, s.end))
+            if shifts:
+                replies.append(f"On shift {day} {date.strftime('%d/%m')}:\n\n" + '\n'.join(
+                    f"- {registry.label(s.worker_id)} {period_label((s.start, s.end))}" for s in shifts))
+            else:
+                replies.append(f"Nobody is rostered {day} {date.strftime('%d/%m')}.")
+        return '\n\n'.join(replies)
+
+    def _bounds(self, window, days, today):
+        if days:
+            date = self._day_date(days[0], today)
+            return date.strftime('%A %d/%m'), date, date + timedelta(days=1)
+        return window
+
+    def _customer_orders(self, customers, window, days, today):
+        replies = []
+        bounds = self._bounds(window, days, today)
+        for customer in {c.value: c for c in customers}.values():
+            if bounds:
+                label, first, after = bounds
+                orders = self.store.orders.query(
+                    customer_name=customer.value, due_from=datetime.combine(first, datetime.min.time()),
+                    due_before=datetime.combine(after, datetime.min.time()))
+            else:
+                label = 'still open'
+                orders = self.store.orders.query(customer_name=customer.value, status=OPEN_STATUSES)
+            if not orders:
+                replies.append(f"No orders for {customer.label} {label}.")
+                continue
+            lines = [f"- {o.order_id} due {o.due_date.strftime('%a %d/%m %H:%M')} ({o.status}): "
+                     + ', '.join(f"{i.quantity:g} {i.unit} {i.name}" for i in o.items)
+                     for o in orders]
+            replies.append(f"{customer.label} has {len(orders)} order{'s' if len(orders) != 1 else ''} {label}:\n\n"
+                           + '\n'.join(lines))
+        return '\n\n'.join(replies)
+
+    def _production_plan(self):
+        if self._production is None:
+            from larder.production import ProductionPlan
+            plan = ProductionPlan(self.store)
+            self._production = lambda: plan
+        return self._production()
+
+    def _product_needed(self, products, window, days, today):
+        label, first, after = self._bounds(window, days, today) or ('for open orders', None, None)
+        plan = self._production_plan()
+        replies = []
+        for product in {p.value: p for p in products}.values():
+            needed = plan.needed(product.value, first, after)
+            if needed:
+                amounts = ' and '.join(f"{quantity:g} {unit}" for unit, quantity in sorted(needed.items()))
+                replies.append(f"{product.label}: {amounts} needed {label}.")
+            else:
+                replies.append(f"No {product.label} needed {label}.")
+        return '\n\n'.join(replies)
+
+    def _shop_jobs(self, days):
+        shop_jobs = self._current_shop_jobs()
+        replies = []
+        for day in dict.fromkeys(days):
+            reply = f"{day}'s jobs:\n"
+            for period, jobs in shop_jobs.get(day, {}).items():
+                reply += f"\n{period.title()}: {', '.join(job_label(j) for j in jobs)}"
+            replies.append(reply)
+        return '\n\n'.join(replies)
+
+    def _order_summary(self, window, today):
+        high = self.orders.next_due('High')
+        pending = self.orders.count('Pending')
+        reply = ""
+        if window:
+            label, first, after = window
+            due = sum(self.orders.due_counts(first, (after - first).days).values())
+            reply = f"{due} open order{'s' if due != 1 else ''} due {label}. "
+        if high:
+            return reply + (f"Next urgent: {high.order_id} for {high.customer_name} due "
+                            f"{high.due_date.strftime('%A %d/%m')}. Pending orders: {pending}.")
+        upcoming = self.orders.next_due()
+        if upcoming:
+            return reply + (f"We have {pending} pending orders. Next: {upcoming.order_id} for "
+                            f"{upcoming.customer_name} due {upcoming.due_date.strftime('%A %d/%m')}.")
+        return reply + "No open orders at the moment."
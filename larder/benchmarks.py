@@ -0,0 +1,312 @@
+# Headless benchmarks of the app's hot paths over synthetic data, with JSON results for comparison
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from larder import synthetic
+from larder.assistant import ShopAssistant
+from larder.forecast import DemandForecast
+from larder.metrics import OrderMetrics, order_history, weekly_trends
+from larder.notifications import FileTransport, NotificationQueue
+from larder.orders import ORDER_SEQUENCE, ORDER_SEQUENCE_START
+from larder.pricing import PricingEngine
+from larder.production import ProductionPlan
+from larder.roster import solve_week
+from larder.standing import StandingOrders
+from larder.stock import StockLedger
+from larder.store import LarderStore
+from larder.timetable import DAYS, TimetableRenderer, week_key_for
+from larder.validation import RosterChecks
+
+Scale = namedtuple('Scale', ['workers', 'orders', 'weeks'])
+
+SCALES = {
+    'small': Scale(workers=10, orders=1_000, weeks=52),
+    'medium': Scale(workers=100, orders=50_000, weeks=52),
+    'large': Scale(workers=1_000, orders=500_000, weeks=52),
+}
+
+LOAD_CHUNK_ORDERS = 5000
+DEFAULT_REPEAT = 20
+# A slower median only counts as a regression past this ratio and this many milliseconds
+DEFAULT_THRESHOLD = 1.25
+NOISE_FLOOR_MS = 0.05
+
+Benchmark = namedtuple('Benchmark', ['name', 'run', 'setup', 'cold'])
+
+
+def load_dataset(store, scale, today, seed=0):
+    """Fill a fresh store with `scale` synthetic workers, orders and weekly timetables.
+
+    The demo seed data goes in first so shop jobs, products and prices are the
+    real ones; synthetic order numbers come from the store's id counter.
+    """
+    store.seed_if_empty()
+    workers = synthetic.make_workers(scale.workers, seed)
+    worker_ids = store.add_workers(workers)
+    numbers = store.allocate(ORDER_SEQUENCE, scale.orders, start=ORDER_SEQUENCE_START)
+    orders = synthetic.make_orders(scale.orders, today=today, seed=seed, first_number=numbers.start)
+    for start in range(0, len(orders), LOAD_CHUNK_ORDERS):
+        store.orders.add_many(orders[start:start + LOAD_CHUNK_ORDERS])
+    this_week = today.date() - timedelta(days=today.weekday())
+    first_week = this_week - timedelta(days=7 * (scale.weeks // 2))
+    availability = dict(zip(worker_ids, (w['availability'] for w in workers)))
+    for week in range(scale.weeks):
+        store.add_shifts(synthetic.make_shifts(
+            worker_ids, availability, first_week + timedelta(days=7 * week), 1, seed + week))
+    return {
+        'workers': store.query("SELECT COUNT(*) FROM workers")[0][0],
+        'orders': store.query("SELECT COUNT(*) FROM orders")[0][0],
+        'order_items': store.query("SELECT COUNT(*) FROM order_items")[0][0],
+        'shifts': store.query("SELECT COUNT(*) FROM shifts")[0][0],
+        'weeks': scale.weeks,
+    }
+
+
+def hot_paths(store, today, seed=0):
+    # The pure-logic work behind each page, in the order a rerun would hit it
+    rng = random.Random(seed)
+    start_of_week = today.date() - timedelta(days=today.weekday())
+    week_key = week_key_for(start_of_week)
+    registry = store.worker_registry()
+    workers = registry.workers
+    customer = store.query("SELECT customer_name FROM orders ORDER BY order_id DESC LIMIT 1")[0][0]
+    renderer = TimetableRenderer(store)
+    checks = RosterChecks(store)
+    metrics = OrderMetrics(store)
+    assistant = ShopAssistant(store, OrderMetrics(store))
+    plan = ProductionPlan(store)
+    pricing = PricingEngine(store)
+    forecast = DemandForecast(store)
+    ledger = StockLedger(store)
+    # Sends go nowhere, and the rate limit is lifted so repeated drains measure the queue rather than the bucket
+    notifications = NotificationQueue(store, FileTransport(os.devnull), rate_per_minute=10 ** 9)
+    tomorrow = today.date() + timedelta(days=1)
+    standing = StandingOrders(store, pricing)
+    standing_from = [today.date()]
+    open_orders = store.orders.query(status='Pending', limit=100)
+    pending_ids = [o.order_id for o in open_orders]
+    due_from = datetime.combine(start_of_week, datetime.min.time())
+    now = datetime.now()
+    year_of_weeks = [week_key_for(start_of_week + timedelta(weeks=i)) for i in range(-26, 26)]
+    # Customer name with two letters of its first word swapped
+    first_word = customer.split()[0]
+    customer_typo = ' '.join([first_word[0] + first_word[2] + first_word[1] + first_word[3:]] + customer.split()[1:])
+    questions = [f"what does {workers[-1].name.split()[0]} work this week", f"{customer} orders this week",
+                 "how much beef mince is needed tomorrow", "today's jobs", "how many orders are due this week"]
+
+    def add_random_shift():
+        worker = rng.choice(workers)
+        start = rng.randrange(16, 36) * 30
+        store.add_shift(week_key, rng.choice(DAYS), worker.id, start, start + 120)
+
+    def clear_notifications(kind):
+        with store.transaction() as conn:
+            conn.execute("DELETE FROM notifications WHERE kind = ?", (kind,))
+
+    def queue_reminders():
+        clear_notifications('reminder')
+        notifications.queue_reminders(tomorrow)
+
+    def next_standing_quarter():
+        # 200 trade customers' templates the first time, then a quarter not yet written for every run
+        if not standing.templates():
+            products = [p['name'] for p in store.products.list_products()]
+            for i in range(200):
+                standing.add(f"Trade customer {i}", f"07{i:09d}",
+                             [{'name': name, 'quantity': rng.randint(1, 10), 'unit': 'kg', 'notes': ''}
+                              for name in rng.sample(products, 3)],
+                             rng.sample(DAYS[:6], rng.randint(1, 3)), today.replace(hour=7, minute=0).time(),
+                             every_weeks=rng.choice([1, 1, 2]))
+        standing_from[0] += timedelta(weeks=13)
+
+    def touch_order():
+        order_id = rng.choice(pending_ids)
+        store.orders.update_status(order_id, 'In Progress' if rng.random() < 0.5 else 'Pending')
+
+    return [
+        # Order filtering
+        Benchmark('orders: first page, pending', lambda: store.orders.query_page(status='Pending'), None, False),
+        Benchmark('orders: page, high priority due this week',
+                  lambda: store.orders.query_page(priority='High', due_from=due_from,
+                                                  due_before=due_from + timedelta(days=7)), None, False),
+        Benchmark('orders: count excluding completed', lambda: store.orders.count(exclude_status='Completed'),
+                  None, False),
+        Benchmark('orders: one customer', lambda: store.orders.query(customer_name=customer), None, False),
+        # Search
+        Benchmark('search: common word', lambda: store.orders.search('beef'), None, False),
+        Benchmark('search: customer with a typo', lambda: store.orders.search(customer_typo), None, False),
+        Benchmark('search: word in a note, filtered', lambda: store.orders.search('entrance', status='Pending'),
+                  None, False),
+        # Timetable grid
+        Benchmark('timetable: grid, cold', lambda: TimetableRenderer(store).render(start_of_week), None, True),
+        Benchmark('timetable: grid, cached', lambda: renderer.render(start_of_week), None, False),
+        Benchmark('timetable: grid after one shift', lambda: renderer.render(start_of_week), add_random_shift, False),
+        Benchmark('timetable: roster checks after one shift', lambda: checks.for_week(start_of_week),
+                  add_random_shift, False),
+        # Shift assignment
+        Benchmark('shifts: assign one shift', add_random_shift, None, False),
+        Benchmark('shifts: roster solve, greedy only',
+                  lambda: solve_week(workers, store.get_shop_jobs(), start_of_week, time_budget=0), None, True),
+        # Id generation
+        Benchmark('ids: next order id', lambda: store.orders.next_ids(1), None, False),
+        # Assistant
+        Benchmark('assistant: answer', lambda: [assistant.answer(q, today.date()) for q in questions], None, False),
+        Benchmark('assistant: answer after an order change',
+                  lambda: assistant.answer(questions[-1], today.date()), touch_order, False),
+        # Stats
+        Benchmark('stats: metrics, cold', lambda: OrderMetrics(store).count(), None, True),
+        Benchmark('stats: quick stats', lambda: (metrics.count(), metrics.count(status='Pending'), metrics.takings(),
+                                                 metrics.next_due()), None, False),
+        Benchmark('stats: quick stats after an order change', lambda: metrics.count(status='Pending'), touch_order,
+                  False),
+        Benchmark('stats: weekly trends', lambda: weekly_trends(order_history(store)), None, True),
+        # Production plan and pricing
+        Benchmark('production: plan, cold', lambda: ProductionPlan(store).plan(), None, True),
+        Benchmark('production: plan after an order change', lambda: plan.plan(due_from=start_of_week), touch_order,
+                  False),
+        Benchmark('production: refresh after an order change', plan.refresh, touch_order, False),
+        Benchmark('pricing: totals for 100 orders', lambda: pricing.totals_for(open_orders), None, False),
+        # Forecasting and reorder suggestions
+        Benchmark('forecast: fit, cold', lambda: DemandForecast(store).fit(today.date()), None, True),
+        Benchmark('forecast: reorder suggestions', lambda: forecast.suggestions(today.date(), ledger.levels()),
+                  None, False),
+        # History
+        Benchmark('history: audit one order', lambda: store.history.order_log(rng.choice(pending_ids)), None, False),
+        Benchmark('history: a year of rosters, replayed',
+                  lambda: [store.history.roster_at(key, now) for key in year_of_weeks], None, False),
+        Benchmark("history: this week's orders, replayed", lambda: store.history.orders_at(week_key, now),
+                  None, False),
+        # Customer notifications
+        Benchmark('notifications: queue a confirmation', lambda: notifications.order_created(rng.choice(open_orders)),
+                  lambda: clear_notifications('confirmation'), False),
+        Benchmark('notifications: reminder sweep for tomorrow', lambda: notifications.queue_reminders(tomorrow),
+                  lambda: clear_notifications('reminder'), False),
+        Benchmark('notifications: send a batch', notifications.drain_once, queue_reminders, False),
+        # Standing orders; each run adds a quarter of orders, so it comes after the other order benchmarks
+        Benchmark('standing: a quarter for 200 customers', lambda: standing.materialise(standing_from[0], weeks=13),
+                  next_standing_quarter, True),
+    ]
+
+
+def measure(benchmark, repeat):
+    # One untimed warm-up (skipped for cold paths, which build their own state), then `repeat` timed runs
+    if not benchmark.cold:
+        if benchmark.setup:
+            benchmark.setup()
+        benchmark.run()
+    timings = []
+    for _ in range(repeat):
+        if benchmark.setup:
+            benchmark.setup()
+        started = time.perf_counter()
+        benchmark.run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def run(scale_name, repeat=DEFAULT_REPEAT, only=None, seed=0, db_path=None, progress=None):
+    """Build a dataset at the named scale in a scratch database and time every hot path.
+
+    Returns a JSON-ready dict; cold benchmarks, which rebuild their caches
+    from scratch, run a fifth as often as the rest.
+    """
+    scale = SCALES[scale_name]
+    today = datetime.now().replace(second=0, microsecond=0)
+    with tempfile.TemporaryDirectory() as scratch:
+        store = LarderStore(db_path or os.path.join(scratch, 'bench.db'))
+        try:
+            started = time.perf_counter()
+            dataset = load_dataset(store, scale, today, seed)
+            dataset['load_seconds'] = round(time.perf_counter() - started, 2)
+            results = {}
+            for benchmark in hot_paths(store, today, seed):
+                if only and not any(term in benchmark.name for term in only):
+                    continue
+                if progress:
+                    progress(benchmark.name)
+                results[benchmark.name] = measure(benchmark, max(3, repeat // 5) if benchmark.cold else repeat)
+        finally:
+            store.close()
+    return {
+        'meta': {
+            'scale': scale_name,
+            'seed': seed,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+        },
+        'dataset': dataset,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    # (name, baseline ms, current ms, ratio) for every benchmark whose median slowed past the threshold
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        old, new = before['median_ms'], result['median_ms']
+        if new > old * threshold and new - old > NOISE_FLOOR_MS:
+            regressions.append((name, old, new, round(new / old, 2) if old else float('inf')))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the app's hot paths over synthetic data.")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark")
+    parser.add_argument('--only', action='append', help="run benchmarks whose name contains this (repeatable)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="fail if slower than this earlier results file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="median slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.scale, args.repeat, args.only, args.seed,
+                  progress=lambda name: print(f"  {name}", file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(results, out, indent=2)
+    dataset = results['dataset']
+    print(f"{args.scale}: {dataset['workers']} workers, {dataset['orders']} orders, {dataset['shifts']} shifts "
+          f"over {dataset['weeks']} weeks (loaded in {dataset['load_seconds']}s)")
+    width = max(len(name) for name in results['results']) if results['results'] else 0
+    for name, result in results['results'].items():
+        print(f"{name:<{width}}  median {result['median_ms']:>9.3f} ms  max {result['max_ms']:>9.3f} ms")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('scale') != args.scale:
+            print(f"Baseline was run at scale {baseline.get('meta', {}).get('scale')!r}, not {args.scale!r}",
+                  file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms ({ratio}x)", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
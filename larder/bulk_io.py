@@ -0,0 +1,386 @@
+# Bulk CSV/Excel import and export for orders, workers and timetables
+import csv
+import io
+import sqlite3
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+
+from larder.orders import ORDER_PRIORITIES, ORDER_STATUSES, ORDER_UNITS, as_order
+from larder.products import DEFAULT_PRICE_PER_KG
+from larder.shifts import minute_to_slot, slot_to_minute
+from larder.timetable import DAYS
+
+# One row per order item; rows sharing an order_id (or order_ref) make up one order
+ORDER_LINE_FIELDS = ['order_id', 'customer_name', 'customer_contact', 'customer_email', 'due_date', 'priority',
+                     'status', 'notes', 'total_price', 'created_date', 'item_name', 'quantity', 'unit', 'item_notes']
+WORKER_FIELDS = ['id', 'name', 'position', 'availability', 'unavailable_dates', 'hours_per_week', 'skills', 'color']
+SHIFT_FIELDS = ['week_key', 'day', 'worker_id', 'start', 'end']
+
+# Multi-valued worker fields are written as "a;b;c"
+LIST_SEPARATOR = ';'
+
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%d/%m/%Y']
+
+CHUNK_ROWS = 1000
+EXPORT_CHUNK_ROWS = 2000
+MAX_REPORTED_ERRORS = 200
+
+ImportResult = namedtuple('ImportResult', ['imported', 'rows_read', 'errors', 'error_count'])
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_datetime(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise RowError(f"unrecognised date '{value}'")
+
+
+def parse_number(value, field, minimum=None):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field} must be a number, got '{value}'")
+    if minimum is not None and number <= minimum:
+        raise RowError(f"{field} must be greater than {minimum:g}")
+    return number
+
+
+def parse_choice(value, field, choices, default=None):
+    value = (value or '').strip()
+    if not value and default is not None:
+        return default
+    for choice in choices:
+        if value.lower() == choice.lower():
+            return choice
+    raise RowError(f"{field} must be one of {', '.join(choices)}")
+
+
+def parse_list(value):
+    return [part.strip() for part in (value or '').split(LIST_SEPARATOR) if part.strip()]
+
+
+def _required(row, field):
+    value = (row.get(field) or '').strip()
+    if not value:
+        raise RowError(f"{field} is required")
+    return value
+
+
+# Readers: every reader yields (line_number, {column: text}) one row at a time
+def iter_csv_rows(stream):
+    if isinstance(stream, (io.BufferedIOBase, io.RawIOBase)) or hasattr(stream, 'getbuffer'):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, {(k or '').strip().lower(): (v or '') for k, v in row.items()}
+
+
+def iter_excel_rows(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Excel import needs the openpyxl package; upload a CSV file instead")
+    sheet = load_workbook(stream, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(h or '').strip().lower() for h in next(rows, [])]
+    for line_number, values in enumerate(rows, start=2):
+        yield line_number, {h: ('' if v is None else str(v)) for h, v in zip(header, values)}
+
+
+def iter_rows(stream, filename):
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_excel_rows(stream)
+    return iter_csv_rows(stream)
+
+
+class _ErrorLog:
+    def __init__(self):
+        self.errors = []
+        self.count = 0
+
+    def add(self, line_number, message):
+        self.count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+
+# Orders
+def _order_from_line(row, line_number):
+    due_date = parse_datetime(_required(row, 'due_date'))
+    created = row.get('created_date', '').strip()
+    return {
+        'order_id': (row.get('order_id') or '').strip(),
+        'customer_name': _required(row, 'customer_name'),
+        'customer_contact': _required(row, 'customer_contact'),
+        'customer_email': (row.get('customer_email') or '').strip(),
+        'items': [],
+        'total_price': row.get('total_price', '').strip(),
+        'due_date': due_date,
+        'status': parse_choice(row.get('status'), 'status', ORDER_STATUSES, default='Pending'),
+        'priority': parse_choice(row.get('priority'), 'priority', ORDER_PRIORITIES, default='Medium'),
+        'notes': (row.get('notes') or '').strip(),
+        'created_date': parse_datetime(created) if created else datetime.now(),
+        '_line': line_number,
+    }
+
+
+def _item_from_line(row):
+    return {
+        'name': _required(row, 'item_name'),
+        'quantity': parse_number(row.get('quantity'), 'quantity', minimum=0),
+        'unit': parse_choice(row.get('unit'), 'unit', ORDER_UNITS, default='kg'),
+        'notes': (row.get('item_notes') or '').strip(),
+    }
+
+
+def _finish_order(order):
+    # A blank total_price is filled in from the catalogue when the batch is written
+    order['total_price'] = parse_number(order['total_price'], 'total_price') if order['total_price'] else None
+    return order
+
+
+def import_order_lines(store, rows, chunk_rows=CHUNK_ROWS, progress=None, pricing=None):
+    """Import order lines chunk by chunk.
+
+    Lines of one order must be consecutive. Orders are written in batches of
+    chunk_rows, one transaction each, so memory stays bounded by the batch
+    rather than the file; a line that fails validation is reported and its
+    whole order skipped. Lines without an order_id are grouped by order_ref
+    and get freshly allocated ids; orders without a total_price are priced
+    per batch by `pricing` (a PricingEngine), or at the flat per-kg rate.
+    """
+    errors = _ErrorLog()
+    imported = rows_read = 0
+    pending, current, current_key, skip_key = [], None, None, None
+    seen_keys = set()
+
+    def fresh_ids(count, given):
+        # Counter ids, skipping any this batch names explicitly but hasn't written yet
+        ids = []
+        while len(ids) < count:
+            ids.extend(i for i in store.orders.next_ids(count - len(ids)) if i not in given)
+        return iter(ids)
+
+    def write(batch, lines):
+        # One transaction for the batch; if another writer took one of its ids meanwhile,
+        # fall back to order by order so only the clashing orders are reported
+        try:
+            return len(store.orders.add_many(batch))
+        except sqlite3.IntegrityError:
+            written = 0
+            for order, line_number in zip(batch, lines):
+                try:
+                    written += len(store.orders.add_many([order]))
+                except sqlite3.IntegrityError:
+                    errors.add(line_number, f"order {order.order_id} already exists")
+            return written
+
+    def flush():
+        nonlocal imported, pending
+        given = {o['order_id'] for o in pending if o['order_id']}
+        taken = store.orders.existing_ids(given)
+        fresh = fresh_ids(sum(1 for o in pending if not o['order_id']), given)
+        batch, lines = [], []
+        for order in pending:
+            if order['order_id'] in taken:
+                errors.add(order['_line'], f"order {order['order_id']} already exists")
+                continue
+            order['order_id'] = order['order_id'] or next(fresh)
+            batch.append(as_order(order))
+            lines.append(order['_line'])
+        unpriced = [o for o in batch if o.total_price is None]
+        totals = pricing.totals_for(unpriced) if pricing else {}
+        batch = [o if o.total_price is not None else o._replace(total_price=totals.get(
+            o.order_id, sum(item.quantity for item in o.items) * DEFAULT_PRICE_PER_KG)) for o in batch]
+        imported += write(batch, lines)
+        pending = []
+        if progress:
+            progress(rows_read, imported)
+
+    def finish_current():
+        if current is None:
+            return
+        try:
+            pending.append(_finish_order(current))
+        except RowError as exc:
+            errors.add(current['_line'], str(exc))
+        if len(pending) >= chunk_rows:
+            flush()
+
+    for line_number, row in rows:
+        rows_read += 1
+        key = (row.get('order_id') or row.get('order_ref') or '').strip() or f"line-{line_number}"
+        if key == skip_key:
+            continue
+        if key != current_key:
+            finish_current()
+            current, current_key = None, None
+        try:
+            if current is None:
+                if key in seen_keys:
+                    raise RowError(f"lines for order {key} are not consecutive")
+                seen_keys.add(key)
+                current, current_key = _order_from_line(row, line_number), key
+            current['items'].append(_item_from_line(row))
+        except RowError as exc:
+            errors.add(line_number, str(exc))
+            current, current_key, skip_key = None, None, key
+    finish_current()
+    if pending:
+        flush()
+    return ImportResult(imported, rows_read, errors.errors, errors.count)
+
+
+# Workers
+def import_workers(store, rows, chunk_rows=CHUNK_ROWS, progress=None):
+    errors = _ErrorLog()
+    existing = set(store.worker_registry().ids)
+    batch, imported, rows_read = [], 0, 0
+
+    def flush():
+        # Given ids go in first, so a blank id's allocation can't land on one later in the batch; a
+        # later chunk giving an id already allocated here gets a row error like any other clash
+        ids = store.add_workers(sorted(batch, key=lambda worker: worker['id'] is None))
+        existing.update(ids)
+        return len(ids)
+
+    for line_number, row in rows:
+        rows_read += 1
+        try:
+            availability = parse_list(row.get('availability'))
+            unknown_days = [d for d in availability if d not in DAYS]
+            if unknown_days:
+                raise RowError(f"unknown availability day {unknown_days[0]}")
+            worker_id = int(row['id']) if (row.get('id') or '').strip() else None
+            if worker_id is not None and worker_id in existing:
+                raise RowError(f"worker id {worker_id} already exists")
+            batch.append({
+                'id': worker_id,
+                'name': _required(row, 'name'),
+                'position': _required(row, 'position'),
+                'availability': availability,
+                'unavailable_dates': parse_list(row.get('unavailable_dates')),
+                'hours_per_week': int(parse_number(row.get('hours_per_week'), 'hours_per_week', minimum=0)),
+                'skills': parse_list(row.get('skills')),
+                'color': (row.get('color') or '').strip() or '#CCCCCC',
+            })
+            if worker_id is not None:
+                existing.add(worker_id)
+        except (RowError, ValueError) as exc:
+            errors.add(line_number, str(exc))
+        if len(batch) >= chunk_rows:
+            imported += flush()
+            batch = []
+            if progress:
+                progress(rows_read, imported)
+    if batch:
+        imported += flush()
+    if progress:
+        progress(rows_read, imported)
+    return ImportResult(imported, rows_read, errors.errors, errors.count)
+
+
+# Timetable shifts
+def import_shifts(store, rows, chunk_rows=CHUNK_ROWS, progress=None):
+    errors = _ErrorLog()
+    known_workers = set(store.worker_registry().ids)
+    batch, imported, rows_read = [], 0, 0
+    for line_number, row in rows:
+        rows_read += 1
+        try:
+            day = parse_choice(row.get('day'), 'day', DAYS)
+            worker_id = int(parse_number(row.get('worker_id'), 'worker_id'))
+            if worker_id not in known_workers:
+                raise RowError(f"unknown worker_id {worker_id}")
+            start = slot_to_minute(_required(row, 'start'))
+            end = slot_to_minute(_required(row, 'end'))
+            if end <= start:
+                raise RowError("end must be after start")
+            batch.append((_required(row, 'week_key'), day, worker_id, start, end))
+        except (RowError, ValueError) as exc:
+            errors.add(line_number, str(exc))
+        if len(batch) >= chunk_rows:
+            store.add_shifts(batch)
+            imported += len(batch)
+            batch = []
+            if progress:
+                progress(rows_read, imported)
+    if batch:
+        store.add_shifts(batch)
+        imported += len(batch)
+    if progress:
+        progress(rows_read, imported)
+    return ImportResult(imported, rows_read, errors.errors, errors.count)
+
+
+# Exports stream from the store in keyset-ordered chunks and write CSV as they go
+def _iter_keyset(store, sql, key_columns, key_fields, chunk_rows):
+    # sql has a {where} placeholder and ends in "ORDER BY <key_columns> LIMIT ?"
+    after = None
+    while True:
+        if after is None:
+            rows = store.query(sql.format(where=""), [chunk_rows])
+        else:
+            condition = f"WHERE ({', '.join(key_columns)}) > ({', '.join('?' * len(key_columns))})"
+            rows = store.query(sql.format(where=condition), list(after) + [chunk_rows])
+        yield from rows
+        if len(rows) < chunk_rows:
+            return
+        after = tuple(rows[-1][f] for f in key_fields)
+
+
+def export_order_lines(store, out, chunk_rows=EXPORT_CHUNK_ROWS):
+    writer = csv.writer(out)
+    writer.writerow(ORDER_LINE_FIELDS)
+    sql = ("SELECT o.*, i.position, i.name AS item_name, i.quantity, i.unit, i.notes AS item_notes "
+           "FROM orders o JOIN order_items i ON i.order_id = o.order_id {where} "
+           "ORDER BY o.order_id, i.position LIMIT ?")
+    for row in _iter_keyset(store, sql, ('o.order_id', 'i.position'), ('order_id', 'position'), chunk_rows):
+        writer.writerow([row['order_id'], row['customer_name'], row['customer_contact'], row['customer_email'],
+                         row['due_date'], row['priority'], row['status'], row['notes'], f"{row['total_price']:.2f}",
+                         row['created_date'], row['item_name'], f"{row['quantity']:g}", row['unit'],
+                         row['item_notes']])
+
+
+def export_workers(store, out):
+    writer = csv.writer(out)
+    writer.writerow(WORKER_FIELDS)
+    for worker in store.worker_registry().workers:
+        writer.writerow([worker.id, worker.name, worker.position,
+                         LIST_SEPARATOR.join(worker.availability), LIST_SEPARATOR.join(worker.unavailable_dates),
+                         worker.hours_per_week, LIST_SEPARATOR.join(worker.skills), worker.color])
+
+
+def export_shifts(store, out, week_keys=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # End times are exclusive here (the moment the shift finishes), unlike the End Time picker
+    writer = csv.writer(out)
+    writer.writerow(SHIFT_FIELDS)
+    if week_keys:
+        for week_key in week_keys:
+            for shift in store.get_week_shifts(week_key):
+                writer.writerow([week_key, shift.day, shift.worker_id,
+                                 minute_to_slot(shift.start), minute_to_slot(shift.end)])
+        return
+    sql = "SELECT id, week_key, day, worker_id, start_minute, end_minute FROM shifts {where} ORDER BY id LIMIT ?"
+    for row in _iter_keyset(store, sql, ('id',), ('id',), chunk_rows):
+        writer.writerow([row['week_key'], row['day'], row['worker_id'],
+                         minute_to_slot(row['start_minute']), minute_to_slot(row['end_minute'])])
+
+
+def export_to_file(export, store, **kwargs):
+    # The CSV goes to a temporary file as it is written, never held as one string; returned rewound, close it after use
+    text = io.TextIOWrapper(tempfile.TemporaryFile(), encoding='utf-8', newline='')
+    export(store, text, **kwargs)
+    text.flush()
+    # The raw file underneath, which st.download_button accepts as it is
+    out = text.detach().detach()
+    out.seek(0)
+    return out
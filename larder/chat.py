@@ -0,0 +1,277 @@
+# Chat model backend for the sidebar assistant: BM25 retrieval over shop records plus a pluggable model
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+from larder.assistant import job_label, normalise, period_label
+from larder.orders import OPEN_STATUSES
+from larder.timetable import DAYS, parse_timetable_change, week_key_for
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+CONTEXT_DOCUMENTS = 8
+
+# Question words too common to help ranking
+QUERY_STOP_WORDS = {'a', 'an', 'the', 'is', 'are', 'was', 'do', 'does', 'did', 'what', 'whats', 'when', 'who',
+                    'which', 'we', 'our', 'i', 'to', 'for', 'of', 'on', 'in', 'at', 'any', 'there', 'have', 'has'}
+RESPONSE_CACHE_SIZE = 256
+
+SYSTEM_PROMPT = ("You are the assistant for David's Larder, a Scottish butcher shop. Answer staff questions "
+                 "briefly, using only the shop records provided. If the records don't cover the question, say so.")
+
+
+class BM25Index:
+    """Inverted index with BM25 ranking that takes documents in and out one at a time.
+
+    Postings hold term frequencies per document and the length totals are
+    kept running, so re-indexing one changed order costs its own terms.
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.postings = {}
+        self._lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, text):
+        self.remove(doc_id)
+        terms = Counter(normalise(text).split())
+        self.documents[doc_id] = text
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_length += self._lengths[doc_id]
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def remove(self, doc_id):
+        text = self.documents.pop(doc_id, None)
+        if text is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in set(normalise(text).split()):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def remove_where(self, predicate):
+        for doc_id in [d for d in self.documents if predicate(d)]:
+            self.remove(doc_id)
+
+    def search(self, query, limit=CONTEXT_DOCUMENTS):
+        if not self.documents:
+            return []
+        average = self._total_length / len(self.documents)
+        scores = Counter()
+        for term in set(normalise(query).split()) - QUERY_STOP_WORDS:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (len(self.documents) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, count in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[doc_id] / average)
+                scores[doc_id] += idf * count * (BM25_K1 + 1) / (count + norm)
+        return [(doc_id, self.documents[doc_id]) for doc_id, _ in scores.most_common(limit)]
+
+
+class ShopRetriever:
+    """Open orders, this and next week's shifts and the shop jobs as BM25 documents.
+
+    Kept in step with the store's change feed: keyed order and timetable
+    changes re-index just those records, anything wider reloads its part.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.index = BM25Index()
+        self._seq = None
+        self._weeks = set()
+        self._lock = threading.Lock()
+
+    # Documents
+    @staticmethod
+    def _order_text(order):
+        items = ', '.join(f"{i.quantity:g} {i.unit} {i.name}" for i in order.items)
+        due = order.due_date
+        return (f"Order {order.order_id} for {order.customer_name} due {due.strftime('%A %d/%m/%Y %H:%M')}, "
+                f"status {order.status}, priority {order.priority}: {items}. {order.notes or ''}").strip()
+
+    def _index_orders(self, order_ids=None):
+        if order_ids is None:
+            self.index.remove_where(lambda doc_id: doc_id[0] == 'order')
+            orders = [o for status in OPEN_STATUSES for o in self.store.orders.query(status=status)]
+        else:
+            for order_id in order_ids:
+                self.index.remove(('order', order_id))
+            orders = [o for o in map(self.store.orders.get, order_ids) if o and o.status in OPEN_STATUSES]
+        for order in orders:
+            self.index.add(('order', order.order_id), self._order_text(order))
+
+    def _index_week(self, week_key, start_of_week):
+        self.index.remove_where(lambda doc_id: doc_id[0] == 'shift' and doc_id[1] == week_key)
+        registry = self.store.worker_registry()
+        for shift in self.store.get_week_shifts(week_key):
+            worker = registry.get(shift.worker_id)
+            name = worker.name if worker else f"Worker {shift.worker_id}"
+            date = start_of_week + timedelta(days=DAYS.index(shift.day))
+            self.index.add(('shift', week_key, shift.shift_id),
+                           f"{name} works {shift.day} {date.strftime('%d/%m/%Y')} {period_label((shift.start, shift.end))}")
+
+    def _index_jobs(self):
+        self.index.remove_where(lambda doc_id: doc_id[0] == 'job')
+        descriptions = self.store.get_job_descriptions()
+        for day, periods in self.store.get_shop_jobs().items():
+            for period, jobs in periods.items():
+                for job in jobs:
+                    self.index.add(('job', day, period, job),
+                                   f"{day} {period} shop job: {job_label(job)}. {descriptions.get(job, '')}".strip())
+
+    def _current_weeks(self, today):
+        start = today - timedelta(days=today.weekday())
+        return {week_key_for(start + timedelta(days=7 * i)): start + timedelta(days=7 * i) for i in (0, 1)}
+
+    def refresh(self, today):
+        with self._lock:
+            weeks = self._current_weeks(today)
+            seq = self.store.change_seq()
+            changes = self.store.changes_since(self._seq) if self._seq is not None else None
+            if changes is None:
+                self._index_orders()
+                self._index_jobs()
+                stale_weeks = set(weeks)
+            else:
+                order_keys = {key for _, topic, key in changes if topic == 'orders'}
+                if None in order_keys:
+                    self._index_orders()
+                elif order_keys:
+                    self._index_orders(sorted(order_keys))
+                topics = {topic for _, topic, _ in changes}
+                if 'shop_jobs' in topics:
+                    self._index_jobs()
+                if 'workers' in topics:
+                    stale_weeks = set(weeks)
+                else:
+                    stale_weeks = {parse_timetable_change(key)[0] for _, topic, key in changes
+                                   if topic == 'timetable'} & set(weeks)
+                stale_weeks |= set(weeks) - self._weeks
+            for week_key in self._weeks - set(weeks):
+                self.index.remove_where(lambda doc_id: doc_id[0] == 'shift' and doc_id[1] == week_key)
+            for week_key in stale_weeks:
+                self._index_week(week_key, weeks[week_key])
+            self._weeks = set(weeks)
+            self._seq = seq
+
+    @staticmethod
+    def expand_dates(question, today):
+        # Records carry weekday names and dates, so relative days are spelled out before ranking
+        words = normalise(question).split()
+        extra = []
+        for word, offset in (('today', 0), ('tomorrow', 1)):
+            if word in words:
+                date = today + timedelta(days=offset)
+                extra.append(f"{date.strftime('%A')} {date.strftime('%d/%m/%Y')}")
+        return ' '.join([question] + extra)
+
+    def search(self, question, today, limit=CONTEXT_DOCUMENTS):
+        self.refresh(today)
+        with self._lock:
+            return [text for _, text in self.index.search(self.expand_dates(question, today), limit)]
+
+
+class StubModel:
+    """Deterministic offline stand-in: replies with the retrieved records."""
+
+    name = 'stub'
+
+    def complete(self, question, context):
+        if not context:
+            return "I couldn't find anything about that in the shop records."
+        return "Here's what the shop records say:\n\n" + '\n'.join(f"- {record}" for record in context)
+
+
+class OpenAIModel:
+    """Chat completions through the openai package (OPENAI_API_KEY from the environment)."""
+
+    name = 'openai'
+
+    def __init__(self, model='gpt-3.5-turbo'):
+        try:
+            from openai import OpenAI
+        except ImportError:
+            raise RuntimeError("The chat model needs the openai package: pip install openai")
+        if not os.environ.get('OPENAI_API_KEY'):
+            raise RuntimeError("Set OPENAI_API_KEY to use the OpenAI chat model")
+        self.client = OpenAI()
+        self.model = model
+
+    def complete(self, question, context):
+        records = '\n'.join(f"- {record}" for record in context) or "(no matching records)"
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': f"Today is {datetime.now().strftime('%A %d/%m/%Y')}.\n"
+                                            f"Shop records:\n{records}\n\nQuestion: {question}"},
+            ])
+        return response.choices[0].message.content
+
+
+MODELS = {'stub': StubModel, 'openai': OpenAIModel}
+
+
+def make_model(name):
+    if name not in MODELS:
+        raise ValueError(f"Unknown assistant model {name!r}; choose from {', '.join(MODELS)}")
+    return MODELS[name]()
+
+
+class ChatAssistant:
+    """Retrieval plus a chat model, behind the same answer() as ShopAssistant.
+
+    Replies are kept in an LRU keyed on the normalised question, the day and
+    the change-feed position, so a repeated question costs no model call
+    until the shop data it could draw on has moved. If the model call fails
+    (network, auth, rate limits) the question is answered by `fallback`
+    instead and nothing is cached, so the next rerun tries the model again.
+    """
+
+    def __init__(self, store, model, fallback, cache_size=RESPONSE_CACHE_SIZE):
+        self.store = store
+        self.model = model
+        self.fallback = fallback
+        self.retriever = ShopRetriever(store)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ask(self, question, today=None):
+        # (reply, why the chat model couldn't answer or None)
+        today = today or datetime.now().date()
+        key = (normalise(question), today, self.store.change_seq())
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key], None
+        try:
+            reply = self.model.complete(question, self.retriever.search(question, today))
+        except Exception as e:
+            return self.fallback.answer(question, today), str(e) or type(e).__name__
+        with self._lock:
+            self._cache[key] = reply
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return reply, None
+
+    def answer(self, question, today=None):
+        return self.ask(question, today)[0]
+
+
+def model_from_env():
+    # LARDER_ASSISTANT_MODEL picks the chat backend; unset keeps the built-in intent engine
+    name = os.environ.get('LARDER_ASSISTANT_MODEL', '').strip().lower()
+    return make_model(name) if name else None
@@ -0,0 +1,188 @@
+# Demand forecasting from order history, and supplier reorder suggestions for the weekly ordering job
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from larder.orders import OPEN_STATUSES
+from larder.stock import normalise_lines
+from larder.timetable import DAYS
+
+# Weeks of order history the model is fitted on
+HISTORY_WEEKS = 104
+# Recent complete weeks averaged for a product's current weekly demand
+LEVEL_WEEKS = 8
+# Centred window the seasonal ratio is taken against, and the weeks either side of "a year ago" averaged
+SEASON_WINDOW = 9
+SEASON_SPAN = 1
+SEASON_LIMITS = (0.5, 2.0)
+# Safety stock covers this many standard deviations of weekly demand (about a 95% service level)
+SAFETY_FACTOR = 1.65
+
+ORDERING_JOB = 'weekly_ordering'
+DEFAULT_ORDERING_DAY = 'Wednesday'
+
+# Items counted in whole units are ordered in whole units; weighed ones to the half kilo
+WHOLE_UNITS = ('each', 'pack')
+
+Fit = namedtuple('Fit', ['weekly', 'forecast', 'target_week', 'elapsed'])
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def ordering_day(shop_jobs):
+    # The first day the shop jobs schedule weekly ordering on
+    for day in DAYS:
+        if any(ORDERING_JOB in jobs for jobs in shop_jobs.get(day, {}).values()):
+            return day
+    return DEFAULT_ORDERING_DAY
+
+
+def next_ordering_date(today, day_name):
+    # Today if it is the ordering day, else the next one
+    return today + timedelta(days=(DAYS.index(day_name) - today.weekday()) % 7)
+
+
+def weekly_demand(lines, first_week, weeks):
+    """Quantity per week (rows, Mondays) and (product, unit) (columns).
+
+    Weeks without orders for a product are zero, so rolling windows line up
+    with the calendar.
+    """
+    weeks_index = pd.date_range(pd.Timestamp(first_week), periods=weeks, freq='7D')
+    if lines.empty:
+        return pd.DataFrame(index=weeks_index, columns=pd.MultiIndex.from_tuples([], names=['product', 'unit']),
+                            dtype=float)
+    due = pd.to_datetime(lines['due'])
+    lines = lines.assign(week=due - pd.to_timedelta(due.dt.weekday, unit='D'))
+    table = lines.pivot_table(index='week', columns=['product', 'unit'], values='quantity', aggfunc='sum',
+                              fill_value=0.0)
+    return table.reindex(weeks_index, fill_value=0.0)
+
+
+def fit_weekly(weekly, target_week):
+    """Next-week forecast per (product, unit) from a weekly demand table.
+
+    Level is the mean of the last LEVEL_WEEKS weeks (or of the weeks since a
+    newer product first sold). It is scaled by a seasonal factor: how the
+    weeks around the target week a year earlier compared with the centred
+    average around them. Every step is a whole-table array operation.
+    """
+    values = weekly.to_numpy(dtype=float)
+    weeks = len(values)
+    sold = values > 0
+    first_sale = np.where(sold.any(axis=0), sold.argmax(axis=0), weeks)
+    weeks_seen = weeks - first_sale
+
+    recent = values[-LEVEL_WEEKS:]
+    level = recent.sum(axis=0) / np.clip(np.minimum(weeks_seen, LEVEL_WEEKS), 1, None)
+    spread = recent.std(axis=0)
+
+    centred = weekly.rolling(SEASON_WINDOW, center=True, min_periods=SEASON_WINDOW // 2 + 1).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(centred > 0, values / centred, np.nan)
+    # Row of the target week had the table run on to it, and of the same week a year before
+    year_ago = weeks - 1 + (pd.Timestamp(target_week) - weekly.index[-1]).days // 7 - 52
+    window = ratio[max(year_ago - SEASON_SPAN, 0):max(year_ago + SEASON_SPAN + 1, 0)]
+    seen = ~np.isnan(window)
+    season = np.where(seen.any(axis=0), np.nansum(window, axis=0) / np.clip(seen.sum(axis=0), 1, None), 1.0)
+    season = np.clip(season, *SEASON_LIMITS)
+
+    return pd.DataFrame({
+        'level': level,
+        'season': season,
+        'forecast': level * season,
+        'spread': spread,
+        'weeks': weeks_seen,
+    }, index=weekly.columns)
+
+
+def round_order(quantity, unit):
+    return np.where(np.isin(unit, WHOLE_UNITS), np.ceil(quantity), np.ceil(quantity * 2) / 2)
+
+
+class DemandForecast:
+    """Weekly demand per product, fitted from order history and cached.
+
+    A fit covers the HISTORY_WEEKS complete weeks before this one and is kept
+    until the orders topic of the change feed moves or the day changes, so
+    every session and rerun shares it. Lines are summed per day and name in
+    SQL, which keeps even two years of a busy shop to a few thousand rows.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._fit = None
+        self._key = None
+        self._lock = threading.RLock()
+
+    def _load_lines(self, first_day, before_day, statuses=None):
+        # Quantity per due day, product and stock unit; by default every order that wasn't cancelled
+        if statuses:
+            where, params = f"o.status IN ({','.join('?' * len(statuses))})", list(statuses)
+        else:
+            where, params = "o.status != 'Cancelled'", []
+        rows = self.store.query(
+            "SELECT substr(o.due_date, 1, 10) AS due, i.name, i.unit, SUM(i.quantity) AS quantity "
+            "FROM orders o JOIN order_items i ON i.order_id = o.order_id "
+            f"WHERE {where} AND o.due_date >= ? AND o.due_date < ? GROUP BY due, i.name, i.unit",
+            params + [first_day.isoformat(), before_day.isoformat()])
+        lines = normalise_lines(pd.DataFrame([tuple(r) for r in rows], columns=['due', 'name', 'unit', 'quantity']))
+        return lines.groupby(['due', 'product', 'unit'], as_index=False)['quantity'].sum()
+
+    def fit(self, today):
+        # The Fit for the ordering run due on or after `today`
+        this_week = week_start(today)
+        key = (self.store.change_seq('orders'), today)
+        with self._lock:
+            if self._key != key:
+                started = time.perf_counter()
+                order_day = next_ordering_date(today, ordering_day(self.store.get_shop_jobs()))
+                target_week = week_start(order_day) + timedelta(days=7)
+                first_week = this_week - timedelta(weeks=HISTORY_WEEKS)
+                weekly = weekly_demand(self._load_lines(first_week, this_week), first_week, HISTORY_WEEKS)
+                self._fit = Fit(weekly, fit_weekly(weekly, target_week), target_week, time.perf_counter() - started)
+                self._key = key
+            return self._fit
+
+    def suggestions(self, today, levels):
+        """Reorder suggestions for the next ordering run, one row per product and unit.
+
+        `levels` is StockLedger.levels(). Stock at delivery is what is on hand
+        less what will go out before the target week: the open orders already
+        due by then, or the forecast rate over those days if that is more. The
+        order tops it up to the target week's forecast (never less than the
+        orders already booked for it) plus safety stock.
+        """
+        fit = self.fit(today)
+        target_week = fit.target_week
+        booked = self._booked(today, target_week)
+        forecast = fit.forecast.join(booked, how='outer').fillna(0.0)
+        on_hand = pd.Series({key: level.on_hand for key, level in levels.items()}, dtype=float)
+        forecast['on_hand'] = on_hand.reindex(forecast.index).fillna(0.0).to_numpy()
+        forecast['counted'] = forecast.index.isin(list(levels))
+
+        days_before = (target_week - today).days
+        going_out = np.maximum(forecast['booked_before'], forecast['level'] * days_before / 7)
+        needed = np.maximum(forecast['forecast'], forecast['booked'])
+        safety = SAFETY_FACTOR * forecast['spread']
+        shortfall = needed + safety - (forecast['on_hand'] - going_out)
+        units = forecast.index.get_level_values('unit').to_numpy(dtype=object)
+        forecast['needed'] = needed
+        forecast['safety'] = safety
+        forecast['order'] = round_order(np.maximum(shortfall, 0.0).to_numpy(), units)
+        return forecast.reset_index().sort_values(['order', 'needed'], ascending=False, ignore_index=True)
+
+    def _booked(self, today, target_week):
+        # Open order quantities due from today until the target week, and during it
+        lines = self._load_lines(today, target_week + timedelta(days=7), OPEN_STATUSES)
+        in_target = lines['due'] >= target_week.isoformat()
+        return pd.DataFrame({
+            'booked_before': lines[~in_target].groupby(['product', 'unit'])['quantity'].sum(),
+            'booked': lines[in_target].groupby(['product', 'unit'])['quantity'].sum(),
+        })
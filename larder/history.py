@@ -0,0 +1,219 @@
+# Append-only history of order, shift and worker changes, with snapshots for point-in-time reads
+import json
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from larder.orders import MAX_PARAMS, Order, OrderItem, from_db_datetime, order_week, stored_order, to_db_datetime
+from larder.shifts import Shift, WeekShifts
+from larder.workers import Worker
+
+# Events a partition collects before its state is folded into a new snapshot
+SNAPSHOT_EVERY = 500
+
+# Events written before this are not reconstructed; later than any stored time
+END_OF_TIME = '9999-12-31 23:59:59'
+
+# Workers are few enough to keep in a single partition
+ALL_WORKERS = ''
+
+AuditEntry = namedtuple('AuditEntry', ['at', 'action', 'details'])
+
+
+def shift_event_data(day, worker_id, start, end):
+    return {'day': day, 'worker_id': worker_id, 'start': start, 'end': end}
+
+
+def worker_event_data(worker_id, worker):
+    return {'id': worker_id, 'name': worker['name'], 'position': worker['position'],
+            'availability': list(worker.get('availability', [])),
+            'unavailable_dates': list(worker.get('unavailable_dates', [])),
+            'hours_per_week': worker['hours_per_week'], 'skills': list(worker.get('skills', [])),
+            'color': worker.get('color', '#CCCCCC')}
+
+
+def _apply(state, kind, key, data):
+    if kind == 'created':
+        state[key] = data
+    elif kind == 'deleted':
+        state.pop(key, None)
+    elif key in state:
+        updated = dict(state[key], **data)
+        if 'version' in updated:
+            updated['version'] += 1
+        state[key] = updated
+
+
+def _as_order(data):
+    return Order(**dict(data, due_date=from_db_datetime(data['due_date']),
+                        created_date=from_db_datetime(data['created_date']),
+                        items=tuple(OrderItem(*item) for item in data['items'])))
+
+
+def _describe(field, old, new):
+    label = field.replace('_', ' ').capitalize()
+    if field == 'total_price':
+        return f"{label}: £{old or 0:.2f} → £{new:.2f}"
+    return f"{label}: {old} → {new}"
+
+
+class History:
+    """Every order, shift and worker change, kept as an append-only event log.
+
+    Writers hand their events to record() inside the transaction that makes
+    the change, so one batch costs one executemany and one commit, and the
+    log never disagrees with the tables. Events are partitioned (orders by
+    due week, shifts by roster week); once a partition has gathered
+    SNAPSHOT_EVERY events its folded state is stored as a snapshot, so
+    reading it back at any moment replays at most that many events on top
+    of the latest snapshot before that moment.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    # Writing
+    def record(self, conn, entity, events, at=None):
+        # events are (part, key, kind, data) rows; call inside the writing transaction
+        at = to_db_datetime(at or datetime.now())
+        rows = [(at, entity, part, str(key), kind, None if data is None else json.dumps(data))
+                for part, key, kind, data in events]
+        if not rows:
+            return
+        conn.executemany("INSERT INTO events (at, entity, part, key, kind, data) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany(
+            "INSERT INTO history_parts (entity, part, pending) VALUES (?, ?, ?) "
+            "ON CONFLICT (entity, part) DO UPDATE SET pending = pending + excluded.pending",
+            [(entity, part, count) for part, count in Counter(row[2] for row in rows).items()])
+        due = conn.execute("SELECT part FROM history_parts WHERE entity = ? AND pending >= ?",
+                           (entity, SNAPSHOT_EVERY)).fetchall()
+        for row in due:
+            self._snapshot(conn, entity, row['part'], at)
+
+    def _snapshot(self, conn, entity, part, at):
+        # Same connection as the writer, so the state includes the events just added
+        seq = conn.execute("SELECT MAX(seq) FROM events WHERE entity = ? AND part = ?", (entity, part)).fetchone()[0]
+        conn.execute("INSERT OR REPLACE INTO snapshots (entity, part, seq, at, data) VALUES (?, ?, ?, ?, ?)",
+                     (entity, part, seq, at, json.dumps(self.state(entity, part))))
+        conn.execute("UPDATE history_parts SET pending = 0 WHERE entity = ? AND part = ?", (entity, part))
+
+    def record_baseline(self, conn, at=None):
+        """Snapshot what is already on file, for a database older than the log.
+
+        History starts here: asking about an earlier moment finds no snapshot
+        and reports the partitions empty.
+        """
+        at = to_db_datetime(at or datetime.now())
+        parts = {}
+        orders = self.store.orders.query()
+        for order in orders:
+            parts.setdefault(('order', order_week(order.due_date)), {})[order.order_id] = stored_order(order)
+        for row in conn.execute("SELECT id, week_key, day, worker_id, start_minute, end_minute FROM shifts"):
+            parts.setdefault(('shift', row['week_key']), {})[str(row['id'])] = shift_event_data(
+                row['day'], row['worker_id'], row['start_minute'], row['end_minute'])
+        for worker in self.store.list_workers():
+            parts.setdefault(('worker', ALL_WORKERS), {})[str(worker.id)] = worker_event_data(
+                worker.id, worker._asdict())
+        conn.executemany("INSERT OR REPLACE INTO snapshots (entity, part, seq, at, data) VALUES (?, ?, 0, ?, ?)",
+                         [(entity, part, at, json.dumps(state)) for (entity, part), state in parts.items()])
+
+    # Reading
+    def state(self, entity, part, when=None):
+        # {key: data} for one partition as of `when` (default now)
+        at = to_db_datetime(when) if when else END_OF_TIME
+        snapshot = self.store.query(
+            "SELECT seq, data FROM snapshots WHERE entity = ? AND part = ? AND at <= ? ORDER BY seq DESC LIMIT 1",
+            (entity, part, at))
+        state, seq = (json.loads(snapshot[0]['data']), snapshot[0]['seq']) if snapshot else ({}, 0)
+        rows = self.store.query(
+            "SELECT key, kind, data FROM events WHERE entity = ? AND part = ? AND seq > ? AND at <= ? ORDER BY seq",
+            (entity, part, seq, at))
+        # One parse for the whole replay rather than one per event
+        datas = json.loads(f"[{','.join(row['data'] or 'null' for row in rows)}]")
+        for row, data in zip(rows, datas):
+            _apply(state, row['kind'], row['key'], data)
+        return state
+
+    def roster_at(self, week_key, when):
+        # The week's shifts as they stood at `when`
+        state = self.state('shift', week_key, when)
+        return WeekShifts(week_key, [Shift(int(key), s['worker_id'], s['day'], s['start'], s['end'])
+                                     for key, s in state.items()])
+
+    def workers_at(self, when):
+        return [Worker(**{field: tuple(value) if isinstance(value, list) else value for field, value in w.items()})
+                for w in sorted(self.state('worker', ALL_WORKERS, when).values(), key=lambda w: w['id'])]
+
+    def orders_at(self, week_key, when):
+        # Orders due in the week, as they stood at `when`
+        return sorted((_as_order(data) for data in self.state('order', week_key, when).values()),
+                      key=lambda o: (o.due_date, o.order_id))
+
+    def _order_events(self, order_id, when=None):
+        # The order's state before its first logged event (if it predates the log), then its events
+        at = to_db_datetime(when) if when else END_OF_TIME
+        rows = self.store.query(
+            "SELECT seq, at, part, kind, data FROM events WHERE entity = 'order' AND key = ? AND at <= ? ORDER BY seq",
+            (order_id, at))
+        before = None
+        if rows and rows[0]['kind'] != 'created':
+            snapshot = self.store.query(
+                "SELECT at, data FROM snapshots WHERE entity = 'order' AND part = ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT 1", (rows[0]['part'], rows[0]['seq']))
+            if snapshot:
+                before = (snapshot[0]['at'], json.loads(snapshot[0]['data']).get(order_id))
+        return before, rows
+
+    def order_at(self, order_id, when):
+        # One order as it stood at `when`, or None if it did not exist (or predates the log)
+        before, rows = self._order_events(order_id, when)
+        state = {order_id: before[1]} if before and before[1] else {}
+        for row in rows:
+            _apply(state, row['kind'], order_id, row['data'] and json.loads(row['data']))
+        return _as_order(state[order_id]) if order_id in state else None
+
+    def order_log(self, order_id):
+        """What happened to one order, oldest first, as AuditEntry rows.
+
+        An index seek on (entity, key) finds the order's events directly;
+        each change is described against the state the previous ones left.
+        """
+        before, rows = self._order_events(order_id)
+        entries, current = [], None
+        if before and before[1]:
+            current = before[1]
+            entries.append(AuditEntry(from_db_datetime(before[0]), 'On file',
+                                      f"{current['status']}, £{current['total_price']:.2f} when history began"))
+        for row in rows:
+            data = row['data'] and json.loads(row['data'])
+            at = from_db_datetime(row['at'])
+            if row['kind'] == 'created':
+                entries.append(AuditEntry(at, 'Created', f"{data['status']}, {len(data['items'])} items, "
+                                                         f"£{data['total_price']:.2f}"))
+                current = data
+            elif row['kind'] == 'deleted':
+                entries.append(AuditEntry(at, 'Deleted', ''))
+                current = None
+            else:
+                previous = current or {}
+                entries.append(AuditEntry(at, 'Updated', '; '.join(
+                    _describe(field, previous.get(field), value) for field, value in data.items())))
+                current = dict(previous, **data)
+        return entries
+
+    def order_rows(self, order_ids, columns='due_date'):
+        # {order_id: row} of current values, for writers that need an order's partition or old values
+        found = {}
+        order_ids = list(order_ids)
+        for start in range(0, len(order_ids), MAX_PARAMS):
+            chunk = order_ids[start:start + MAX_PARAMS]
+            rows = self.store.query(
+                f"SELECT order_id, {columns} FROM orders WHERE order_id IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((r['order_id'], r) for r in rows)
+        return found
+
+    def started(self):
+        # When the earliest event or baseline was written, or None for an empty log
+        rows = self.store.query("SELECT MIN(at) FROM (SELECT MIN(at) AS at FROM events "
+                                "UNION ALL SELECT MIN(at) FROM snapshots)")
+        return from_db_datetime(rows[0][0]) if rows[0][0] else None
+
@@ -0,0 +1,170 @@
+# Order metrics: counters maintained from the change feed, plus resampled history for the dashboard
+import heapq
+import threading
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from larder.orders import MAX_PARAMS, OPEN_STATUSES, from_db_datetime
+
+OrderState = namedtuple('OrderState', ['order_id', 'customer_name', 'due_date', 'status', 'priority', 'total_price'])
+
+# Orders that never turn into takings
+UNBILLED_STATUSES = ('Cancelled',)
+
+METRIC_COLUMNS = "order_id, customer_name, due_date, status, priority, total_price"
+
+
+class OrderMetrics:
+    """Order counters kept current from the change feed.
+
+    Counts by (status, priority), takings by status, open orders per due
+    day and per customer are adjusted one order at a time as the feed
+    reports changes; a bulk change without keys rebuilds them. Due-date heaps
+    give the next urgent open order: entries are never removed in place,
+    only skipped once they no longer match the order, so a lookup costs
+    O(log n) amortised.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._seq = None
+        self._lock = threading.RLock()
+
+    def _rebuild(self):
+        self._orders = {}
+        self.counts = Counter()
+        self.revenue = Counter()
+        self.due_per_day = Counter()
+        self.customers = Counter()
+        self._heaps = {}
+        self._open = 0
+        self._apply_rows(self.store.query(f"SELECT {METRIC_COLUMNS} FROM orders"))
+
+    def _apply_rows(self, rows):
+        for row in rows:
+            self._set(row['order_id'], OrderState(row['order_id'], row['customer_name'], from_db_datetime(row['due_date']),
+                                                  row['status'], row['priority'], row['total_price']))
+
+    def _tally(self, state, step):
+        self.counts[(state.status, state.priority)] += step
+        self.revenue[state.status] += step * state.total_price
+        self.customers[state.customer_name] += step
+        if state.status in OPEN_STATUSES:
+            self._open += step
+            self.due_per_day[state.due_date.date()] += step
+
+    def _set(self, order_id, state):
+        old = self._orders.pop(order_id, None)
+        if old:
+            self._tally(old, -1)
+        if state is None:
+            return
+        self._orders[order_id] = state
+        self._tally(state, 1)
+        if state.status in OPEN_STATUSES and (
+                old is None or old.status not in OPEN_STATUSES or old[2:5] != state[2:5]):
+            for heap_key in (None, state.priority):
+                heapq.heappush(self._heaps.setdefault(heap_key, []), (state.due_date, order_id))
+
+    def refresh(self):
+        # Apply order changes recorded since the last look
+        with self._lock:
+            seq = self.store.change_seq()
+            if self._seq == seq:
+                return
+            changes = self.store.changes_since(self._seq) if self._seq is not None else None
+            keys = None if changes is None else {key for _, topic, key in changes if topic == 'orders'}
+            if keys is None or None in keys:
+                self._rebuild()
+            else:
+                self._update(list(keys))
+            self._seq = seq
+            if sum(len(h) for h in self._heaps.values()) > 4 * max(self._open, 16):
+                self._compact()
+
+    def _update(self, order_ids):
+        found = set()
+        for start in range(0, len(order_ids), MAX_PARAMS):
+            chunk = order_ids[start:start + MAX_PARAMS]
+            rows = self.store.query(
+                f"SELECT {METRIC_COLUMNS} FROM orders WHERE order_id IN ({','.join('?' * len(chunk))})", chunk)
+            self._apply_rows(rows)
+            found.update(r['order_id'] for r in rows)
+        for order_id in set(order_ids) - found:
+            self._set(order_id, None)
+
+    def _compact(self):
+        self._heaps = {}
+        for state in self._orders.values():
+            if state.status in OPEN_STATUSES:
+                for heap_key in (None, state.priority):
+                    self._heaps.setdefault(heap_key, []).append((state.due_date, state.order_id))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def next_due(self, priority=None):
+        # Soonest open order, optionally of one priority
+        with self._lock:
+            self.refresh()
+            heap = self._heaps.get(priority, [])
+            while heap:
+                due_date, order_id = heap[0]
+                state = self._orders.get(order_id)
+                if (state and state.status in OPEN_STATUSES and state.due_date == due_date
+                        and (priority is None or state.priority == priority)):
+                    return state
+                heapq.heappop(heap)
+            return None
+
+    def count(self, status=None, priority=None, exclude_status=None):
+        # Same filters as OrderRepository.count, answered from the counters
+        with self._lock:
+            self.refresh()
+            return sum(n for (s, p), n in self.counts.items()
+                       if (status is None or s == status) and (priority is None or p == priority)
+                       and (exclude_status is None or s != exclude_status))
+
+    def takings(self, statuses=None):
+        # Total order value, by default of everything not cancelled
+        with self._lock:
+            self.refresh()
+            return round(sum(v for s, v in self.revenue.items()
+                             if (s in statuses if statuses else s not in UNBILLED_STATUSES)), 2)
+
+    def due_counts(self, first, days):
+        # Open orders due on each of `days` dates from `first`
+        with self._lock:
+            self.refresh()
+            dates = [first + timedelta(days=i) for i in range(days)]
+            return {date: self.due_per_day[date] for date in dates}
+
+    def customer_names(self):
+        with self._lock:
+            self.refresh()
+            return [name for name, count in self.customers.items() if count > 0]
+
+
+def order_history(store):
+    # Every order's due date, value and status as a frame for the trend charts
+    import pandas as pd
+    rows = store.query("SELECT due_date, created_date, total_price, status FROM orders")
+    history = pd.DataFrame([tuple(r) for r in rows], columns=['due_date', 'created_date', 'total_price', 'status'])
+    history['due_date'] = pd.to_datetime(history['due_date'])
+    history['created_date'] = pd.to_datetime(history['created_date'])
+    return history
+
+
+def weekly_trends(history):
+    """Weekly takings (by due date, cancelled orders left out) and order volume (by creation date).
+
+    Both come from resampling the whole history at once into weeks starting
+    on Monday, so empty weeks show as zero rather than gaps.
+    """
+    import pandas as pd
+    billed = history[~history['status'].isin(UNBILLED_STATUSES)]
+    revenue = billed.set_index('due_date')['total_price'].resample('W-MON', label='left', closed='left').sum()
+    volume = history.set_index('created_date')['status'].resample('W-MON', label='left', closed='left').count()
+    trends = pd.DataFrame({'Revenue (£)': revenue.round(2), 'Orders': volume}).fillna(0)
+    trends['Orders'] = trends['Orders'].astype(int)
+    trends.index.name = 'Week starting'
+    return trends
@@ -0,0 +1,370 @@
+# Customer notifications for order events: a persistent queue in the store, sent by a background worker
+import json
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from larder.orders import OPEN_STATUSES, from_db_datetime, to_db_datetime
+
+log = logging.getLogger(__name__)
+
+SHOP_NAME = "David's Larder"
+
+# What a customer is told when their order moves to a status; other statuses send nothing
+STATUS_MESSAGES = {
+    'In Progress': "We've started preparing your order.",
+    'Completed': "Your order is ready for collection.",
+    'Cancelled': "Your order has been cancelled. Please get in touch if this is unexpected.",
+}
+
+# Messages claimed and handed to the transport at once
+BATCH_SIZE = 20
+# Sends a minute across the whole queue
+RATE_PER_MINUTE = 60
+# The worker looks for due messages this often when nothing wakes it sooner
+POLL_SECONDS = 5
+# Failed sends are retried after 30 s, doubling each time up to an hour, and given up after the last attempt
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# A claim older than this belongs to a worker that died mid-send, and its messages go back in the queue
+CLAIM_SECONDS = 300
+# Due-tomorrow reminders go out once a day from this hour
+REMINDER_HOUR = 8
+SMTP_TIMEOUT = 30
+
+Notification = namedtuple('Notification', ['id', 'kind', 'order_id', 'channel', 'recipient', 'subject', 'body',
+                                           'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at', 'error'])
+
+
+def recipient(customer_email, customer_contact):
+    # (channel, address): email where the customer gave one, else a text to their contact number
+    if customer_email:
+        return 'email', customer_email
+    if customer_contact:
+        return 'sms', customer_contact
+    return None, None
+
+
+def retry_delay(attempts):
+    # Exponential backoff with a little jitter so a batch that failed together doesn't retry together
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(1.0, 1.1)
+
+
+def _due_text(due_date):
+    return due_date.strftime('%A %d/%m/%Y at %H:%M')
+
+
+def confirmation_message(order):
+    items = '\n'.join(f"- {item.quantity:g} {item.unit} {item.name}" for item in order.items)
+    return (f"Order {order.order_id} confirmed",
+            f"Hello {order.customer_name},\n\nThank you for your order. It will be ready on "
+            f"{_due_text(order.due_date)}.\n\n{items}\n\nTotal: £{order.total_price:.2f}\n\n{SHOP_NAME}")
+
+
+def status_message(order, status):
+    return (f"Order {order.order_id}: {status}",
+            f"Hello {order.customer_name},\n\n{STATUS_MESSAGES[status]}\n\n{SHOP_NAME}")
+
+
+def reminder_message(order_id, customer_name, due_date):
+    return (f"Order {order_id} is due tomorrow",
+            f"Hello {customer_name},\n\nA reminder that your order {order_id} will be ready on "
+            f"{_due_text(due_date)}.\n\n{SHOP_NAME}")
+
+
+class RateLimit:
+    """Token bucket: `per_minute` sends a minute on average, in bursts of at most `burst`."""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def available(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return int(self.tokens)
+
+    def spend(self, count):
+        self.tokens -= count
+
+    def wait(self):
+        # Seconds until the next send is allowed
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class FileTransport:
+    """Local stand-in that appends each message to a JSON-lines outbox instead of sending it."""
+
+    name = 'file'
+    channels = ('email', 'sms')
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps({'at': to_db_datetime(datetime.now()), 'channel': message.channel,
+                                    'to': message.recipient, 'subject': message.subject,
+                                    'body': message.body}) + '\n')
+        return [None] * len(messages)
+
+
+class SmtpTransport:
+    """Email through an SMTP server, one connection per batch.
+
+    LARDER_SMTP_HOST and LARDER_SMTP_PORT (default localhost:25) name the
+    server and LARDER_SMTP_FROM the sender; with LARDER_SMTP_USER and
+    LARDER_SMTP_PASSWORD set it logs in over STARTTLS. A local debugging
+    server (e.g. `python -m aiosmtpd -n`) works for testing.
+    """
+
+    name = 'smtp'
+    channels = ('email',)
+
+    def __init__(self):
+        self.host = os.environ.get('LARDER_SMTP_HOST', 'localhost')
+        self.port = int(os.environ.get('LARDER_SMTP_PORT', '25'))
+        self.sender = os.environ.get('LARDER_SMTP_FROM', 'orders@localhost')
+        self.user = os.environ.get('LARDER_SMTP_USER', '')
+        self.password = os.environ.get('LARDER_SMTP_PASSWORD', '')
+
+    def send(self, messages):
+        # A connection failure raises and fails the whole batch; a refused message fails on its own
+        errors = []
+        with smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT) as smtp:
+            if self.user:
+                smtp.starttls()
+                smtp.login(self.user, self.password)
+            for message in messages:
+                email = EmailMessage()
+                email['From'] = self.sender
+                email['To'] = message.recipient
+                email['Subject'] = message.subject
+                email.set_content(message.body)
+                try:
+                    smtp.send_message(email)
+                except smtplib.SMTPException as e:
+                    errors.append(str(e) or type(e).__name__)
+                else:
+                    errors.append(None)
+        return errors
+
+
+TRANSPORTS = {'file': FileTransport, 'smtp': SmtpTransport}
+
+
+def make_transport(name, outbox_path):
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown notification transport {name!r}; choose from {', '.join(TRANSPORTS)} or off")
+    return FileTransport(outbox_path) if name == 'file' else TRANSPORTS[name]()
+
+
+def transport_from_env(outbox_path):
+    # LARDER_NOTIFY_TRANSPORT picks how messages leave: file (the default, into the outbox), smtp, or off
+    name = os.environ.get('LARDER_NOTIFY_TRANSPORT', 'file').strip().lower()
+    if name == 'off' or (name == 'file' and not outbox_path):
+        return None
+    return make_transport(name, outbox_path)
+
+
+class NotificationQueue:
+    """Order confirmations, status changes and due-tomorrow reminders for customers.
+
+    Pages only add rows to the notifications table, one small insert after
+    the order write, so a rerun never waits on a mail server. A daemon
+    thread claims due rows in batches with a single UPDATE ... RETURNING
+    (so several server processes sharing the file never send the same
+    message twice), sends them outside the store lock at no more than
+    RATE_PER_MINUTE, and puts failures back with exponential backoff. Each
+    message has a dedupe key, so a double click or a second reminder sweep
+    queues nothing new. With no transport nothing is queued. An unexpected
+    error in the worker is logged and counted in `worker_errors`, with the
+    latest in `last_worker_error`, and the worker carries on.
+    """
+
+    def __init__(self, store, transport, rate_per_minute=RATE_PER_MINUTE):
+        self.store = store
+        self.transport = transport
+        self.rate = RateLimit(rate_per_minute, BATCH_SIZE)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._reminded = None
+        self.worker_errors = 0
+        self.last_worker_error = None
+
+    @property
+    def enabled(self):
+        return self.transport is not None
+
+    # Queueing, on the request path
+    def _queue(self, messages, at=None):
+        # messages are (kind, order_id, channel, recipient, subject, body, dedupe_key); returns how many were new
+        messages = [m for m in messages if m[2]]
+        if not self.enabled or not messages:
+            return 0
+        at = to_db_datetime(at or datetime.now())
+        with self.store.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO notifications (kind, order_id, channel, recipient, subject, body, dedupe_key, "
+                "next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [message + (at, at) for message in messages])
+            queued = conn.total_changes - before
+        self._wake.set()
+        return queued
+
+    def order_created(self, order):
+        return self._queue([('confirmation', order.order_id, *recipient(order.customer_email, order.customer_contact),
+                             *confirmation_message(order), f"confirmation:{order.order_id}")])
+
+    def status_changed(self, order, status):
+        # `order` as the page showed it; its next version keys the message, so a repeated click sends once
+        if status not in STATUS_MESSAGES or status == order.status:
+            return 0
+        return self._queue([('status', order.order_id, *recipient(order.customer_email, order.customer_contact),
+                             *status_message(order, status), f"status:{order.order_id}:{order.version + 1}")])
+
+    def queue_reminders(self, day):
+        # Reminders for every open order due on `day`; safe to run again, it only adds what is missing
+        rows = self.store.query(
+            "SELECT order_id, customer_name, customer_contact, customer_email, due_date FROM orders "
+            f"WHERE due_date >= ? AND due_date < ? AND status IN ({','.join('?' * len(OPEN_STATUSES))})",
+            (day.isoformat(), (day + timedelta(days=1)).isoformat(), *OPEN_STATUSES))
+        return self._queue([('reminder', r['order_id'], *recipient(r['customer_email'], r['customer_contact']),
+                             *reminder_message(r['order_id'], r['customer_name'], from_db_datetime(r['due_date'])),
+                             f"reminder:{r['order_id']}:{day.isoformat()}") for r in rows])
+
+    # Sending, on the worker thread
+    def _claim(self, limit, now):
+        at = to_db_datetime(now)
+        with self.store.transaction() as conn:
+            conn.execute("UPDATE notifications SET status = 'queued' WHERE status = 'sending' AND claimed_at < ?",
+                         (to_db_datetime(now - timedelta(seconds=CLAIM_SECONDS)),))
+            rows = conn.execute(
+                "UPDATE notifications SET status = 'sending', claimed_at = ? WHERE id IN ("
+                "SELECT id FROM notifications WHERE status = 'queued' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?) RETURNING *", (at, at, limit)).fetchall()
+        return sorted((self._from_row(row) for row in rows), key=lambda n: n.id)
+
+    def _finish(self, messages, errors, now):
+        sent, retried, failed = [], [], []
+        for message, error in zip(messages, errors):
+            attempts = message.attempts + 1
+            if error is None:
+                sent.append((attempts, to_db_datetime(now), message.id))
+            elif attempts >= MAX_ATTEMPTS or message.channel not in self.transport.channels:
+                failed.append((attempts, error, message.id))
+            else:
+                retried.append((attempts, error, to_db_datetime(now + timedelta(seconds=retry_delay(attempts))),
+                                message.id))
+        with self.store.transaction() as conn:
+            conn.executemany("UPDATE notifications SET status = 'sent', attempts = ?, sent_at = ?, error = '' "
+                             "WHERE id = ?", sent)
+            conn.executemany("UPDATE notifications SET status = 'queued', attempts = ?, error = ?, "
+                             "next_attempt_at = ? WHERE id = ?", retried)
+            conn.executemany("UPDATE notifications SET status = 'failed', attempts = ?, error = ? WHERE id = ?",
+                             failed)
+
+    def drain_once(self, now=None):
+        # Send one batch of due messages, as many as the rate limit allows; returns how many were handled
+        allowed = min(self.rate.available(), BATCH_SIZE)
+        if not self.enabled or not allowed:
+            return 0
+        now = now or datetime.now()
+        batch = self._claim(allowed, now)
+        if not batch:
+            return 0
+        self.rate.spend(len(batch))
+        sendable = [m for m in batch if m.channel in self.transport.channels]
+        errors = {m.id: f"The {self.transport.name} transport can't send {m.channel} messages"
+                  for m in batch if m.channel not in self.transport.channels}
+        if sendable:
+            try:
+                results = self.transport.send(sendable)
+            except Exception as e:
+                results = [str(e) or type(e).__name__] * len(sendable)
+            errors.update((m.id, error) for m, error in zip(sendable, results))
+        self._finish(batch, [errors[m.id] for m in batch], datetime.now())
+        return len(batch)
+
+    def _sweep_reminders(self, now):
+        # Once a day from REMINDER_HOUR; the dedupe keys keep a restart or a second process from doubling up
+        if now.hour < REMINDER_HOUR or self._reminded == now.date():
+            return
+        self.queue_reminders(now.date() + timedelta(days=1))
+        self._reminded = now.date()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._sweep_reminders(datetime.now())
+                handled = self.drain_once()
+            except Exception as e:
+                # A locked database or a bug: the rows are still queued, so it is logged and tried again next tick
+                log.exception("Customer message worker failed")
+                self.worker_errors += 1
+                self.last_worker_error = f"{type(e).__name__}: {e}"
+                handled = 0
+            if handled:
+                continue
+            self._wake.wait(POLL_SECONDS if self.rate.available() else max(self.rate.wait(), 0.1))
+            self._wake.clear()
+
+    def start(self):
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='larder-notifications', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Reading
+    @staticmethod
+    def _from_row(row):
+        return Notification(row['id'], row['kind'], row['order_id'], row['channel'], row['recipient'],
+                            row['subject'], row['body'], row['status'], row['attempts'],
+                            from_db_datetime(row['next_attempt_at']), from_db_datetime(row['created_at']),
+                            row['sent_at'] and from_db_datetime(row['sent_at']), row['error'])
+
+    def counts(self):
+        # {status: messages}
+        return {r['status']: r['n'] for r in self.store.query(
+            "SELECT status, COUNT(*) AS n FROM notifications GROUP BY status")}
+
+    def messages(self, order_id=None, status=None, limit=50):
+        # Latest first
+        conditions, params = [], []
+        if order_id:
+            conditions.append("order_id = ?")
+            params.append(order_id)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = self.store.query(f"SELECT * FROM notifications {where}ORDER BY id DESC LIMIT ?", params + [limit])
+        return [self._from_row(row) for row in rows]
+
+    def retry_failed(self):
+        # Give messages that ran out of attempts a fresh set
+        with self.store.transaction() as conn:
+            count = conn.execute("UPDATE notifications SET status = 'queued', attempts = 0, next_attempt_at = ? "
+                                 "WHERE status = 'failed'", (to_db_datetime(datetime.now()),)).rowcount
+        self._wake.set()
+        return count
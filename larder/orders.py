@@ -0,0 +1,305 @@
+# Order repository: indexed queries over the orders and order_items tables
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from larder.search import SEARCH_LIMIT
+from larder.timetable import week_key_for
+
+ORDER_COLUMNS = ('order_id', 'customer_name', 'customer_contact', 'customer_email', 'total_price',
+                 'due_date', 'status', 'priority', 'notes', 'created_date')
+
+ORDER_STATUSES = ["Pending", "In Progress", "Completed", "Cancelled"]
+ORDER_PRIORITIES = ["High", "Medium", "Low"]
+# Orders still to be prepared
+OPEN_STATUSES = ("Pending", "In Progress")
+DUE_WINDOWS = ["All", "Today", "Next 2 Days", "This Week"]
+ORDER_PAGE_SIZES = [10, 20, 50, 100]
+ORDER_UNITS = ["kg", "g", "each", "pack"]
+
+# SQLite caps the number of bound parameters per statement
+MAX_PARAMS = 500
+
+# Order ids are ORD plus a zero-padded number, wide enough to keep sorting in order for years
+ORDER_ID_PREFIX = 'ORD'
+ORDER_ID_DIGITS = 6
+ORDER_SEQUENCE = 'order_id'
+ORDER_SEQUENCE_START = ("SELECT COALESCE(MAX(CAST(substr(order_id, 4) AS INTEGER)), 0) FROM orders "
+                        "WHERE order_id GLOB 'ORD[0-9]*'")
+
+
+OrderItem = namedtuple('OrderItem', ['name', 'quantity', 'unit', 'notes'], defaults=('',))
+
+
+class Order(namedtuple('Order', ORDER_COLUMNS + ('items', 'version'), defaults=((), 1))):
+    """One order and its items, read-only.
+
+    Items are a tuple of OrderItem, so a copy made with _replace() shares
+    them with the original and neither can change them under the other. As
+    tuples, records take a fraction of the memory of the dicts they replace.
+    """
+
+    __slots__ = ()
+
+    def duplicate(self, order_id, created_date, due_date=None):
+        # A new pending order with the same customer and (shared) items, due when given or on the original date
+        return self._replace(order_id=order_id, status='Pending', created_date=created_date,
+                             due_date=due_date or self.due_date, version=1)
+
+
+def as_item(item):
+    # Items arrive as records or, from forms and seed data, as dicts
+    if isinstance(item, OrderItem):
+        return item
+    return OrderItem(item['name'], item['quantity'], item['unit'], item.get('notes') or '')
+
+
+def as_order(order):
+    if isinstance(order, Order):
+        return order
+    return Order(order['order_id'], order['customer_name'], order['customer_contact'], order.get('customer_email') or '',
+                 order['total_price'], order['due_date'], order['status'], order['priority'], order.get('notes') or '',
+                 order['created_date'], tuple(as_item(i) for i in order['items']), order.get('version', 1))
+
+
+def stored_order(order):
+    # The order as a JSON-ready dict in its stored form, for the history log
+    data = dict(zip(ORDER_COLUMNS, order))
+    data['due_date'] = to_db_datetime(order.due_date)
+    data['created_date'] = to_db_datetime(order.created_date)
+    data['items'] = [list(item) for item in order.items]
+    data['version'] = order.version
+    return data
+
+
+def order_week(due_date):
+    # History partitions orders by the week they are due, like the timetable
+    return week_key_for(from_db_datetime(due_date) if isinstance(due_date, str) else due_date)
+
+
+def next_week_due(due_date, after):
+    # The same weekday and time, the first whole number of weeks on that falls after `after`
+    weeks = max(1, -(-(after - due_date) // timedelta(weeks=1)))
+    return due_date + timedelta(weeks=weeks)
+
+
+def format_order_id(number):
+    return f"{ORDER_ID_PREFIX}{number:0{ORDER_ID_DIGITS}d}"
+
+
+class StaleOrderError(RuntimeError):
+    """The order changed (or went) after the caller read it."""
+
+
+def to_db_datetime(value):
+    return value.isoformat(sep=' ', timespec='seconds')
+
+
+def from_db_datetime(value):
+    return datetime.fromisoformat(value)
+
+
+def due_window_bounds(window, today):
+    # (due_from, due_before) for a "Due Within" filter; None means unbounded
+    start_of_today = datetime.combine(today, datetime.min.time())
+    if window == "Today":
+        return start_of_today, start_of_today + timedelta(days=1)
+    if window == "Next 2 Days":
+        return None, start_of_today + timedelta(days=3)
+    if window == "This Week":
+        end_of_week = today + timedelta(days=(6 - today.weekday()))
+        return None, datetime.combine(end_of_week, datetime.min.time()) + timedelta(days=1)
+    return None, None
+
+
+class OrderRepository:
+    """Orders and their items, looked up through the SQLite indexes.
+
+    Status and priority are equality lookups on composite indexes that end in
+    (due_date, order_id), so every filter is an index seek plus a range scan
+    in due-date order and items are only fetched for the rows returned.
+    Reads return Order records; writes also take plain dicts.
+
+    Every write bumps the order's version; passing the version a page showed
+    as `expected_version` turns a lost update into a StaleOrderError.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def _from_row(row, items=()):
+        return Order(row['order_id'], row['customer_name'], row['customer_contact'], row['customer_email'],
+                     row['total_price'], from_db_datetime(row['due_date']), row['status'], row['priority'],
+                     row['notes'], from_db_datetime(row['created_date']), items, row['version'])
+
+    def _items_for(self, order_ids):
+        # {order_id: (OrderItem, ...)} in position order
+        items = {}
+        for start in range(0, len(order_ids), MAX_PARAMS):
+            chunk = order_ids[start:start + MAX_PARAMS]
+            rows = self.store.query(
+                f"SELECT order_id, name, quantity, unit, notes FROM order_items "
+                f"WHERE order_id IN ({','.join('?' * len(chunk))}) ORDER BY order_id, position", chunk)
+            for row in rows:
+                items.setdefault(row['order_id'], []).append(
+                    OrderItem(row['name'], row['quantity'], row['unit'], row['notes']))
+        return {order_id: tuple(order_items) for order_id, order_items in items.items()}
+
+    def _load(self, rows, with_items=True):
+        items = self._items_for([r['order_id'] for r in rows]) if with_items else {}
+        return [self._from_row(r, items.get(r['order_id'], ())) for r in rows]
+
+    @staticmethod
+    def _where(status=None, priority=None, exclude_status=None, due_from=None, due_before=None, customer_name=None):
+        clauses, params = [], []
+        if customer_name is not None:
+            clauses.append("customer_name = ?")
+            params.append(customer_name)
+        if isinstance(status, tuple):
+            # Any of several statuses, e.g. OPEN_STATUSES
+            clauses.append(f"status IN ({','.join('?' * len(status))})")
+            params.extend(status)
+        elif status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if priority is not None:
+            clauses.append("priority = ?")
+            params.append(priority)
+        if exclude_status is not None:
+            clauses.append("status != ?")
+            params.append(exclude_status)
+        if due_from is not None:
+            clauses.append("due_date >= ?")
+            params.append(to_db_datetime(due_from))
+        if due_before is not None:
+            clauses.append("due_date < ?")
+            params.append(to_db_datetime(due_before))
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, status=None, priority=None, exclude_status=None, due_from=None, due_before=None, limit=None,
+              customer_name=None):
+        where, params = self._where(status, priority, exclude_status, due_from, due_before, customer_name)
+        sql = f"SELECT * FROM orders{where} ORDER BY due_date, order_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._load(self.store.query(sql, params))
+
+    def query_page(self, status=None, priority=None, exclude_status=None, due_from=None, due_before=None,
+                   after=None, limit=20, with_items=True):
+        # Keyset pagination over (due_date, order_id): `after` is the cursor returned
+        # for the previous page, so each page costs an index seek, not an OFFSET scan.
+        where, params = self._where(status, priority, exclude_status, due_from, due_before)
+        if after is not None:
+            where += (" AND " if where else " WHERE ") + "(due_date, order_id) > (?, ?)"
+            params.extend(after)
+        rows = self.store.query(f"SELECT * FROM orders{where} ORDER BY due_date, order_id LIMIT ?", params + [limit + 1])
+        next_cursor = (rows[limit - 1]['due_date'], rows[limit - 1]['order_id']) if len(rows) > limit else None
+        return self._load(rows[:limit], with_items), next_cursor
+
+    def count(self, status=None, priority=None, exclude_status=None, due_from=None, due_before=None,
+              customer_name=None):
+        where, params = self._where(status, priority, exclude_status, due_from, due_before, customer_name)
+        return self.store.query(f"SELECT COUNT(*) FROM orders{where}", params)[0][0]
+
+    def search(self, text, status=None, priority=None, exclude_status=None, due_from=None, due_before=None,
+               limit=SEARCH_LIMIT, with_items=True):
+        # [(SearchHit, Order)] best match first, narrowed by the same filters as query()
+        where, params = self._where(status, priority, exclude_status, due_from, due_before)
+        hits = self.store.search.search(text, limit, where.replace(" WHERE ", " AND ", 1), params)
+        if not hits:
+            return []
+        placeholders = ','.join('?' * len(hits))
+        rows = self.store.query(f"SELECT * FROM orders WHERE order_id IN ({placeholders})", [h.order_id for h in hits])
+        orders = {order.order_id: order for order in self._load(rows, with_items)}
+        return [(hit, orders[hit.order_id]) for hit in hits if hit.order_id in orders]
+
+    def get(self, order_id):
+        rows = self.store.query("SELECT * FROM orders WHERE order_id = ?", (order_id,))
+        if not rows:
+            return None
+        return self._load(rows)[0]
+
+    def add(self, order):
+        self.add_many([order])
+
+    def add_many(self, orders, claim=None):
+        """Insert a batch of orders in one transaction, e.g. a chunk of a bulk import.
+
+        `claim(conn, orders)`, if given, runs first in the same transaction
+        and returns the orders still to insert, so a caller can record what
+        it wrote and skip what another writer already did. Returns the
+        orders inserted.
+        """
+        orders = [as_order(order) for order in orders]
+        with self.store.transaction() as conn:
+            if claim:
+                orders = claim(conn, orders)
+            if not orders:
+                return []
+            order_rows, item_rows = [], []
+            for order in orders:
+                order_rows.append(order._replace(due_date=to_db_datetime(order.due_date),
+                                                 created_date=to_db_datetime(order.created_date))[:len(ORDER_COLUMNS)])
+                item_rows.extend((order.order_id, i) + item for i, item in enumerate(order.items))
+            conn.executemany(
+                f"INSERT INTO orders ({', '.join(ORDER_COLUMNS)}) VALUES ({', '.join('?' * len(ORDER_COLUMNS))})",
+                order_rows)
+            conn.executemany(
+                "INSERT INTO order_items (order_id, position, name, quantity, unit, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                item_rows)
+            self.store.search.index(conn, orders)
+            self.store.history.record(conn, 'order', [(order_week(order.due_date), order.order_id, 'created',
+                                                       stored_order(order)) for order in orders])
+            self.store.record_changes(conn, 'orders', [order.order_id for order in orders])
+        return orders
+
+    def existing_ids(self, order_ids):
+        found = set()
+        order_ids = list(order_ids)
+        for start in range(0, len(order_ids), MAX_PARAMS):
+            chunk = order_ids[start:start + MAX_PARAMS]
+            rows = self.store.query(
+                f"SELECT order_id FROM orders WHERE order_id IN ({','.join('?' * len(chunk))})", chunk)
+            found.update(r['order_id'] for r in rows)
+        return found
+
+    def next_ids(self, count):
+        # Ids from the store's atomic counter, so no two sessions or processes get the same one;
+        # numbers an import already used explicitly are skipped
+        ids = []
+        while len(ids) < count:
+            numbers = self.store.allocate(ORDER_SEQUENCE, count - len(ids), start=ORDER_SEQUENCE_START)
+            candidates = [format_order_id(n) for n in numbers]
+            taken = self.existing_ids(candidates)
+            ids.extend(c for c in candidates if c not in taken)
+        return ids
+
+    @staticmethod
+    def _check_written(cursor, order_id, expected_version):
+        if cursor.rowcount == 0 and expected_version is not None:
+            raise StaleOrderError(f"{order_id} was changed by someone else since version {expected_version}")
+
+    def _log(self, conn, order_id, kind, data):
+        # Logged before a delete so the order's week can still be read; rolled back with it on a stale write
+        row = self.store.history.order_rows([order_id]).get(order_id)
+        if row:
+            self.store.history.record(conn, 'order', [(order_week(row['due_date']), order_id, kind, data)])
+
+    def update_status(self, order_id, status, expected_version=None):
+        with self.store.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE orders SET status = ?, version = version + 1 WHERE order_id = ? AND coalesce(? = version, 1)",
+                (status, order_id, expected_version))
+            self._check_written(cursor, order_id, expected_version)
+            self._log(conn, order_id, 'updated', {'status': status})
+            self.store.record_change(conn, 'orders', order_id)
+
+    def delete(self, order_id, expected_version=None):
+        with self.store.transaction() as conn:
+            self._log(conn, order_id, 'deleted', None)
+            self.store.search.unindex(conn, [order_id])
+            cursor = conn.execute("DELETE FROM orders WHERE order_id = ? AND coalesce(? = version, 1)",
+                                  (order_id, expected_version))
+            self._check_written(cursor, order_id, expected_version)
+            self.store.record_change(conn, 'orders', order_id)
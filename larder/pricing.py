@@ -0,0 +1,133 @@
+# Vectorised order pricing over the product catalogue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from larder.orders import OPEN_STATUSES, as_item, order_week
+from larder.products import DEFAULT_PRICE_PER_KG
+
+LINE_COLUMNS = ['order_id', 'customer_name', 'name', 'quantity', 'unit']
+
+# Weight assumed for each/pack items of products the catalogue doesn't know
+FALLBACK_ITEM_WEIGHT_KG = 1.0
+
+# Orders whose totals follow price changes; completed and cancelled ones keep what was charged
+REPRICE_STATUSES = OPEN_STATUSES
+
+
+def normalise_names(names):
+    # Vectorised product_key()/customer_key() for a whole column
+    return names.fillna('').str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+
+
+def price_lines(lines, products, customer_prices):
+    """Price a frame of order lines in one pass.
+
+    `lines` has LINE_COLUMNS; `products` is indexed by product key with
+    price, price_unit and nominal_weight_kg; `customer_prices` is indexed by
+    (customer key, product key). Quantities are converted to the product's
+    price unit (g and kg by weight, each/pack through the nominal weight) and
+    unknown products fall back to the flat per-kg rate.
+    """
+    lines = lines.reset_index(drop=True)
+    keys = normalise_names(lines['name'])
+    customers = normalise_names(lines['customer_name'])
+    catalogue = products.reindex(keys)
+    quantity = lines['quantity'].to_numpy(dtype=float)
+    unit = lines['unit'].to_numpy(dtype=object)
+    price_unit = catalogue['price_unit'].to_numpy(dtype=object)
+    weight = catalogue['nominal_weight_kg'].to_numpy(dtype=float)
+    known = catalogue['price'].notna().to_numpy()
+
+    by_weight = [unit == 'kg', unit == 'g']
+    kg = np.select(by_weight, [quantity, quantity / 1000], quantity * weight)
+    fallback_kg = np.select(by_weight, [quantity, quantity / 1000],
+                            quantity * np.where(np.isnan(weight), FALLBACK_ITEM_WEIGHT_KG, weight))
+    billable = np.where(unit == price_unit, quantity, np.where(price_unit == 'kg', kg, kg / weight))
+
+    list_price = catalogue['price'].to_numpy(dtype=float)
+    if len(customer_prices):
+        special = customer_prices['price'].reindex(pd.MultiIndex.from_arrays([customers, keys])).to_numpy(dtype=float)
+    else:
+        special = np.full(len(lines), np.nan)
+    unit_price = np.where(np.isnan(special), list_price, special)
+
+    priced = known & ~np.isnan(billable)
+    result = lines.assign(
+        billable_quantity=np.where(priced, billable, fallback_kg),
+        unit_price=np.where(priced, unit_price, DEFAULT_PRICE_PER_KG),
+        priced=priced,
+    )
+    result['line_total'] = np.round(result['billable_quantity'] * result['unit_price'], 2)
+    return result
+
+
+def order_totals(priced_lines):
+    return priced_lines.groupby('order_id', sort=False)['line_total'].sum().round(2)
+
+
+class PricingEngine:
+    """Prices orders against catalogue frames cached per catalogue version."""
+
+    def __init__(self, store):
+        self.store = store
+        self._frames = None
+        self._lock = threading.Lock()
+
+    def frames(self):
+        catalogue = self.store.products
+        with self._lock:
+            if self._frames is None or self._frames[0] != catalogue.version:
+                products = pd.DataFrame(
+                    [dict(r) for r in self.store.query(
+                        "SELECT name, price, price_unit, nominal_weight_kg FROM products")],
+                    columns=['name', 'price', 'price_unit', 'nominal_weight_kg']).set_index('name')
+                customer_prices = pd.DataFrame(
+                    [dict(r) for r in self.store.query("SELECT customer_name, product, price FROM customer_prices")],
+                    columns=['customer_name', 'product', 'price']).set_index(['customer_name', 'product'])
+                self._frames = (catalogue.version, products, customer_prices)
+            return self._frames[1], self._frames[2]
+
+    def price_items(self, customer_name, items):
+        # Price a single order's item list (e.g. the New Order form)
+        lines = pd.DataFrame([(None, customer_name, i.name, i.quantity, i.unit) for i in map(as_item, items)],
+                             columns=LINE_COLUMNS)
+        priced = price_lines(lines, *self.frames())
+        return round(float(priced['line_total'].sum()), 2), priced
+
+    def totals_for(self, orders):
+        # {order_id: total} for a batch of orders priced together
+        lines = pd.DataFrame([(o.order_id, o.customer_name, i.name, i.quantity, i.unit)
+                              for o in orders for i in o.items], columns=LINE_COLUMNS)
+        if lines.empty:
+            return {}
+        return order_totals(price_lines(lines, *self.frames())).to_dict()
+
+    def load_lines(self, statuses=REPRICE_STATUSES):
+        rows = self.store.query(
+            "SELECT i.order_id, o.customer_name, i.name, i.quantity, i.unit FROM order_items i "
+            f"JOIN orders o ON o.order_id = i.order_id WHERE o.status IN ({','.join('?' * len(statuses))})",
+            list(statuses))
+        return pd.DataFrame([tuple(r) for r in rows], columns=LINE_COLUMNS)
+
+    def reprice_orders(self, statuses=REPRICE_STATUSES):
+        # Recompute every open order's total in bulk after a price change; returns orders whose total moved
+        lines = self.load_lines(statuses)
+        if lines.empty:
+            return 0
+        totals = order_totals(price_lines(lines, *self.frames()))
+        with self.store.transaction() as conn:
+            current = self.store.history.order_rows(totals.index.tolist(), 'due_date, total_price')
+            # Orders whose total is unchanged keep their version, so nobody editing them hits a stale write
+            changed = [(order_id, total) for order_id, total in zip(totals.index.tolist(), totals.to_numpy().tolist())
+                       if round(current[order_id]['total_price'], 2) != round(total, 2)]
+            if not changed:
+                return 0
+            conn.executemany("UPDATE orders SET total_price = ?, version = version + 1 WHERE order_id = ?",
+                             [(total, order_id) for order_id, total in changed])
+            self.store.history.record(conn, 'order', [
+                (order_week(current[order_id]['due_date']), order_id, 'updated', {'total_price': total})
+                for order_id, total in changed])
+            self.store.record_changes(conn, 'orders', [order_id for order_id, _ in changed])
+        return len(changed)
@@ -0,0 +1,128 @@
+# Production plan: open order quantities per product, unit and due date
+import threading
+from datetime import date
+
+import pandas as pd
+
+from larder.orders import MAX_PARAMS, OPEN_STATUSES
+from larder.pricing import normalise_names
+from larder.products import product_key
+
+PLAN_COLUMNS = ['product', 'unit', 'due', 'quantity']
+
+LINES_SQL = ("SELECT i.order_id, i.name, i.quantity, i.unit, substr(o.due_date, 1, 10) AS due "
+             "FROM order_items i JOIN orders o ON o.order_id = i.order_id "
+             f"WHERE o.status IN ({','.join('?' * len(OPEN_STATUSES))})")
+
+
+class ProductionPlan:
+    """Running totals of what open orders need, kept in step with the orders.
+
+    The first read groups the flattened order_items table once. After that
+    each read follows the change feed, so writes from other processes (a
+    second server, the standing-order cron) count too: only the changed
+    orders' shares of the totals are taken out and, if still open, added
+    back. A bulk change without keys, or a feed trimmed past the last look,
+    rebuilds the totals.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._totals = None
+        self._by_order = {}
+        self._names = {}
+        self._seq = None
+        self._lock = threading.RLock()
+
+    def _load_lines(self):
+        rows = [tuple(r) for r in self.store.query(LINES_SQL, list(OPEN_STATUSES))]
+        lines = pd.DataFrame(rows, columns=['order_id', 'name', 'quantity', 'unit', 'due'])
+        lines['product'] = normalise_names(lines['name'])
+        return lines
+
+    def _add_lines(self, lines):
+        first_seen = lines.drop_duplicates('product')
+        for key, name in zip(first_seen['product'], first_seen['name']):
+            self._names.setdefault(key, name.strip())
+        per_order = lines.groupby(['order_id', 'product', 'unit', 'due'], sort=False)['quantity'].sum()
+        for (order_id, product, unit, due), quantity in per_order.items():
+            self._by_order.setdefault(order_id, []).append(((product, unit, due), quantity))
+            self._totals[(product, unit, due)] = self._totals.get((product, unit, due), 0.0) + quantity
+
+    def _remove_order(self, order_id):
+        for key, quantity in self._by_order.pop(order_id, []):
+            remaining = round(self._totals[key] - quantity, 6)
+            if remaining > 0:
+                self._totals[key] = remaining
+            else:
+                del self._totals[key]
+
+    def _rebuild(self):
+        self._totals = {}
+        self._by_order = {}
+        self._add_lines(self._load_lines())
+
+    def _orders_changed(self, order_ids):
+        # Plain tuples rather than a frame: a handful of orders is cheaper to fold in directly
+        for order_id in order_ids:
+            self._remove_order(order_id)
+        shares = {}
+        for start in range(0, len(order_ids), MAX_PARAMS):
+            chunk = order_ids[start:start + MAX_PARAMS]
+            for order_id, name, quantity, unit, due in self.store.query(
+                    LINES_SQL + f" AND i.order_id IN ({','.join('?' * len(chunk))})", list(OPEN_STATUSES) + chunk):
+                product = product_key(name)
+                self._names.setdefault(product, (name or '').strip())
+                order_shares = shares.setdefault(order_id, {})
+                order_shares[(product, unit, due)] = order_shares.get((product, unit, due), 0.0) + quantity
+        for order_id, order_shares in shares.items():
+            self._by_order[order_id] = list(order_shares.items())
+            for key, quantity in order_shares.items():
+                self._totals[key] = self._totals.get(key, 0.0) + quantity
+
+    def refresh(self):
+        # Apply order changes recorded since the last look
+        with self._lock:
+            seq = self.store.change_seq()
+            if self._seq == seq and self._totals is not None:
+                return
+            changes = self.store.changes_since(self._seq) if self._seq is not None else None
+            keys = None if changes is None else {key for _, topic, key in changes if topic == 'orders'}
+            if self._totals is None or keys is None or None in keys:
+                self._rebuild()
+            elif keys:
+                self._orders_changed(sorted(keys))
+            self._seq = seq
+
+    def plan(self, due_from=None, due_before=None):
+        # One row per (product, unit, due date), soonest first; bounds are dates, due_before exclusive
+        first, before = due_from and due_from.isoformat(), due_before and due_before.isoformat()
+        with self._lock:
+            self.refresh()
+            rows = sorted((due, self._names.get(product, product), unit, quantity)
+                          for (product, unit, due), quantity in self._totals.items()
+                          if (first is None or due >= first) and (before is None or due < before))
+        days = {due: date.fromisoformat(due) for due in {row[0] for row in rows}}
+        return pd.DataFrame([(product, unit, days[due], quantity) for due, product, unit, quantity in rows],
+                            columns=PLAN_COLUMNS)
+
+    def totals(self, due_from=None, due_before=None):
+        # Quantity per product and unit across the whole date range
+        return self.plan(due_from, due_before).groupby(['product', 'unit'], as_index=False)['quantity'].sum()
+
+    def needed(self, product, due_from=None, due_before=None):
+        # {unit: quantity} of one product over a date range, same bounds as plan()
+        key = product_key(product)
+        first, before = due_from and due_from.isoformat(), due_before and due_before.isoformat()
+        needed = {}
+        with self._lock:
+            self.refresh()
+            for (name, unit, due), quantity in self._totals.items():
+                if name == key and (first is None or due >= first) and (before is None or due < before):
+                    needed[unit] = needed.get(unit, 0.0) + quantity
+        return needed
+
+    def quantity(self, product, unit, due):
+        with self._lock:
+            self.refresh()
+            return self._totals.get((product_key(product), unit, due.isoformat()), 0.0)
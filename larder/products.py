@@ -0,0 +1,84 @@
+# Product catalogue: per-unit prices, nominal weights and customer price lists
+import re
+
+PRICE_UNITS = ["kg", "each", "pack"]
+
+# What the shop charged for everything before products had prices
+DEFAULT_PRICE_PER_KG = 15.0
+
+
+def product_key(name):
+    # Order item names are free text, so match products case- and space-insensitively
+    return re.sub(r'\s+', ' ', (name or '').strip().lower())
+
+
+def customer_key(name):
+    return re.sub(r'\s+', ' ', (name or '').strip().lower())
+
+
+class ProductCatalogue:
+    """Products and customer-specific prices kept in the store.
+
+    `version` is the catalogue's position in the store's change feed, so the
+    pricing engine can keep its lookup frames cached between reruns and
+    still notice edits made by another process.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @property
+    def version(self):
+        return self.store.change_seq('products')
+
+    def list_products(self):
+        return [dict(r) for r in self.store.query(
+            "SELECT name, display_name, price, price_unit, nominal_weight_kg FROM products ORDER BY display_name")]
+
+    def get(self, name):
+        rows = self.store.query(
+            "SELECT name, display_name, price, price_unit, nominal_weight_kg FROM products WHERE name = ?",
+            (product_key(name),))
+        return dict(rows[0]) if rows else None
+
+    def upsert(self, display_name, price, price_unit, nominal_weight_kg=None):
+        if price_unit not in PRICE_UNITS:
+            raise ValueError(f"price_unit must be one of {', '.join(PRICE_UNITS)}")
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO products (name, display_name, price, price_unit, nominal_weight_kg) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET display_name = excluded.display_name, price = excluded.price, "
+                "price_unit = excluded.price_unit, nominal_weight_kg = excluded.nominal_weight_kg",
+                (product_key(display_name), display_name.strip(), price, price_unit, nominal_weight_kg))
+            self.store.record_change(conn, 'products')
+
+    def remove(self, name):
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM products WHERE name = ?", (product_key(name),))
+            self.store.record_change(conn, 'products')
+
+    def set_prices(self, prices):
+        # {product name: new price} in one transaction, e.g. a supplier price change
+        with self.store.transaction() as conn:
+            conn.executemany("UPDATE products SET price = ? WHERE name = ?",
+                             [(price, product_key(name)) for name, price in prices.items()])
+            self.store.record_change(conn, 'products')
+
+    def list_customer_prices(self):
+        return [dict(r) for r in self.store.query(
+            "SELECT c.customer_name, p.display_name AS product, c.price, p.price_unit "
+            "FROM customer_prices c JOIN products p ON p.name = c.product ORDER BY c.customer_name, p.display_name")]
+
+    def set_customer_price(self, customer_name, product_name, price):
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO customer_prices (customer_name, product, price) VALUES (?, ?, ?) "
+                "ON CONFLICT (customer_name, product) DO UPDATE SET price = excluded.price",
+                (customer_key(customer_name), product_key(product_name), price))
+            self.store.record_change(conn, 'products')
+
+    def remove_customer_price(self, customer_name, product_name):
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM customer_prices WHERE customer_name = ? AND product = ?",
+                         (customer_key(customer_name), product_key(product_name)))
+            self.store.record_change(conn, 'products')
@@ -0,0 +1,125 @@
+# Rerun profiling: section timings per script run, kept in memory and in a rotating JSONL log
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+PROFILE_LOG_BYTES = 2 * 1024 * 1024
+PROFILE_LOG_BACKUPS = 3
+RECENT_RUNS = 200
+
+
+def state_bytes(state):
+    # Pickled size of each session-state value; values that can't be pickled count as zero
+    sizes = {}
+    for key in list(state.keys()):
+        try:
+            sizes[str(key)] = len(pickle.dumps(state[key], protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            sizes[str(key)] = 0
+    return sizes
+
+
+class RerunProfile:
+    """Timings for one script run.
+
+    lap() closes the section running since the previous lap, so a page can
+    be instrumented at its boundaries without re-indenting it; section()
+    times a block on its own and leaves the lap clock alone.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.timestamp = datetime.now()
+        self.sections = {}
+        self._lap_start = self.started
+        self._excluded = 0.0
+        self.widgets = None
+        self.state_bytes = None
+
+    def _add(self, name, seconds):
+        self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self._add(name, now - self._lap_start - self._excluded)
+        self._lap_start, self._excluded = now, 0.0
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._add(name, elapsed)
+            self._excluded += elapsed
+
+    def finish(self, widgets=None, session_sizes=None):
+        self.total = time.perf_counter() - self.started
+        self.widgets = widgets
+        self.state_bytes = sum(session_sizes.values()) if session_sizes is not None else None
+        return self
+
+    def record(self):
+        return {
+            'at': self.timestamp.isoformat(timespec='seconds'),
+            'page': self.page,
+            'total_ms': round(self.total * 1000, 2),
+            'sections_ms': {name: round(seconds * 1000, 2) for name, seconds in self.sections.items()},
+            'widgets': self.widgets,
+            'session_state_bytes': self.state_bytes,
+        }
+
+
+class ProfileLog:
+    """Process-wide sink for rerun profiles.
+
+    The most recent runs stay in memory for the developer panel; every run is
+    also appended as one JSON line to a size-rotated file when a path is set.
+    """
+
+    def __init__(self, path=None, max_bytes=PROFILE_LOG_BYTES, backups=PROFILE_LOG_BACKUPS, recent=RECENT_RUNS):
+        self.path = path
+        self.recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._logger = None
+        if path:
+            self._logger = logging.getLogger(f"larder.profile.{path}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            if not self._logger.handlers:
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._logger.addHandler(handler)
+
+    def write(self, profile):
+        record = profile.record()
+        with self._lock:
+            self.recent.append(record)
+        if self._logger:
+            self._logger.info(json.dumps(record))
+        return record
+
+    def summary(self, page=None):
+        # Mean, 95th percentile and max per section over the recent runs (pandas only loads once asked)
+        import pandas as pd
+        with self._lock:
+            records = [r for r in self.recent if page is None or r['page'] == page]
+        rows = [(name, ms) for r in records for name, ms in r['sections_ms'].items()]
+        rows += [('total', r['total_ms']) for r in records]
+        if not rows:
+            return pd.DataFrame(columns=['section', 'runs', 'mean_ms', 'p95_ms', 'max_ms'])
+        timings = pd.DataFrame(rows, columns=['section', 'ms']).groupby('section', sort=False)['ms']
+        return pd.DataFrame({
+            'runs': timings.count(),
+            'mean_ms': timings.mean().round(2),
+            'p95_ms': timings.quantile(0.95).round(2),
+            'max_ms': timings.max(),
+        }).reset_index()
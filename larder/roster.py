@@ -0,0 +1,206 @@
+# Automatic weekly roster: cover every shop job with a skilled worker
+import random
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from larder.timetable import DAYS, PERIODS
+
+# Opening hours of each job period, in minutes since midnight (half-hour aligned)
+PERIOD_WINDOWS = {
+    'morning': (8 * 60, 12 * 60),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 19 * 60 + 30),
+}
+
+# Worker skills that qualify for each job; a job name listed as a skill always qualifies.
+# An empty set means anyone on shift can do it.
+JOB_SKILLS = {
+    'meat_preparation': {'meat_cutting', 'preparation'},
+    'display_setup': {'preparation', 'customer_service'},
+    'order_receiving': {'ordering'},
+    'customer_service': {'customer_service'},
+    'cleaning': {'cleaning'},
+    'inventory_check': {'ordering', 'quality_control'},
+    'closing_duties': {'cash_handling', 'customer_service'},
+    'equipment_cleaning': {'cleaning'},
+    'butchery_work': {'meat_cutting'},
+    'display_refresh': {'preparation', 'customer_service'},
+    'supplier_meeting': {'ordering'},
+    'special_orders': {'meat_cutting', 'preparation'},
+    'training': set(),
+    'bulk_preparation': {'preparation', 'meat_cutting'},
+    'quality_checks': {'quality_control'},
+    'marketing_prep': {'customer_service'},
+    'online_orders': {'packaging'},
+    'weekly_ordering': {'ordering'},
+    'specialty_cuts': {'meat_cutting'},
+    'supplier_delivery': {'ordering'},
+    'event_preparation': {'preparation', 'meat_cutting'},
+    'staff_meeting': set(),
+    'deep_cleaning': {'cleaning'},
+    'weekend_prep': {'preparation', 'meat_cutting'},
+    'bulk_butchery': {'meat_cutting'},
+    'rush_hours': {'customer_service', 'cash_handling'},
+    'weekly_review': {'ordering'},
+    'opening_duties': {'customer_service', 'cash_handling'},
+    'fresh_display': {'preparation'},
+    'busy_shift': {'customer_service'},
+    'quick_restock': {'packaging', 'preparation'},
+    'early_closing': {'cash_handling', 'customer_service'},
+    'weekly_cleanup': {'cleaning'},
+    'waste_management': {'cleaning'},
+}
+
+# Jobs that mean the shop is shut for that period
+CLOSED_JOBS = {'closed'}
+
+RosterShift = namedtuple('RosterShift', ['worker_id', 'day', 'start', 'end'])
+RosterSolution = namedtuple('RosterSolution', ['shifts', 'uncovered', 'hours', 'elapsed'])
+
+# Objective weights: an uncovered job outweighs any amount of hour balancing
+UNCOVERED_WEIGHT = 1000
+UNDER_HOURS_WEIGHT = 1
+EMPTY_PERIOD_WEIGHT = 50
+
+
+def period_hours(period):
+    start, end = PERIOD_WINDOWS[period]
+    return (end - start) / 60
+
+
+def is_qualified(worker, job):
+    skills = set(worker.skills)
+    required = JOB_SKILLS.get(job)
+    if job in skills:
+        return True
+    if required is None:
+        return False
+    return not required or bool(skills & required)
+
+
+def is_available(worker, day, date):
+    return day in worker.availability and date.isoformat() not in worker.unavailable_dates
+
+
+class RosterSolver:
+    """Greedy construction followed by randomised local search.
+
+    Decisions are which (day, period) blocks each worker works; a worker's
+    periods on one day must be contiguous so they become a single shift.
+    Hard constraints are availability, unavailable dates and the weekly
+    hours cap; the objective counts uncovered jobs, empty open periods and
+    hours left below each worker's target.
+    """
+
+    def __init__(self, workers, shop_jobs, start_of_week, seed=0):
+        self.workers = list(workers)
+        self.rng = random.Random(seed)
+        self.demand = {}
+        for day in DAYS:
+            for period in PERIODS:
+                jobs = [j for j in shop_jobs.get(day, {}).get(period, []) if j not in CLOSED_JOBS]
+                if jobs and period in PERIOD_WINDOWS:
+                    self.demand[(day, period)] = jobs
+        dates = {day: start_of_week + timedelta(days=i) for i, day in enumerate(DAYS)}
+        self.available = {
+            w.id: {day for day in DAYS if is_available(w, day, dates[day])} for w in self.workers}
+        self.qualified = {
+            key: {job: {w.id for w in self.workers if is_qualified(w, job)} for job in jobs}
+            for key, jobs in self.demand.items()}
+        self.capacity = {w.id: w.hours_per_week for w in self.workers}
+        self.assigned = {w.id: {day: set() for day in DAYS} for w in self.workers}
+        self.hours = {w.id: 0.0 for w in self.workers}
+        self.on_shift = {key: set() for key in self.demand}
+
+    # Incremental bookkeeping
+    def _add(self, worker_id, day, period):
+        self.assigned[worker_id][day].add(period)
+        self.hours[worker_id] += period_hours(period)
+        self.on_shift[(day, period)].add(worker_id)
+
+    def _remove(self, worker_id, day, period):
+        self.assigned[worker_id][day].discard(period)
+        self.hours[worker_id] -= period_hours(period)
+        self.on_shift[(day, period)].discard(worker_id)
+
+    def _contiguous_after_add(self, worker_id, day, period):
+        indexes = sorted(PERIODS.index(p) for p in self.assigned[worker_id][day] | {period})
+        return indexes[-1] - indexes[0] == len(indexes) - 1
+
+    def _contiguous_after_remove(self, worker_id, day, period):
+        remaining = sorted(PERIODS.index(p) for p in self.assigned[worker_id][day] - {period})
+        return not remaining or remaining[-1] - remaining[0] == len(remaining) - 1
+
+    def can_add(self, worker_id, day, period):
+        return ((day, period) in self.demand
+                and day in self.available[worker_id]
+                and period not in self.assigned[worker_id][day]
+                and self.hours[worker_id] + period_hours(period) <= self.capacity[worker_id]
+                and self._contiguous_after_add(worker_id, day, period))
+
+    def _uncovered_in(self, key):
+        on = self.on_shift[key]
+        return sum(1 for job in self.demand[key] if not (self.qualified[key][job] & on))
+
+    def _period_cost(self, key):
+        return UNCOVERED_WEIGHT * self._uncovered_in(key) + (EMPTY_PERIOD_WEIGHT if not self.on_shift[key] else 0)
+
+    def _worker_cost(self, worker_id):
+        return UNDER_HOURS_WEIGHT * max(0.0, self.capacity[worker_id] - self.hours[worker_id])
+
+    def _delta(self, worker_id, day, period, adding):
+        key = (day, period)
+        before = self._period_cost(key) + self._worker_cost(worker_id)
+        (self._add if adding else self._remove)(worker_id, day, period)
+        after = self._period_cost(key) + self._worker_cost(worker_id)
+        (self._remove if adding else self._add)(worker_id, day, period)
+        return after - before
+
+    def _greedy(self):
+        # Scarcest jobs first: fewest qualified and available people
+        jobs = [(key, job) for key, key_jobs in self.demand.items() for job in key_jobs]
+        jobs.sort(key=lambda kj: len([w for w in self.qualified[kj[0]][kj[1]] if kj[0][0] in self.available[w]]))
+        for (day, period), job in jobs:
+            if self.qualified[(day, period)][job] & self.on_shift[(day, period)]:
+                continue
+            candidates = [w for w in self.qualified[(day, period)][job] if self.can_add(w, day, period)]
+            if candidates:
+                best = max(candidates, key=lambda w: (self.capacity[w] - self.hours[w], -w))
+                self._add(best, day, period)
+
+    def _local_search(self, deadline):
+        moves = [(w.id, day, period) for w in self.workers for (day, period) in self.demand]
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            self.rng.shuffle(moves)
+            for worker_id, day, period in moves:
+                if period in self.assigned[worker_id][day]:
+                    if (self._contiguous_after_remove(worker_id, day, period)
+                            and self._delta(worker_id, day, period, adding=False) < 0):
+                        self._remove(worker_id, day, period)
+                        improved = True
+                elif self.can_add(worker_id, day, period) and self._delta(worker_id, day, period, adding=True) < 0:
+                    self._add(worker_id, day, period)
+                    improved = True
+                if time.perf_counter() >= deadline:
+                    break
+
+    def solve(self, time_budget=2.0):
+        started = time.perf_counter()
+        self._greedy()
+        self._local_search(started + time_budget)
+        shifts = []
+        for worker_id, days in self.assigned.items():
+            for day in DAYS:
+                if days[day]:
+                    periods = sorted(days[day], key=PERIODS.index)
+                    shifts.append(RosterShift(worker_id, day, PERIOD_WINDOWS[periods[0]][0], PERIOD_WINDOWS[periods[-1]][1]))
+        uncovered = [(day, period, job) for (day, period), jobs in self.demand.items() for job in jobs
+                     if not (self.qualified[(day, period)][job] & self.on_shift[(day, period)])]
+        return RosterSolution(shifts, uncovered, dict(self.hours), time.perf_counter() - started)
+
+
+def solve_week(workers, shop_jobs, start_of_week, time_budget=2.0, seed=0):
+    return RosterSolver(workers, shop_jobs, start_of_week, seed=seed).solve(time_budget)
@@ -0,0 +1,291 @@
+# Full-text order search: an SQLite FTS5 index kept in step with the orders, with prefix and typo-tolerant matching
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+SEARCH_LIMIT = 50
+# bm25 scores every match, so a word found in half the orders is ranked over its newest matches only;
+# the window widens when filters leave fewer than a page of them. An older order past the window is not
+# ranked even if it would score higher: ranking all of a common word's matches costs several times more.
+RANK_WINDOW = 1000
+
+# FTS5 columns and their bm25 weights: a hit on the order number or customer counts for more than one in the notes
+SEARCH_COLUMNS = ('reference', 'customer', 'items', 'notes')
+SEARCH_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# Words this long or longer may carry one typo, and from the longer length two
+TYPO_MIN_LENGTH = 4
+TWO_TYPOS_MIN_LENGTH = 8
+# Close spellings tried per word, best first
+TYPO_CANDIDATES = 5
+
+# Order ids per docid lookup when indexing a batch (under SQLite's parameter limit)
+DOCID_CHUNK = 500
+
+SearchHit = namedtuple('SearchHit', ['order_id', 'score', 'snippet'])
+
+
+def search_terms(text):
+    # Lower-cased words with accents dropped, as the unicode61 tokenizer splits them
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return re.findall(r'\w+', ''.join(c for c in text if not unicodedata.combining(c)))
+
+
+def order_document(order):
+    # (reference, customer, items, notes) text for one order record
+    return (order.order_id,
+            ' '.join(filter(None, (order.customer_name, order.customer_email, order.customer_contact))),
+            ' '.join(' '.join(filter(None, (item.name, item.notes))) for item in order.items),
+            order.notes or '')
+
+
+def allowed_typos(term):
+    # Only plain words: order numbers, phone numbers and postcodes are typed exactly
+    if not term.isalpha() or len(term) < TYPO_MIN_LENGTH:
+        return 0
+    return 2 if len(term) >= TWO_TYPOS_MIN_LENGTH else 1
+
+
+def _deletions(term, depth):
+    # Every string left by deleting up to `depth` characters
+    found = {term}
+    frontier = {term}
+    for _ in range(depth):
+        frontier = {t[:i] + t[i + 1:] for t in frontier for i in range(len(t))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    # Damerau-Levenshtein (adjacent swaps count once), giving up past `limit`
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellingIndex:
+    """The search vocabulary keyed by deletions, for finding near spellings.
+
+    Two words within k edits share a string reachable by at most k deletions
+    from each, so looking up a query word's deletions finds every candidate
+    without comparing against the whole vocabulary. Anything with digits in
+    (phone and order numbers) is left out; it is matched exactly or by prefix.
+    """
+
+    def __init__(self):
+        self.terms = set()
+        self._by_deletion = {}
+
+    def add(self, term):
+        typos = allowed_typos(term)
+        if not typos or term in self.terms:
+            return
+        self.terms.add(term)
+        for variant in _deletions(term, 2 if len(term) >= TWO_TYPOS_MIN_LENGTH - 2 else 1):
+            self._by_deletion.setdefault(variant, set()).add(term)
+
+    def remove(self, term):
+        if term not in self.terms:
+            return
+        self.terms.discard(term)
+        for variant in _deletions(term, 2 if len(term) >= TWO_TYPOS_MIN_LENGTH - 2 else 1):
+            terms = self._by_deletion.get(variant)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._by_deletion[variant]
+
+    def near(self, word):
+        # Vocabulary words within the typos `word` allows, closest first
+        typos = allowed_typos(word)
+        if not typos:
+            return []
+        candidates = set()
+        for variant in _deletions(word, typos):
+            candidates |= self._by_deletion.get(variant, set())
+        scored = sorted((edit_distance(word, term, typos), term) for term in candidates if term != word)
+        return [term for distance, term in scored if distance <= typos][:TYPO_CANDIDATES]
+
+
+class OrderSearch:
+    """Ranked full-text search over order numbers, customers, items and notes.
+
+    The FTS5 table is written in the same transaction as the order, so every
+    create, duplicate and delete updates it and it is never rebuilt. Each
+    query word matches as a prefix; a word that prefixes nothing in the
+    vocabulary is also tried as its nearest spellings. The spelling index is
+    kept current from the change feed: keyed order changes add just those
+    orders' words, anything wider reloads it from the FTS vocabulary. The
+    feed can't show a word losing its last order, so the vocabulary may
+    hold dead words; when a search finds nothing, its words are checked
+    against the FTS vocabulary, dead ones are dropped and it runs again.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._spelling = None
+        self._sorted_terms = []
+        self._seq = None
+        self._lock = threading.Lock()
+
+    # Writing, inside the order's transaction
+    @staticmethod
+    def index(conn, orders):
+        # Docids are looked up a chunk at a time and inserted as plain values, which FTS5 takes several
+        # times faster than an INSERT ... SELECT per order
+        conn.executemany("INSERT OR IGNORE INTO order_search_docs (order_id) VALUES (?)",
+                         [(order.order_id,) for order in orders])
+        docids = {}
+        for start in range(0, len(orders), DOCID_CHUNK):
+            chunk = [order.order_id for order in orders[start:start + DOCID_CHUNK]]
+            docids.update(conn.execute(f"SELECT order_id, docid FROM order_search_docs "
+                                       f"WHERE order_id IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        conn.executemany("INSERT INTO order_search (rowid, reference, customer, items, notes) VALUES (?, ?, ?, ?, ?)",
+                         [(docids[order.order_id],) + order_document(order) for order in orders])
+
+    @staticmethod
+    def unindex(conn, order_ids):
+        rows = [(r['docid'],) for order_id in order_ids for r in conn.execute(
+            "SELECT docid FROM order_search_docs WHERE order_id = ?", (order_id,))]
+        conn.executemany("DELETE FROM order_search WHERE rowid = ?", rows)
+        conn.executemany("DELETE FROM order_search_docs WHERE docid = ?", rows)
+
+    @staticmethod
+    def backfill(conn):
+        # Index every order at once, for a database that had orders before search
+        conn.execute("INSERT OR IGNORE INTO order_search_docs (order_id) SELECT order_id FROM orders")
+        conn.execute(
+            "INSERT INTO order_search (rowid, reference, customer, items, notes) "
+            "SELECT d.docid, o.order_id, trim(o.customer_name || ' ' || o.customer_email || ' ' || o.customer_contact), "
+            "COALESCE((SELECT group_concat(trim(i.name || ' ' || i.notes), ' ') FROM order_items i "
+            "WHERE i.order_id = o.order_id), ''), o.notes "
+            "FROM orders o JOIN order_search_docs d ON d.order_id = o.order_id")
+
+    # Spelling index
+    def _reload_spelling(self):
+        self._spelling = SpellingIndex()
+        terms = [r[0] for r in self.store.query("SELECT term FROM order_search_vocab")]
+        for term in terms:
+            self._spelling.add(term)
+        self._sorted_terms = sorted(terms)
+
+    def _add_terms(self, order_ids):
+        added = set()
+        for order_id in order_ids:
+            for row in self.store.query(
+                    "SELECT s.reference, s.customer, s.items, s.notes FROM order_search s "
+                    "JOIN order_search_docs d ON d.docid = s.rowid WHERE d.order_id = ?", (order_id,)):
+                added.update(term for text in row for term in search_terms(text))
+        for term in added:
+            self._spelling.add(term)
+            if not self._has_term(term):
+                insort(self._sorted_terms, term)
+
+    def refresh(self):
+        with self._lock:
+            seq = self.store.change_seq()
+            if self._seq == seq:
+                return
+            changes = self.store.changes_since(self._seq) if self._seq is not None else None
+            keys = None if changes is None else {key for _, topic, key in changes if topic == 'orders'}
+            if keys is None or None in keys:
+                self._reload_spelling()
+            elif keys:
+                self._add_terms(sorted(keys))
+            self._seq = seq
+
+    def _drop_terms(self, terms):
+        for term in terms:
+            self._spelling.remove(term)
+            i = bisect_left(self._sorted_terms, term)
+            if i < len(self._sorted_terms) and self._sorted_terms[i] == term:
+                del self._sorted_terms[i]
+
+    def _has_prefix(self, word, checked=False):
+        # Some vocabulary word starts with `word`; `checked` confirms it in the FTS index and drops dead words
+        upper = word[:-1] + chr(ord(word[-1]) + 1)
+        first, last = bisect_left(self._sorted_terms, word), bisect_left(self._sorted_terms, upper)
+        if first == last:
+            return False
+        if not checked or self.store.query(
+                "SELECT 1 FROM order_search_vocab WHERE term >= ? AND term < ? LIMIT 1", (word, upper)):
+            return True
+        self._drop_terms(self._sorted_terms[first:last])
+        return False
+
+    def _near(self, word, checked=False):
+        near = self._spelling.near(word)
+        while checked and near:
+            live = {r[0] for r in self.store.query(
+                f"SELECT term FROM order_search_vocab WHERE term IN ({','.join('?' * len(near))})", near)}
+            dead = [term for term in near if term not in live]
+            if not dead:
+                break
+            self._drop_terms(dead)
+            near = self._spelling.near(word)
+        return near
+
+    def _has_term(self, word):
+        i = bisect_left(self._sorted_terms, word)
+        return i < len(self._sorted_terms) and self._sorted_terms[i] == word
+
+    def match_expression(self, query, checked=False):
+        # FTS5 MATCH text: every word as a prefix, with close spellings of unknown words as alternatives
+        self.refresh()
+        groups = []
+        with self._lock:
+            for word in dict.fromkeys(search_terms(query)):
+                options = [f'"{word}"*']
+                if not self._has_prefix(word, checked):
+                    options += [f'"{term}"' for term in self._near(word, checked)]
+                groups.append(f"({' OR '.join(options)})")
+        return ' AND '.join(groups)
+
+    def search(self, query, limit=SEARCH_LIMIT, where='', params=()):
+        """Best matches first, as SearchHit rows.
+
+        `where`/`params` are extra conditions on the orders table (e.g. from
+        OrderRepository filters), starting with AND. Only the newest
+        RANK_WINDOW matches are ranked, widening while filters leave fewer
+        than `limit` of them. A query that finds nothing is tried once more
+        with the vocabulary checked, in case a dead word kept the typo
+        alternatives out.
+        """
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        hits = self._ranked(expression, limit, where, params)
+        if not hits:
+            checked = self.match_expression(query, checked=True)
+            if checked != expression:
+                hits = self._ranked(checked, limit, where, params)
+        return hits
+
+    def _ranked(self, expression, limit, where, params):
+        window = RANK_WINDOW
+        while True:
+            floor = self.store.query(
+                "SELECT rowid FROM order_search WHERE order_search MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (expression, window - 1))
+            rows = self.store.query(
+                f"SELECT d.order_id, bm25(order_search, {', '.join(map(str, SEARCH_WEIGHTS))}) AS score, "
+                "snippet(order_search, -1, '**', '**', '…', 8) AS snippet "
+                "FROM order_search JOIN order_search_docs d ON d.docid = order_search.rowid "
+                "JOIN orders o ON o.order_id = d.order_id "
+                f"WHERE order_search MATCH ? AND order_search.rowid >= ? {where} ORDER BY score LIMIT ?",
+                [expression, floor[0][0] if floor else 0, *params, limit])
+            if not floor or len(rows) >= limit:
+                return [SearchHit(r['order_id'], -r['score'], r['snippet']) for r in rows]
+            window *= 4
@@ -0,0 +1,193 @@
+# Seed data loaded into a fresh store the first time the app starts
+from datetime import datetime, timedelta
+
+SEED_WORKERS = [
+    {
+        'id': 1,
+        'name': 'John MacLeod',
+        'position': 'Butcher',
+        'availability': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'],
+        'unavailable_dates': [],
+        'hours_per_week': 40,
+        'skills': ['meat_cutting', 'customer_service', 'ordering'],
+        'color': '#FF6B6B'  # Red
+    },
+    {
+        'id': 2,
+        'name': 'Sarah Campbell',
+        'position': 'Shop Assistant',
+        'availability': ['Tuesday', 'Wednesday', 'Thursday', 'Saturday'],
+        'unavailable_dates': [],
+        'hours_per_week': 30,
+        'skills': ['customer_service', 'packaging', 'cleaning'],
+        'color': '#4ECDC4'  # Teal
+    },
+    {
+        'id': 3,
+        'name': 'Michael Fraser',
+        'position': 'Butcher',
+        'availability': ['Monday', 'Wednesday', 'Friday', 'Saturday'],
+        'unavailable_dates': [],
+        'hours_per_week': 35,
+        'skills': ['meat_cutting', 'preparation', 'quality_control'],
+        'color': '#45B7D1'  # Blue
+    },
+    {
+        'id': 4,
+        'name': 'Emma Wilson',
+        'position': 'Shop Assistant',
+        'availability': ['Monday', 'Tuesday', 'Friday', 'Saturday'],
+        'unavailable_dates': [],
+        'hours_per_week': 25,
+        'skills': ['customer_service', 'cash_handling', 'cleaning'],
+        'color': '#96CEB4'  # Green
+    }
+]
+
+SEED_SHOP_JOBS = {
+    'Monday': {
+        'morning': ['meat_preparation', 'display_setup', 'order_receiving'],
+        'afternoon': ['customer_service', 'cleaning', 'inventory_check'],
+        'evening': ['closing_duties', 'equipment_cleaning']
+    },
+    'Tuesday': {
+        'morning': ['butchery_work', 'display_refresh', 'supplier_meeting'],
+        'afternoon': ['customer_service', 'special_orders', 'training'],
+        'evening': ['closing_duties', 'waste_management']
+    },
+    'Wednesday': {
+        'morning': ['bulk_preparation', 'quality_checks', 'marketing_prep'],
+        'afternoon': ['customer_service', 'online_orders', 'cleaning'],
+        'evening': ['closing_duties', 'weekly_ordering']
+    },
+    'Thursday': {
+        'morning': ['specialty_cuts', 'display_setup', 'supplier_delivery'],
+        'afternoon': ['customer_service', 'event_preparation', 'staff_meeting'],
+        'evening': ['closing_duties', 'deep_cleaning']
+    },
+    'Friday': {
+        'morning': ['weekend_prep', 'bulk_butchery', 'display_setup'],
+        'afternoon': ['customer_service', 'rush_hours', 'quality_control'],
+        'evening': ['closing_duties', 'weekly_review']
+    },
+    'Saturday': {
+        'morning': ['opening_duties', 'fresh_display', 'customer_service'],
+        'afternoon': ['busy_shift', 'quick_restock', 'customer_service'],
+        'evening': ['early_closing', 'weekly_cleanup']
+    },
+    'Sunday': {
+        'morning': ['closed'],
+        'afternoon': ['closed'],
+        'evening': ['closed']
+    }
+}
+
+SEED_JOB_DESCRIPTIONS = {
+    'meat_preparation': 'Preparing daily meat cuts and portions for display',
+    'display_setup': 'Setting up attractive meat displays in shop front',
+    'order_receiving': 'Receiving and processing supplier deliveries',
+    'customer_service': 'Assisting customers, taking orders, handling payments',
+    'cleaning': 'Maintaining cleanliness standards throughout shop',
+    'inventory_check': 'Checking stock levels and recording inventory',
+    'closing_duties': 'Securing shop, cash handling, end-of-day procedures',
+    'equipment_cleaning': 'Deep cleaning of butchery equipment',
+    'butchery_work': 'Primary butchery work on larger cuts',
+    'display_refresh': 'Refreshing and rotating display items',
+    'supplier_meeting': 'Meeting with meat suppliers',
+    'special_orders': 'Handling custom orders and special requests',
+    'training': 'Staff training and skill development',
+    'bulk_preparation': 'Preparing bulk orders for restaurants/hotels',
+    'quality_checks': 'Quality control on all meat products',
+    'marketing_prep': 'Preparing for promotions and marketing',
+    'online_orders': 'Processing and packing online orders',
+    'weekly_ordering': 'Placing weekly orders with suppliers',
+    'specialty_cuts': 'Creating specialty cuts and value-added products',
+    'event_preparation': 'Preparing for local events/festivals',
+    'staff_meeting': 'Weekly staff coordination meeting',
+    'deep_cleaning': 'Thorough cleaning of entire shop',
+    'weekend_prep': 'Extra preparation for busy weekend trade',
+    'bulk_butchery': 'Butchery work for weekend demand',
+    'rush_hours': 'Extra staff during busy periods',
+    'weekly_review': 'Reviewing week performance and planning',
+    'opening_duties': 'Morning opening procedures',
+    'fresh_display': 'Setting up fresh daily displays',
+    'busy_shift': 'Handling Saturday customer volume',
+    'quick_restock': 'Rapid restocking during busy periods',
+    'early_closing': 'Saturday early closing procedures',
+    'weekly_cleanup': 'Major weekly cleaning',
+    'waste_management': 'Managing food waste and recycling'
+}
+
+SEED_PRODUCTS = [
+    {'display_name': 'Pork Shoulder', 'price': 8.50, 'price_unit': 'kg'},
+    {'display_name': 'Beef Mince', 'price': 9.00, 'price_unit': 'kg'},
+    {'display_name': 'Whole Chickens', 'price': 9.50, 'price_unit': 'each', 'nominal_weight_kg': 1.5},
+    {'display_name': 'Sausages', 'price': 8.00, 'price_unit': 'kg'},
+    {'display_name': 'Bacon', 'price': 11.00, 'price_unit': 'kg'},
+    {'display_name': 'Lamb Legs', 'price': 24.00, 'price_unit': 'each', 'nominal_weight_kg': 2.5},
+    {'display_name': 'Beef Ribeye', 'price': 32.00, 'price_unit': 'kg'},
+    {'display_name': 'Chicken Breasts', 'price': 12.00, 'price_unit': 'kg'},
+]
+
+# (customer, product, price per the product's price unit)
+SEED_CUSTOMER_PRICES = [
+    ('Highland Hotel', 'Beef Mince', 8.25),
+    ('Highland Hotel', 'Pork Shoulder', 7.90),
+    ('Local Cafe', 'Bacon', 10.25),
+]
+
+
+def seed_orders():
+    # Due dates are relative to the moment the store is first created
+    return [
+        {
+            'order_id': 'ORD000001',
+            'customer_name': 'Highland Hotel',
+            'customer_contact': '01463 123456',
+            'customer_email': 'manager@highlandhotel.com',
+            'items': [
+                {'name': 'Pork Shoulder', 'quantity': 10, 'unit': 'kg', 'notes': 'Boneless'},
+                {'name': 'Beef Mince', 'quantity': 5, 'unit': 'kg', 'notes': 'Lean'},
+                {'name': 'Whole Chickens', 'quantity': 3, 'unit': 'each', 'notes': 'Size 1.5kg each'}
+            ],
+            'total_price': 285.50,
+            'due_date': datetime.now() + timedelta(days=2),
+            'status': 'Pending',
+            'priority': 'High',
+            'notes': 'Deliver to back entrance before 10 AM',
+            'created_date': datetime.now() - timedelta(days=1)
+        },
+        {
+            'order_id': 'ORD000002',
+            'customer_name': 'Local Cafe',
+            'customer_contact': '01463 654321',
+            'customer_email': 'orders@localcafe.com',
+            'items': [
+                {'name': 'Sausages', 'quantity': 15, 'unit': 'kg', 'notes': 'Pork and herb'},
+                {'name': 'Bacon', 'quantity': 8, 'unit': 'kg', 'notes': 'Smoked back bacon'}
+            ],
+            'total_price': 192.75,
+            'due_date': datetime.now() + timedelta(days=5),
+            'status': 'In Progress',
+            'priority': 'Medium',
+            'notes': 'Will collect at 8:30 AM',
+            'created_date': datetime.now() - timedelta(days=2)
+        },
+        {
+            'order_id': 'ORD000003',
+            'customer_name': 'River Restaurant',
+            'customer_contact': '01463 789012',
+            'customer_email': 'chef@riverrestaurant.com',
+            'items': [
+                {'name': 'Lamb Legs', 'quantity': 4, 'unit': 'each', 'notes': 'Butterflied'},
+                {'name': 'Beef Ribeye', 'quantity': 12, 'unit': 'kg', 'notes': 'Aged 28 days'},
+                {'name': 'Chicken Breasts', 'quantity': 6, 'unit': 'kg', 'notes': 'Skinless'}
+            ],
+            'total_price': 420.00,
+            'due_date': datetime.now() + timedelta(days=1),
+            'status': 'Pending',
+            'priority': 'High',
+            'notes': 'Urgent - for weekend event',
+            'created_date': datetime.now()
+        }
+    ]
@@ -0,0 +1,132 @@
+# Shift intervals and the interval index used to query a week's roster
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from larder.timetable import DAYS, TIME_SLOTS
+
+SLOT_MINUTES = 30
+
+Shift = namedtuple('Shift', ['shift_id', 'worker_id', 'day', 'start', 'end'])
+
+
+def slot_to_minute(time_slot):
+    hours, minutes = time_slot.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def minute_to_slot(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def slot_range_to_interval(start_slot, end_slot):
+    # The timetable treats the end slot as worked, so the interval runs to its end
+    return slot_to_minute(start_slot), slot_to_minute(end_slot) + SLOT_MINUTES
+
+
+class IntervalIndex:
+    """Half-open [start, end) intervals sorted by start.
+
+    A max-end segment tree over the sorted array lets stabbing and overlap
+    queries skip every subtree that ends too early, so they cost
+    O(log n + k). Inserts rebuild the tree, which is fine for a roster that
+    is read far more often than it is written.
+    """
+
+    def __init__(self, shifts=()):
+        self._shifts = sorted(shifts, key=lambda s: (s.start, s.end, s.shift_id))
+        self._build()
+
+    def _build(self):
+        self._starts = [s.start for s in self._shifts]
+        size = 1
+        while size < len(self._shifts):
+            size *= 2
+        self._size = size
+        self._tree = [-1] * (2 * size)
+        for i, shift in enumerate(self._shifts):
+            self._tree[size + i] = shift.end
+        for i in range(size - 1, 0, -1):
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+
+    def __len__(self):
+        return len(self._shifts)
+
+    def __iter__(self):
+        return iter(self._shifts)
+
+    def add(self, shift):
+        i = bisect_right(self._starts, shift.start)
+        self._shifts.insert(i, shift)
+        self._build()
+
+    def remove(self, shift_id):
+        self._shifts = [s for s in self._shifts if s.shift_id != shift_id]
+        self._build()
+
+    def _collect(self, node, lo, hi, limit, after, out):
+        # Shifts among the first `limit` (start order) whose end is after `after`
+        if lo >= limit or self._tree[node] <= after:
+            return
+        if hi - lo == 1:
+            out.append(self._shifts[lo])
+            return
+        mid = (lo + hi) // 2
+        self._collect(2 * node, lo, mid, limit, after, out)
+        self._collect(2 * node + 1, mid, hi, limit, after, out)
+
+    def at(self, minute):
+        out = []
+        if self._shifts:
+            self._collect(1, 0, self._size, bisect_right(self._starts, minute), minute, out)
+        return out
+
+    def overlapping(self, start, end):
+        out = []
+        if self._shifts:
+            self._collect(1, 0, self._size, bisect_left(self._starts, end), start, out)
+        return out
+
+
+class WeekShifts:
+    """One week's shifts, indexed per day."""
+
+    def __init__(self, week_key, shifts):
+        self.week_key = week_key
+        by_day = {}
+        for shift in shifts:
+            by_day.setdefault(shift.day, []).append(shift)
+        self.days = {day: IntervalIndex(day_shifts) for day, day_shifts in by_day.items()}
+
+    def __iter__(self):
+        for day in DAYS:
+            if day in self.days:
+                yield from self.days[day]
+
+    def on_at(self, day, minute):
+        index = self.days.get(day)
+        return [s.worker_id for s in index.at(minute)] if index else []
+
+    def overlapping(self, day, start, end, worker_id=None):
+        index = self.days.get(day)
+        found = index.overlapping(start, end) if index else []
+        return [s for s in found if worker_id is None or s.worker_id == worker_id]
+
+    def hours_by_worker(self):
+        totals = {}
+        for shift in self:
+            totals[shift.worker_id] = totals.get(shift.worker_id, 0) + (shift.end - shift.start) / 60
+        return totals
+
+    def slot_map(self):
+        # {day: {time_slot: [worker_id, ...]}} for the grid renderer, one stab per slot
+        week = {}
+        for day, index in self.days.items():
+            slots = {}
+            for slot in TIME_SLOTS:
+                # Assignment order, as the per-slot lists used to keep it
+                on_shift = sorted(index.at(slot_to_minute(slot)), key=lambda s: s.shift_id)
+                worker_ids = list(dict.fromkeys(s.worker_id for s in on_shift))
+                if worker_ids:
+                    slots[slot] = worker_ids
+            week[day] = slots
+        return week
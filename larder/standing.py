@@ -0,0 +1,228 @@
+# Standing orders: weekly order templates per customer, turned into concrete orders over a horizon in one batch
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from larder.orders import ORDER_PRIORITIES, Order, OrderItem, as_item
+from larder.timetable import DAYS
+
+# Weeks ahead the scheduler fills by default, and the most it will go
+HORIZON_WEEKS = 4
+MAX_HORIZON_WEEKS = 13
+
+StandingOrder = namedtuple('StandingOrder', [
+    'id', 'customer_name', 'customer_contact', 'customer_email', 'priority', 'notes', 'items', 'days', 'due_time',
+    'every_weeks', 'skip_holidays', 'starts_on', 'ends_on', 'active'])
+Holiday = namedtuple('Holiday', ['day', 'name'])
+Materialised = namedtuple('Materialised', ['created', 'skipped_holidays', 'until', 'elapsed'])
+
+
+def standing_dates(template, first, last, holidays=frozenset()):
+    """Due days of a template from `first` to `last` inclusive, and the holidays it skipped.
+
+    Weeks are counted from the Monday of the template's start, so every
+    second week means the start week, two weeks on, and so on.
+    """
+    first = max(first, template.starts_on)
+    if template.ends_on:
+        last = min(last, template.ends_on)
+    anchor = template.starts_on - timedelta(days=template.starts_on.weekday())
+    step = timedelta(days=7 * template.every_weeks)
+    days = []
+    for weekday in {DAYS.index(day) for day in template.days}:
+        # First such weekday on or after `first`, moved on to the next week the template runs in
+        day = first + timedelta(days=(weekday - first.weekday()) % 7)
+        day += timedelta(days=7 * (-((day - anchor).days // 7) % template.every_weeks))
+        while day <= last:
+            days.append(day)
+            day += step
+    due, skipped = [], []
+    for day in sorted(days):
+        (skipped if template.skip_holidays and day in holidays else due).append(day)
+    return due, skipped
+
+
+def standing_order_fields(customer_name, customer_contact, customer_email, priority, notes, items, days, due_time,
+                          every_weeks, skip_holidays, starts_on, ends_on):
+    # Validated column values for a template, as stored
+    items = [as_item(item) for item in items]
+    if not customer_name or not customer_contact:
+        raise ValueError("A standing order needs a customer name and contact number")
+    if not items:
+        raise ValueError("A standing order needs at least one item")
+    if not days or any(day not in DAYS for day in days):
+        raise ValueError(f"Days must be chosen from {', '.join(DAYS)}")
+    if priority not in ORDER_PRIORITIES:
+        raise ValueError(f"Priority must be one of {', '.join(ORDER_PRIORITIES)}")
+    if every_weeks < 1:
+        raise ValueError("A standing order repeats at least every week")
+    if ends_on and ends_on < starts_on:
+        raise ValueError("A standing order can't end before it starts")
+    return (customer_name, customer_contact, customer_email or '', priority, notes or '',
+            json.dumps([list(item) for item in items]), json.dumps(sorted(days, key=DAYS.index)),
+            due_time.hour * 60 + due_time.minute, every_weeks, int(bool(skip_holidays)), starts_on.isoformat(),
+            ends_on.isoformat() if ends_on else None)
+
+
+class StandingOrders:
+    """Standing order templates, shop holidays and the scheduler that fills the order book from them.
+
+    Every order materialise() writes is recorded in standing_order_runs
+    against its template and due day, and the claim runs inside the same
+    transaction as the order insert. A rerun, a second session or a cron
+    job over an overlapping horizon therefore adds only the days nobody has
+    written yet. A run day stays claimed if staff delete its order, so a
+    cancelled week isn't brought back. A holiday is not claimed, so
+    removing the holiday lets the next run fill that day. The batch is
+    priced in one pass and written in one transaction.
+    """
+
+    def __init__(self, store, pricing):
+        self.store = store
+        self.pricing = pricing
+
+    # Templates
+    @staticmethod
+    def _from_row(row):
+        return StandingOrder(
+            row['id'], row['customer_name'], row['customer_contact'], row['customer_email'], row['priority'],
+            row['notes'], tuple(OrderItem(*item) for item in json.loads(row['items'])), tuple(json.loads(row['days'])),
+            (datetime.min + timedelta(minutes=row['due_minute'])).time(),
+            row['every_weeks'], bool(row['skip_holidays']), date.fromisoformat(row['starts_on']),
+            row['ends_on'] and date.fromisoformat(row['ends_on']), bool(row['active']))
+
+    def templates(self, active_only=False):
+        where = "WHERE active = 1 " if active_only else ""
+        return [self._from_row(row) for row in self.store.query(
+            f"SELECT * FROM standing_orders {where}ORDER BY customer_name, id")]
+
+    def add(self, customer_name, customer_contact, items, days, due_time, customer_email='', priority='Medium',
+            notes='', every_weeks=1, skip_holidays=True, starts_on=None, ends_on=None):
+        fields = standing_order_fields(customer_name, customer_contact, customer_email, priority, notes, items, days,
+                                       due_time, every_weeks, skip_holidays, starts_on or date.today(), ends_on)
+        with self.store.transaction() as conn:
+            standing_id = conn.execute(
+                "INSERT INTO standing_orders (customer_name, customer_contact, customer_email, priority, notes, items, "
+                "days, due_minute, every_weeks, skip_holidays, starts_on, ends_on) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", fields).lastrowid
+            self.store.record_change(conn, 'standing', str(standing_id))
+        return standing_id
+
+    def from_order(self, order, every_weeks=1, skip_holidays=True):
+        # A template repeating an existing order on its weekday and time, from its next occurrence
+        return self.add(order.customer_name, order.customer_contact, order.items, [DAYS[order.due_date.weekday()]],
+                        order.due_date.time(), order.customer_email, order.priority, order.notes, every_weeks,
+                        skip_holidays, max(order.due_date.date() + timedelta(days=1), date.today()))
+
+    def set_active(self, standing_id, active):
+        with self.store.transaction() as conn:
+            conn.execute("UPDATE standing_orders SET active = ? WHERE id = ?", (int(active), standing_id))
+            self.store.record_change(conn, 'standing', str(standing_id))
+
+    def remove(self, standing_id):
+        # Orders already written stay in the order book
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM standing_order_runs WHERE standing_id = ?", (standing_id,))
+            conn.execute("DELETE FROM standing_orders WHERE id = ?", (standing_id,))
+            self.store.record_change(conn, 'standing', str(standing_id))
+
+    # Holidays
+    def holidays(self, first=None, last=None):
+        rows = self.store.query("SELECT day, name FROM holidays WHERE day >= ? AND day <= ? ORDER BY day",
+                                ((first or date.min).isoformat(), (last or date.max).isoformat()))
+        return [Holiday(date.fromisoformat(r['day']), r['name']) for r in rows]
+
+    def add_holiday(self, day, name=''):
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO holidays (day, name) VALUES (?, ?) ON CONFLICT (day) DO UPDATE SET name = "
+                         "excluded.name", (day.isoformat(), name))
+            self.store.record_change(conn, 'standing')
+
+    def remove_holiday(self, day):
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM holidays WHERE day = ?", (day.isoformat(),))
+            self.store.record_change(conn, 'standing')
+
+    # Scheduling
+    def last_run_day(self, standing_id):
+        # The latest due day the scheduler has written for a template, or None
+        day = self.store.query("SELECT MAX(due_day) FROM standing_order_runs WHERE standing_id = ?",
+                               (standing_id,))[0][0]
+        return day and date.fromisoformat(day)
+
+    def pending(self, today, weeks=HORIZON_WEEKS):
+        # (template, due day) pairs from today to the horizon not written yet, soonest first
+        until = today + timedelta(weeks=min(weeks, MAX_HORIZON_WEEKS)) - timedelta(days=1)
+        templates = self.templates(active_only=True)
+        holidays = {h.day for h in self.holidays(today, until)}
+        written = {(r['standing_id'], r['due_day']) for r in self.store.query(
+            "SELECT standing_id, due_day FROM standing_order_runs WHERE due_day >= ? AND due_day <= ?",
+            (today.isoformat(), until.isoformat()))}
+        due, skipped = [], 0
+        for template in templates:
+            days, holiday_days = standing_dates(template, today, until, holidays)
+            due.extend((template, day) for day in days if (template.id, day.isoformat()) not in written)
+            skipped += len(holiday_days)
+        return sorted(due, key=lambda pair: (pair[1], pair[0].id)), skipped, until
+
+    def materialise(self, today=None, weeks=HORIZON_WEEKS, now=None):
+        """Write the orders every active template has due from today to `weeks` ahead.
+
+        Returns a Materialised tally. Ids come from one allocation, the whole
+        batch is priced in a single frame, and the claim plus insert is one
+        transaction. Running it again is a no-op until a template, a holiday
+        or the date changes.
+        """
+        started = time.perf_counter()
+        now = now or datetime.now()
+        today = today or now.date()
+        due, skipped, until = self.pending(today, weeks)
+        if not due:
+            return Materialised(0, skipped, until, time.perf_counter() - started)
+        orders = [Order(order_id, template.customer_name, template.customer_contact, template.customer_email, 0.0,
+                        datetime.combine(day, template.due_time), 'Pending', template.priority, template.notes, now,
+                        template.items)
+                  for order_id, (template, day) in zip(self.store.orders.next_ids(len(due)), due)]
+        totals = self.pricing.totals_for(orders)
+        orders = [order._replace(total_price=totals.get(order.order_id, 0.0)) for order in orders]
+        runs = {order.order_id: (template.id, day.isoformat()) for order, (template, day) in zip(orders, due)}
+
+        def claim(conn, orders):
+            # Only days no other writer got to first: the ids are freshly allocated, so a run row
+            # carrying one of them is a row this insert added
+            conn.executemany("INSERT OR IGNORE INTO standing_order_runs (standing_id, due_day, order_id) "
+                             "VALUES (?, ?, ?)", [runs[order.order_id] + (order.order_id,) for order in orders])
+            mine = {r['order_id'] for r in conn.execute(
+                "SELECT order_id FROM standing_order_runs WHERE due_day >= ? AND due_day <= ?",
+                (today.isoformat(), until.isoformat()))}
+            return [order for order in orders if order.order_id in mine]
+
+        created = self.store.orders.add_many(orders, claim=claim)
+        return Materialised(len(created), skipped, until, time.perf_counter() - started)
+
+
+def main(argv=None):
+    # For a daily cron job: python -m larder.standing --weeks 4
+    from larder.pricing import PricingEngine
+    from larder.store import LarderStore
+
+    parser = argparse.ArgumentParser(description="Write the orders standing order templates have due.")
+    parser.add_argument('--db', default=os.environ.get('LARDER_DB', 'larder.db'))
+    parser.add_argument('--weeks', type=int, default=HORIZON_WEEKS)
+    args = parser.parse_args(argv)
+    store = LarderStore(args.db)
+    try:
+        result = StandingOrders(store, PricingEngine(store)).materialise(weeks=args.weeks)
+    finally:
+        store.close()
+    print(f"{result.created} orders written up to {result.until:%d/%m/%Y}, {result.skipped_holidays} holiday dates "
+          f"skipped ({result.elapsed * 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
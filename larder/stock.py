@@ -0,0 +1,109 @@
+# Stock ledger: deliveries, stocktakes and adjustments per product, drawn down by completed orders
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from larder.orders import from_db_datetime, to_db_datetime
+from larder.pricing import normalise_names
+from larder.products import product_key
+
+# A delivery adds stock, a count (the inventory check) sets it, an adjustment moves it either way (waste, breakage)
+STOCK_KINDS = ('delivery', 'count', 'adjustment')
+
+# Units order lines are kept in for stock, and how the others convert
+STOCK_UNITS = {'kg': ('kg', 1.0), 'g': ('kg', 0.001), 'each': ('each', 1.0), 'pack': ('pack', 1.0)}
+
+StockMove = namedtuple('StockMove', ['seq', 'at', 'product', 'unit', 'quantity', 'kind', 'note'])
+StockLevel = namedtuple('StockLevel', ['product', 'unit', 'on_hand', 'counted_at'])
+
+# Per product and unit: the stock on hand from its latest count on (or from its first move if never counted),
+# and the moment that starting point was taken. The latest count is the last count row, so every move from
+# it on, the count included, adds up to the level.
+START_SQL = """
+WITH last_count AS (
+    SELECT product, unit, MAX(seq) AS seq FROM stock_moves WHERE kind = 'count' GROUP BY product, unit
+), starts AS (
+    SELECT m.product, m.unit, SUM(m.quantity) AS on_hand, c.at AS counted_at, COALESCE(c.at, MIN(m.at)) AS since
+    FROM stock_moves m
+    LEFT JOIN last_count lc ON lc.product = m.product AND lc.unit = m.unit
+    LEFT JOIN stock_moves c ON c.seq = lc.seq
+    WHERE m.seq >= COALESCE(lc.seq, 0)
+    GROUP BY m.product, m.unit
+)"""
+
+
+def stock_unit(unit, quantity):
+    # (unit, quantity) in the unit stock is kept in
+    unit, factor = STOCK_UNITS.get(unit, (unit, 1.0))
+    return unit, quantity * factor
+
+
+def normalise_lines(lines):
+    # Vectorised product_key() and stock_unit() over a frame of name/unit/quantity order lines
+    lines = lines.assign(product=normalise_names(lines['name']))
+    factors = lines['unit'].map({unit: factor for unit, (_, factor) in STOCK_UNITS.items()}).fillna(1.0)
+    lines['unit'] = lines['unit'].map({unit: to for unit, (to, _) in STOCK_UNITS.items()}).fillna(lines['unit'])
+    lines['quantity'] = lines['quantity'] * factors
+    return lines
+
+
+class StockLedger:
+    """Append-only stock movements per product and unit.
+
+    The latest count of a product is its level at that moment; deliveries
+    and adjustments since move it, and so do the lines of orders completed
+    and due after it. A product never counted starts from zero at its first
+    movement. Every write goes on the change feed under 'stock'.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._levels = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def record(self, product, unit, quantity, kind, note='', at=None):
+        if kind not in STOCK_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(STOCK_KINDS)}")
+        unit, quantity = stock_unit(unit, quantity)
+        key = product_key(product)
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO stock_moves (at, product, unit, quantity, kind, note) VALUES (?, ?, ?, ?, ?, ?)",
+                         (to_db_datetime(at or datetime.now()), key, unit, quantity, kind, note))
+            self.store.record_change(conn, 'stock', key)
+
+    def moves(self, product=None, limit=50):
+        # Latest first
+        where, params = ("WHERE product = ? ", [product_key(product)]) if product else ("", [])
+        rows = self.store.query(f"SELECT seq, at, product, unit, quantity, kind, note FROM stock_moves {where}"
+                                "ORDER BY seq DESC LIMIT ?", params + [limit])
+        return [StockMove(r['seq'], from_db_datetime(r['at']), *tuple(r)[2:]) for r in rows]
+
+    def levels(self):
+        # {(product, unit): StockLevel} for everything the ledger has seen, worked out again only when
+        # stock moves or an order changes
+        key = (self.store.change_seq('stock'), self.store.change_seq('orders'))
+        with self._lock:
+            if self._key != key:
+                used = self._used_since()
+                self._levels = {
+                    (r['product'], r['unit']): StockLevel(
+                        r['product'], r['unit'], round(r['on_hand'] - used.get((r['product'], r['unit']), 0.0), 3),
+                        from_db_datetime(r['counted_at']) if r['counted_at'] else None)
+                    for r in self.store.query(START_SQL + " SELECT * FROM starts")}
+                self._key = key
+            return self._levels
+
+    def _used_since(self):
+        # Completed order quantities per (product, unit) due after each product's starting point, summed in
+        # SQL. Item names match on lower(trim(name)) and units convert as stock_unit() does.
+        units = [value for unit, (to, factor) in STOCK_UNITS.items() for value in (unit, to, factor)]
+        rows = self.store.query(
+            START_SQL + f", units (line_unit, unit, factor) AS (VALUES {', '.join(['(?, ?, ?)'] * len(STOCK_UNITS))}) "
+            "SELECT s.product, s.unit, SUM(i.quantity * COALESCE(u.factor, 1.0)) FROM order_items i "
+            "JOIN orders o ON o.order_id = i.order_id "
+            "LEFT JOIN units u ON u.line_unit = i.unit "
+            "JOIN starts s ON s.product = lower(trim(i.name)) AND s.unit = COALESCE(u.unit, i.unit) "
+            "WHERE o.status = 'Completed' AND o.due_date > (SELECT MIN(since) FROM starts) AND o.due_date > s.since "
+            "GROUP BY s.product, s.unit", units)
+        return {(r[0], r[1]): r[2] for r in rows}
@@ -0,0 +1,573 @@
+# SQLite-backed storage shared by every page of the app
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from larder import seed
+from larder.history import ALL_WORKERS, History, shift_event_data, worker_event_data
+from larder.orders import ORDER_ID_DIGITS, ORDER_ID_PREFIX, OrderRepository, format_order_id
+from larder.products import ProductCatalogue
+from larder.search import OrderSearch
+from larder.shifts import SLOT_MINUTES, Shift, WeekShifts, slot_to_minute
+from larder.timetable import DAYS, PERIODS, timetable_change_key
+from larder.workers import Worker, WorkerRegistry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    position TEXT NOT NULL,
+    availability TEXT NOT NULL DEFAULT '[]',
+    unavailable_dates TEXT NOT NULL DEFAULT '[]',
+    hours_per_week INTEGER NOT NULL,
+    skills TEXT NOT NULL DEFAULT '[]',
+    color TEXT NOT NULL DEFAULT '#CCCCCC'
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    customer_name TEXT NOT NULL,
+    customer_contact TEXT NOT NULL,
+    customer_email TEXT NOT NULL DEFAULT '',
+    total_price REAL NOT NULL DEFAULT 0,
+    due_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT '',
+    created_date TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_orders_due_date ON orders (due_date, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status_due ON orders (status, due_date, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_priority_due ON orders (priority, due_date, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status_priority_due ON orders (status, priority, due_date, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_due ON orders (customer_name, due_date, order_id);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL REFERENCES orders (order_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    unit TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (order_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS shifts (
+    id INTEGER PRIMARY KEY,
+    week_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    worker_id INTEGER NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shifts_week_day ON shifts (week_key, day, start_minute);
+CREATE INDEX IF NOT EXISTS idx_shifts_worker_week ON shifts (worker_id, week_key);
+
+CREATE TABLE IF NOT EXISTS timetable_versions (
+    week_key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS shop_jobs (
+    day TEXT NOT NULL,
+    period TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    job TEXT NOT NULL,
+    PRIMARY KEY (day, period, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS products (
+    name TEXT PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    price REAL NOT NULL,
+    price_unit TEXT NOT NULL,
+    nominal_weight_kg REAL
+);
+
+CREATE TABLE IF NOT EXISTS customer_prices (
+    customer_name TEXT NOT NULL,
+    product TEXT NOT NULL REFERENCES products (name) ON DELETE CASCADE,
+    price REAL NOT NULL,
+    PRIMARY KEY (customer_name, product)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_changes_topic ON changes (topic, seq);
+
+CREATE TABLE IF NOT EXISTS job_descriptions (
+    job TEXT PRIMARY KEY,
+    description TEXT NOT NULL DEFAULT ''
+);
+
+CREATE TABLE IF NOT EXISTS stock_moves (
+    seq INTEGER PRIMARY KEY,
+    at TEXT NOT NULL,
+    product TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    kind TEXT NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_stock_moves_product ON stock_moves (product, seq);
+
+CREATE TABLE IF NOT EXISTS order_search_docs (
+    docid INTEGER PRIMARY KEY,
+    order_id TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS order_search USING fts5 (
+    reference, customer, items, notes, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS order_search_vocab USING fts5vocab (order_search, 'row');
+
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    at TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    part TEXT NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_key ON events (entity, key, seq);
+CREATE INDEX IF NOT EXISTS idx_events_part ON events (entity, part, seq);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    entity TEXT NOT NULL,
+    part TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    at TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (entity, part, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS history_parts (
+    entity TEXT NOT NULL,
+    part TEXT NOT NULL,
+    pending INTEGER NOT NULL,
+    PRIMARY KEY (entity, part)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL,
+    claimed_at TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_due ON notifications (status, next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_order ON notifications (order_id, id);
+
+CREATE TABLE IF NOT EXISTS standing_orders (
+    id INTEGER PRIMARY KEY,
+    customer_name TEXT NOT NULL,
+    customer_contact TEXT NOT NULL,
+    customer_email TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT '',
+    items TEXT NOT NULL,
+    days TEXT NOT NULL,
+    due_minute INTEGER NOT NULL,
+    every_weeks INTEGER NOT NULL DEFAULT 1,
+    skip_holidays INTEGER NOT NULL DEFAULT 1,
+    starts_on TEXT NOT NULL,
+    ends_on TEXT,
+    active INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS standing_order_runs (
+    standing_id INTEGER NOT NULL,
+    due_day TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    PRIMARY KEY (standing_id, due_day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_standing_order_runs_day ON standing_order_runs (due_day);
+
+CREATE TABLE IF NOT EXISTS holidays (
+    day TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+"""
+
+# What the change feed reports on; pages list the ones they display
+CHANGE_TOPICS = ('orders', 'workers', 'timetable', 'shop_jobs', 'products', 'stock', 'standing')
+
+# Feed rows kept; a reader further behind than this is told everything changed
+CHANGE_FEED_LENGTH = 5000
+# A batch touching more keys than this goes on the feed as one keyless change, which readers reload on
+KEYED_CHANGE_LIMIT = 1000
+
+WORKER_JSON_FIELDS = ('availability', 'unavailable_dates', 'skills')
+
+UPSERT_JOB_DESCRIPTION = ("INSERT INTO job_descriptions (job, description) VALUES (?, ?) "
+                          "ON CONFLICT (job) DO UPDATE SET description = excluded.description")
+
+
+
+def _period_order(period):
+    return PERIODS.index(period) if period in PERIODS else len(PERIODS)
+
+
+class LarderStore:
+    """Persistent store for workers, orders, timetable and shop jobs.
+
+    One instance is shared by every Streamlit session; a single connection
+    guarded by a lock keeps writes serialised while WAL lets other processes
+    read the file concurrently. Every write also appends to the change feed
+    in the same transaction, so sessions and caches in any process can tell
+    what moved since they last looked.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self.transaction() as conn:
+            conn.executescript(SCHEMA)
+        self._migrate_slot_timetable()
+        self._migrate_order_versions()
+        self.orders = OrderRepository(self)
+        self._migrate_order_ids()
+        self.search = OrderSearch(self)
+        self._migrate_order_search()
+        self.products = ProductCatalogue(self)
+        self.history = History(self)
+        self._migrate_history()
+        self._worker_registry = None
+        self._worker_registry_seq = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        # Serialises writers and commits (or rolls back) as one unit
+        with self._lock, self._conn:
+            yield self._conn
+
+    # Change feed
+    @staticmethod
+    def record_change(conn, topic, key=None):
+        # Call inside the writing transaction so the feed never runs ahead of the data
+        seq = conn.execute("INSERT INTO changes (topic, key) VALUES (?, ?)", (topic, key)).lastrowid
+        if seq % 100 == 0:
+            conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGE_FEED_LENGTH,))
+
+    @staticmethod
+    def record_changes(conn, topic, keys):
+        # One entry per key, so readers patch just those; a very large batch is one keyless entry instead
+        keys = list(keys)
+        if len(keys) > KEYED_CHANGE_LIMIT:
+            keys = [None]
+        conn.executemany("INSERT INTO changes (topic, key) VALUES (?, ?)", [(topic, key) for key in keys])
+        seq = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGE_FEED_LENGTH,))
+
+    def change_seq(self, topic=None):
+        # Latest feed position, overall or for one topic; a cheap version stamp for caches
+        if topic is None:
+            return self.query("SELECT COALESCE(MAX(seq), 0) FROM changes")[0][0]
+        return self.query("SELECT COALESCE(MAX(seq), 0) FROM changes WHERE topic = ?", (topic,))[0][0]
+
+    def _feed_covers(self, seq):
+        oldest = self.query("SELECT MIN(seq) FROM changes")[0][0]
+        return oldest is None or seq >= oldest - 1
+
+    def changes_since(self, seq, topic=None):
+        # (seq, topic, key) rows after `seq`, or None if they have been trimmed and the caller must reload
+        if not self._feed_covers(seq):
+            return None
+        if topic is not None:
+            return [tuple(r) for r in self.query(
+                "SELECT seq, topic, key FROM changes WHERE topic = ? AND seq > ? ORDER BY seq", (topic, seq))]
+        return [tuple(r) for r in self.query("SELECT seq, topic, key FROM changes WHERE seq > ? ORDER BY seq", (seq,))]
+
+    def changed_topics(self, seq):
+        if not self._feed_covers(seq):
+            return set(CHANGE_TOPICS)
+        return {r[0] for r in self.query("SELECT DISTINCT topic FROM changes WHERE seq > ?", (seq,))}
+
+    def allocate(self, name, count=1, start=None):
+        """Reserve `count` consecutive numbers from a named counter.
+
+        The increment is a single UPDATE ... RETURNING, which SQLite runs under
+        its write lock, so concurrent sessions and other processes sharing the
+        file never get overlapping numbers. `start` is a query giving the value
+        a missing counter begins from.
+        """
+        with self.transaction() as conn:
+            if not conn.execute("SELECT 1 FROM sequences WHERE name = ?", (name,)).fetchone():
+                conn.execute(f"INSERT INTO sequences (name, value) VALUES (?, ({start or 0})) "
+                             "ON CONFLICT (name) DO NOTHING", (name,))
+            last = conn.execute("UPDATE sequences SET value = value + ? WHERE name = ? RETURNING value",
+                                (count, name)).fetchone()[0]
+        return range(last - count + 1, last + 1)
+
+    def seed_if_empty(self):
+        # Only a brand new database gets the demo data
+        with self._lock:
+            if self.query("SELECT 1 FROM workers LIMIT 1"):
+                return False
+            for worker in seed.SEED_WORKERS:
+                self.add_worker(worker)
+            for order in seed.seed_orders():
+                self.orders.add(order)
+            for day, periods in seed.SEED_SHOP_JOBS.items():
+                for period, jobs in periods.items():
+                    for job in jobs:
+                        self.add_shop_job(day, period, job)
+            with self.transaction() as conn:
+                conn.executemany(UPSERT_JOB_DESCRIPTION, seed.SEED_JOB_DESCRIPTIONS.items())
+                self.record_change(conn, 'shop_jobs')
+            for product in seed.SEED_PRODUCTS:
+                self.products.upsert(**product)
+            for customer_name, product_name, price in seed.SEED_CUSTOMER_PRICES:
+                self.products.set_customer_price(customer_name, product_name, price)
+            return True
+
+    # Workers
+    @staticmethod
+    def _worker_from_row(row):
+        return Worker(**{field: tuple(json.loads(row[field])) if field in WORKER_JSON_FIELDS else row[field]
+                         for field in Worker._fields})
+
+    def list_workers(self):
+        return [self._worker_from_row(r) for r in self.query("SELECT * FROM workers ORDER BY id")]
+
+    def add_worker(self, worker):
+        return self.add_workers([worker])[0]
+
+    def add_workers(self, workers):
+        ids = []
+        with self.transaction() as conn:
+            for worker in workers:
+                cur = conn.execute(
+                    "INSERT INTO workers (id, name, position, availability, unavailable_dates, hours_per_week, skills, color) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (worker.get('id'), worker['name'], worker['position'],
+                     json.dumps(worker.get('availability', [])), json.dumps(worker.get('unavailable_dates', [])),
+                     worker['hours_per_week'], json.dumps(worker.get('skills', [])), worker.get('color', '#CCCCCC')))
+                ids.append(cur.lastrowid)
+            self.history.record(conn, 'worker', [(ALL_WORKERS, worker_id, 'created', worker_event_data(worker_id, worker))
+                                                 for worker_id, worker in zip(ids, workers)])
+            self.record_change(conn, 'workers', str(ids[0]) if len(ids) == 1 else None)
+        return ids
+
+    def remove_worker(self, worker_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+            self.history.record(conn, 'worker', [(ALL_WORKERS, worker_id, 'deleted', None)])
+            self.record_change(conn, 'workers', str(worker_id))
+
+    def worker_registry(self):
+        # Rebuilt lazily when the feed shows a worker change from any process
+        with self._lock:
+            seq = self.change_seq('workers')
+            if self._worker_registry is None or self._worker_registry_seq != seq:
+                self._worker_registry = WorkerRegistry(self.list_workers())
+                self._worker_registry_seq = seq
+            return self._worker_registry
+
+    def _migrate_slot_timetable(self):
+        # Older databases stored one row per worker per half-hour slot; fold them into shifts
+        if not self.query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'timetable'"):
+            return
+        runs = {}
+        rows = self.query("SELECT week_key, day, worker_id, time_slot FROM timetable")
+        for row in sorted(rows, key=lambda r: (r['week_key'], r['day'], r['worker_id'], slot_to_minute(r['time_slot']))):
+            key = (row['week_key'], row['day'], row['worker_id'])
+            minute = slot_to_minute(row['time_slot'])
+            worker_runs = runs.setdefault(key, [])
+            if worker_runs and worker_runs[-1][1] == minute:
+                worker_runs[-1][1] = minute + SLOT_MINUTES
+            else:
+                worker_runs.append([minute, minute + SLOT_MINUTES])
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO shifts (week_key, day, worker_id, start_minute, end_minute) VALUES (?, ?, ?, ?, ?)",
+                [(week_key, day, worker_id, start, end)
+                 for (week_key, day, worker_id), worker_runs in runs.items() for start, end in worker_runs])
+            conn.execute("DROP TABLE timetable")
+
+    def _migrate_order_ids(self):
+        # Widen ORDnnn ids to the current padding so they keep sorting in number order
+        rows = self.query(
+            "SELECT order_id FROM orders WHERE order_id GLOB ? AND length(order_id) < ?",
+            (f"{ORDER_ID_PREFIX}[0-9]*", len(ORDER_ID_PREFIX) + ORDER_ID_DIGITS))
+        renames = {r['order_id']: format_order_id(int(r['order_id'][len(ORDER_ID_PREFIX):]))
+                   for r in rows if r['order_id'][len(ORDER_ID_PREFIX):].isdigit()}
+        taken = self.orders.existing_ids(renames.values())
+        renames = {old: new for old, new in renames.items() if new not in taken}
+        if not renames:
+            return
+        with self.transaction() as conn:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            for table in ('orders', 'order_items'):
+                conn.executemany(f"UPDATE {table} SET order_id = ? WHERE order_id = ?",
+                                 [(new, old) for old, new in renames.items()])
+
+    def _migrate_order_versions(self):
+        # Optimistic versioning added orders.version after the table existed
+        columns = {r['name'] for r in self.query("PRAGMA table_info(orders)")}
+        if 'version' not in columns:
+            with self.transaction() as conn:
+                conn.execute("ALTER TABLE orders ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+    def _migrate_order_search(self):
+        # Orders from before the search index are indexed once, in one statement
+        if self.query("SELECT 1 FROM order_search_docs LIMIT 1") or not self.query("SELECT 1 FROM orders LIMIT 1"):
+            return
+        with self.transaction() as conn:
+            self.search.backfill(conn)
+
+    def _migrate_history(self):
+        # A database from before the event log gets a baseline snapshot of what it already holds
+        if self.query("SELECT 1 FROM events LIMIT 1") or self.query("SELECT 1 FROM snapshots LIMIT 1"):
+            return
+        if not any(self.query(f"SELECT 1 FROM {table} LIMIT 1") for table in ('workers', 'orders', 'shifts')):
+            return
+        with self.transaction() as conn:
+            self.history.record_baseline(conn)
+
+    # Timetable
+    def get_week_shifts(self, week_key):
+        rows = self.query(
+            "SELECT id, worker_id, day, start_minute, end_minute FROM shifts WHERE week_key = ?", (week_key,))
+        return WeekShifts(week_key, [Shift(*row) for row in rows])
+
+    def get_day_shifts(self, week_key, day, start, end):
+        # Shifts on one day overlapping [start, end), for patching just those timetable cells
+        rows = self.query(
+            "SELECT id, worker_id, day, start_minute, end_minute FROM shifts "
+            "WHERE week_key = ? AND day = ? AND start_minute < ? AND end_minute > ?", (week_key, day, end, start))
+        return [Shift(*row) for row in rows]
+
+    def add_shift(self, week_key, day, worker_id, start, end):
+        with self.transaction() as conn:
+            events = []
+            shift = self._insert_shift(conn, week_key, day, worker_id, start, end, events)
+            self.history.record(conn, 'shift', events)
+            # A merge only ever widens the new shift, so its interval covers every slot the write touched
+            self._bump_timetable_version(conn, week_key, [(day, shift.start, shift.end)])
+            return shift
+
+    def add_shifts(self, shifts):
+        # Bulk version of add_shift for (week_key, day, worker_id, start, end) rows
+        weeks = set()
+        events = []
+        with self.transaction() as conn:
+            for week_key, day, worker_id, start, end in shifts:
+                self._insert_shift(conn, week_key, day, worker_id, start, end, events)
+                weeks.add(week_key)
+            self.history.record(conn, 'shift', events)
+            for week_key in weeks:
+                self._bump_timetable_version(conn, week_key)
+
+    @staticmethod
+    def _insert_shift(conn, week_key, day, worker_id, start, end, events):
+        # Overlapping or touching shifts of the same worker are merged, so hours are never double counted;
+        # the history events for the change are appended to `events`
+        touching = conn.execute(
+            "SELECT id, start_minute, end_minute FROM shifts WHERE week_key = ? AND day = ? AND worker_id = ? "
+            "AND start_minute <= ? AND end_minute >= ?", (week_key, day, worker_id, end, start)).fetchall()
+        if touching:
+            start = min([start] + [r['start_minute'] for r in touching])
+            end = max([end] + [r['end_minute'] for r in touching])
+            conn.executemany("DELETE FROM shifts WHERE id = ?", [(r['id'],) for r in touching])
+            events.extend((week_key, r['id'], 'deleted', None) for r in touching)
+        cur = conn.execute(
+            "INSERT INTO shifts (week_key, day, worker_id, start_minute, end_minute) VALUES (?, ?, ?, ?, ?)",
+            (week_key, day, worker_id, start, end))
+        events.append((week_key, cur.lastrowid, 'created', shift_event_data(day, worker_id, start, end)))
+        return Shift(cur.lastrowid, worker_id, day, start, end)
+
+    def replace_week_shifts(self, week_key, shifts):
+        # Swap a whole week's roster (e.g. a generated one) in a single transaction
+        with self.transaction() as conn:
+            old_ids = [r['id'] for r in conn.execute("SELECT id FROM shifts WHERE week_key = ?", (week_key,))]
+            conn.execute("DELETE FROM shifts WHERE week_key = ?", (week_key,))
+            events = [(week_key, shift_id, 'deleted', None) for shift_id in old_ids]
+            for s in shifts:
+                cur = conn.execute(
+                    "INSERT INTO shifts (week_key, day, worker_id, start_minute, end_minute) VALUES (?, ?, ?, ?, ?)",
+                    (week_key, s.day, s.worker_id, s.start, s.end))
+                events.append((week_key, cur.lastrowid, 'created', shift_event_data(s.day, s.worker_id, s.start, s.end)))
+            self.history.record(conn, 'shift', events)
+            self._bump_timetable_version(conn, week_key)
+
+    @classmethod
+    def _bump_timetable_version(cls, conn, week_key, cells=None):
+        # `cells` are the (day, start, end) intervals written, when the change is narrower than the week
+        conn.execute(
+            "INSERT INTO timetable_versions (week_key, version) VALUES (?, 1) "
+            "ON CONFLICT (week_key) DO UPDATE SET version = version + 1", (week_key,))
+        if cells:
+            cls.record_changes(conn, 'timetable', [timetable_change_key(week_key, *cell) for cell in cells])
+        else:
+            cls.record_change(conn, 'timetable', week_key)
+
+    def timetable_version(self, week_key):
+        # Bumped by every assignment so rendered grids know when to refresh
+        rows = self.query("SELECT version FROM timetable_versions WHERE week_key = ?", (week_key,))
+        return rows[0][0] if rows else 0
+
+    # Shop jobs
+    def get_shop_jobs(self):
+        jobs = {day: {} for day in DAYS}
+        for row in self.query("SELECT day, period, job FROM shop_jobs ORDER BY day, period, position"):
+            jobs.setdefault(row['day'], {}).setdefault(row['period'], []).append(row['job'])
+        return {day: {p: periods[p] for p in sorted(periods, key=_period_order)} for day, periods in jobs.items()}
+
+    def add_shop_job(self, day, period, job, description=None):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO shop_jobs (day, period, position, job) "
+                "SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ? FROM shop_jobs WHERE day = ? AND period = ?",
+                (day, period, job, day, period))
+            if description is not None:
+                conn.execute(UPSERT_JOB_DESCRIPTION, (job, description))
+            self.record_change(conn, 'shop_jobs', day)
+
+    def remove_shop_job(self, day, period, job):
+        # Mirrors list.remove(): only the first occurrence goes
+        with self.transaction() as conn:
+            conn.execute(
+                "DELETE FROM shop_jobs WHERE day = ? AND period = ? AND position = "
+                "(SELECT MIN(position) FROM shop_jobs WHERE day = ? AND period = ? AND job = ?)",
+                (day, period, day, period, job))
+            self.record_change(conn, 'shop_jobs', day)
+
+    def get_job_descriptions(self):
+        return {r['job']: r['description'] for r in self.query("SELECT job, description FROM job_descriptions ORDER BY rowid")}
+
+    def count_job_descriptions(self):
+        return self.query("SELECT COUNT(*) FROM job_descriptions")[0][0]
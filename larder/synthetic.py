@@ -0,0 +1,102 @@
+# Synthetic shop data at chosen scales, for benchmarks and load testing
+import random
+from datetime import datetime, timedelta
+
+from larder.orders import ORDER_PRIORITIES, Order, OrderItem, format_order_id
+from larder.roster import JOB_SKILLS, PERIOD_WINDOWS
+from larder.seed import SEED_PRODUCTS
+from larder.timetable import DAYS, week_key_for
+
+FIRST_NAMES = ['Ailsa', 'Callum', 'Eilidh', 'Fraser', 'Isla', 'Hamish', 'Kirsty', 'Lachlan', 'Morag', 'Rory',
+               'Shona', 'Struan', 'Catriona', 'Euan', 'Fiona', 'Iain', 'Mhairi', 'Ruaridh', 'Skye', 'Torquil']
+LAST_NAMES = ['MacDonald', 'Campbell', 'Stewart', 'Robertson', 'Murray', 'Fraser', 'MacKenzie', 'Ross',
+              'Sinclair', 'Munro', 'Grant', 'MacLean', 'Gordon', 'Douglas', 'Buchanan', 'Cameron']
+POSITIONS = ['Butcher', 'Shop Assistant', 'Apprentice', 'Manager']
+CUSTOMER_KINDS = ['Hotel', 'Cafe', 'Restaurant', 'Deli', 'Bistro', 'Inn', 'Catering']
+PLACES = ['Highland', 'Loch', 'Glen', 'River', 'Harbour', 'Castle', 'Abbey', 'Station', 'Market', 'Bridge',
+          'Thistle', 'Heather', 'Granite', 'Kelpie', 'Bothy', 'Firth']
+SKILLS = sorted({skill for skills in JOB_SKILLS.values() for skill in skills})
+
+# Status mix for orders already past their due date, and for orders still to come
+PAST_STATUSES = (['Completed'] * 17, ['Cancelled'] * 2, ['In Progress'])
+FUTURE_STATUSES = (['Pending'] * 6, ['In Progress'] * 3, ['Cancelled'])
+
+
+def _weighted(rng, buckets):
+    return rng.choice([choice for bucket in buckets for choice in bucket])
+
+
+def make_workers(count, seed=0):
+    rng = random.Random(seed)
+    workers = []
+    for i in range(count):
+        days = sorted(rng.sample(DAYS, rng.randint(3, 6)), key=DAYS.index)
+        workers.append({
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i + 1}",
+            'position': rng.choice(POSITIONS),
+            'availability': days,
+            'unavailable_dates': [],
+            'hours_per_week': rng.choice([16, 20, 25, 30, 35, 40]),
+            'skills': rng.sample(SKILLS, rng.randint(1, 4)),
+            'color': f"#{rng.randrange(0x1000000):06X}",
+        })
+    return workers
+
+
+def make_customers(count, seed=0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        suffix = f" {len(names) // 100 + 1}" if len(names) >= 100 else ""
+        names.add(f"{rng.choice(PLACES)} {rng.choice(CUSTOMER_KINDS)}{suffix}")
+    return sorted(names)
+
+
+def make_orders(count, today=None, history_days=365, ahead_days=28, customers=None, seed=0, first_number=1):
+    """Orders spread evenly from `history_days` ago to `ahead_days` ahead.
+
+    Past orders are mostly completed, future ones pending or in progress,
+    each with one to four catalogue items (plus the odd off-list product).
+    """
+    rng = random.Random(seed)
+    today = today or datetime.now().replace(microsecond=0)
+    customers = customers or make_customers(max(10, min(count // 25, 1500)), seed)
+    products = [(p['display_name'], 'each' if p['price_unit'] == 'each' else 'kg') for p in SEED_PRODUCTS]
+    products.append(('Black Pudding', 'kg'))
+    span = (history_days + ahead_days) * 24 * 60
+    orders = []
+    for i in range(count):
+        due = today - timedelta(days=history_days) + timedelta(minutes=span * i // max(count, 1))
+        due = due.replace(minute=due.minute - due.minute % 15, second=0)
+        items = tuple(OrderItem(name, rng.randint(1, 12) if unit == 'each' else round(rng.uniform(0.5, 20), 1), unit)
+                      for name, unit in rng.sample(products, rng.randint(1, 4)))
+        orders.append(Order(
+            order_id=format_order_id(first_number + i),
+            customer_name=rng.choice(customers),
+            customer_contact=f"07{rng.randrange(10 ** 9):09d}",
+            customer_email='',
+            total_price=round(sum(item.quantity for item in items) * rng.uniform(8, 20), 2),
+            due_date=due,
+            status=_weighted(rng, PAST_STATUSES if due < today else FUTURE_STATUSES),
+            priority=rng.choice(ORDER_PRIORITIES),
+            notes='',
+            created_date=due - timedelta(days=rng.randint(1, 14)),
+            items=items,
+        ))
+    return orders
+
+
+def make_shifts(worker_ids, availability, first_week, weeks, seed=0):
+    # (week_key, day, worker_id, start, end) rows: each worker takes one or two periods on most available days
+    rng = random.Random(seed)
+    periods = list(PERIOD_WINDOWS.values())
+    rows = []
+    for week in range(weeks):
+        week_key = week_key_for(first_week + timedelta(days=7 * week))
+        for worker_id in worker_ids:
+            for day in availability[worker_id]:
+                if rng.random() < 0.8:
+                    first = rng.randrange(len(periods))
+                    last = min(len(periods) - 1, first + rng.randint(0, 1))
+                    rows.append((week_key, day, worker_id, periods[first][0], periods[last][1]))
+    return rows
@@ -0,0 +1,166 @@
+# Weekly timetable grid, rendered to HTML and cached per week
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PERIODS = ['morning', 'afternoon', 'evening']
+
+
+# Helper function to create time slots
+def create_time_slots():
+    times = []
+    for hour in range(6, 23):  # 6 AM to 10 PM
+        for minute in [0, 30]:
+            time_str = f"{hour:02d}:{minute:02d}"
+            times.append(time_str)
+    return times
+
+
+TIME_SLOTS = create_time_slots()
+SLOT_START_MINUTES = [int(slot[:2]) * 60 + int(slot[3:]) for slot in TIME_SLOTS]
+
+
+def week_key_for(start_of_week):
+    return start_of_week.strftime('%Y-%W')
+
+
+def timetable_change_key(week_key, day=None, start=None, end=None):
+    # Change-feed key for a roster write: the week, narrowed to one day's [start, end) minutes when known
+    return week_key if day is None else f"{week_key}/{day}/{start}/{end}"
+
+
+def parse_timetable_change(key):
+    # (week_key, day, start, end); day and minutes are None for a change to the whole week
+    week_key, *cell = key.split('/')
+    return (week_key, cell[0], int(cell[1]), int(cell[2])) if cell else (week_key, None, None, None)
+
+
+class WeekGrid:
+    """Rendered HTML for one week, one string per cell and per row.
+
+    Mirrors the markup of DataFrame.to_html(escape=False, index=False) so
+    the page looks the same, but a changed cell only rebuilds itself and
+    rejoins its row.
+    """
+
+    def __init__(self, start_of_week, week, registry):
+        self.registry = registry
+        self.header = self._render_header(start_of_week)
+        self.assigned = [[tuple(week.get(day, {}).get(slot, ())) for day in DAYS] for slot in TIME_SLOTS]
+        self.cells = [[self._render_cell(worker_ids) for worker_ids in row] for row in self.assigned]
+        self.rows = [self._render_row(i) for i in range(len(TIME_SLOTS))]
+        self.seq = None
+        self._html = None
+
+    @staticmethod
+    def _render_header(start_of_week):
+        cells = ['      <th>Time</th>']
+        for i, day in enumerate(DAYS):
+            cells.append(f"      <th>{day} {(start_of_week + timedelta(days=i)).strftime('%d/%m')}</th>")
+        return '  <thead>\n    <tr style="text-align: right;">\n' + '\n'.join(cells) + '\n    </tr>\n  </thead>\n'
+
+    def _render_cell(self, worker_ids):
+        return f"      <td>{''.join(self.registry.block_html(w) for w in worker_ids)}</td>"
+
+    def _render_row(self, slot_idx):
+        return '    <tr>\n' + f'      <td>{TIME_SLOTS[slot_idx]}</td>\n' + '\n'.join(self.cells[slot_idx]) + '\n    </tr>'
+
+    def _set_cell(self, slot_idx, day_idx, worker_ids):
+        if self.assigned[slot_idx][day_idx] == worker_ids:
+            return False
+        self.assigned[slot_idx][day_idx] = worker_ids
+        self.cells[slot_idx][day_idx] = self._render_cell(worker_ids)
+        return True
+
+    def update(self, week):
+        # Whole-week patch from a slot_map(): re-render the cells whose worker lists changed; returns how many
+        changed_rows = set()
+        for slot_idx, slot in enumerate(TIME_SLOTS):
+            for day_idx, day in enumerate(DAYS):
+                if self._set_cell(slot_idx, day_idx, tuple(week.get(day, {}).get(slot, ()))):
+                    changed_rows.add(slot_idx)
+        return self._rejoin(changed_rows)
+
+    def update_cells(self, day, start, end, shifts):
+        # Patch one day's slots in [start, end) from the shifts overlapping it; returns cells changed
+        day_idx = DAYS.index(day)
+        changed_rows = set()
+        for slot_idx, minute in enumerate(SLOT_START_MINUTES):
+            if start <= minute < end:
+                # Assignment order, as slot_map() gives it
+                on_shift = sorted((s for s in shifts if s.start <= minute < s.end), key=lambda s: s.shift_id)
+                if self._set_cell(slot_idx, day_idx, tuple(dict.fromkeys(s.worker_id for s in on_shift))):
+                    changed_rows.add(slot_idx)
+        return self._rejoin(changed_rows)
+
+    def _rejoin(self, slot_indexes):
+        for slot_idx in slot_indexes:
+            self.rows[slot_idx] = self._render_row(slot_idx)
+        if slot_indexes:
+            self._html = None
+        return len(slot_indexes)
+
+    def html(self):
+        if self._html is None:
+            self._html = ('<table border="1" class="dataframe">\n' + self.header +
+                          '  <tbody>\n' + '\n'.join(self.rows) + '\n  </tbody>\n</table>')
+        return self._html
+
+
+class TimetableRenderer:
+    """Process-wide cache of rendered week grids.
+
+    Each grid remembers the timetable feed position it was drawn at. A rerun
+    with nothing new on the feed reuses the HTML. A single-shift write is
+    keyed by its day and minutes, so only the shifts overlapping those slots
+    are queried and only those cells re-rendered; a whole-week write (bulk
+    import, generated roster) or a trimmed feed re-fetches the week and
+    patches what changed. A new worker registry (worker added or removed)
+    forces a full rebuild of that week.
+    """
+
+    def __init__(self, store, max_weeks=52):
+        self.store = store
+        self.max_weeks = max_weeks
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _changed_cells(self, week_key, since):
+        # [(day, start, end)] written in `week_key` since `since`, or None if the whole week must be re-read
+        changes = self.store.changes_since(since, topic='timetable')
+        if changes is None:
+            return None
+        cells = []
+        for _, _, key in changes:
+            changed_week, day, start, end = parse_timetable_change(key)
+            if changed_week != week_key:
+                continue
+            if day is None:
+                return None
+            cells.append((day, start, end))
+        return cells
+
+    def render(self, start_of_week):
+        week_key = week_key_for(start_of_week)
+        # Read before the shifts, so a write landing in between is applied again next time rather than missed
+        seq = self.store.change_seq('timetable')
+        registry = self.store.worker_registry()
+        with self._lock:
+            grid = self._grids.get(week_key)
+            if grid is not None and grid.registry is registry:
+                if grid.seq != seq:
+                    cells = self._changed_cells(week_key, grid.seq)
+                    if cells is None:
+                        grid.update(self.store.get_week_shifts(week_key).slot_map())
+                    else:
+                        for day, start, end in cells:
+                            grid.update_cells(day, start, end, self.store.get_day_shifts(week_key, day, start, end))
+            else:
+                grid = WeekGrid(start_of_week, self.store.get_week_shifts(week_key).slot_map(), registry)
+            grid.seq = seq
+            self._grids[week_key] = grid
+            self._grids.move_to_end(week_key)
+            while len(self._grids) > self.max_weeks:
+                self._grids.popitem(last=False)
+            return grid.html()
@@ -0,0 +1,188 @@
+# Roster validation: availability, weekly hours and shop-job coverage
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+from larder.roster import CLOSED_JOBS, PERIOD_WINDOWS, is_available, is_qualified
+from larder.timetable import DAYS, PERIODS, week_key_for
+
+Violation = namedtuple('Violation', ['kind', 'worker_id', 'day', 'message'])
+WeekReport = namedtuple('WeekReport', ['week_key', 'violations', 'gaps', 'hours'])
+
+
+def week_start_from_key(week_key):
+    # Inverse of week_key_for(): '%Y-%W' plus Monday
+    return datetime.strptime(f"{week_key}-1", '%Y-%W-%w').date()
+
+
+def shift_periods(shift):
+    return [p for p in PERIODS if shift.start < PERIOD_WINDOWS[p][1] and shift.end > PERIOD_WINDOWS[p][0]]
+
+
+class RosterValidator:
+    """Running tallies for one week's roster.
+
+    Per-worker hour counters and per-(day, period, job) counts of qualified
+    workers on shift are adjusted by add_shift/remove_shift, so a change is
+    rechecked in time proportional to the shift, not the week.
+    """
+
+    def __init__(self, workers, shop_jobs, start_of_week):
+        self.workers = {w.id: w for w in workers}
+        self.shop_jobs = shop_jobs
+        self.start_of_week = start_of_week
+        self.dates = {day: start_of_week + timedelta(days=i) for i, day in enumerate(DAYS)}
+        self.hours = {worker_id: 0.0 for worker_id in self.workers}
+        self.coverage = {}
+        for day in DAYS:
+            for period in PERIODS:
+                for job in shop_jobs.get(day, {}).get(period, []):
+                    if job not in CLOSED_JOBS and period in PERIOD_WINDOWS:
+                        self.coverage[(day, period, job)] = 0
+        self.gaps = set(self.coverage)
+        self.shifts = {}
+        self.shift_violations = {}
+
+    def _worker_name(self, worker_id):
+        worker = self.workers.get(worker_id)
+        return worker.name if worker else f"Worker {worker_id}"
+
+    def check_shift(self, shift):
+        # Violations this shift would cause on its own (availability and the hours cap)
+        found = []
+        worker = self.workers.get(shift.worker_id)
+        name = self._worker_name(shift.worker_id)
+        if worker is None:
+            return [Violation('unknown_worker', shift.worker_id, shift.day, f"{name} is no longer on the staff list")]
+        if shift.day not in worker.availability:
+            found.append(Violation('unavailable_day', shift.worker_id, shift.day,
+                                   f"{name} is not available on {shift.day}s"))
+        elif not is_available(worker, shift.day, self.dates[shift.day]):
+            found.append(Violation('unavailable_date', shift.worker_id, shift.day,
+                                   f"{name} is unavailable on {self.dates[shift.day].strftime('%d/%m/%Y')}"))
+        existing = self.shifts.get(shift.shift_id)
+        hours = self.hours.get(shift.worker_id, 0.0) - (self._shift_hours(existing) if existing else 0.0)
+        if hours + self._shift_hours(shift) > worker.hours_per_week:
+            found.append(Violation('over_hours', shift.worker_id, shift.day,
+                                   f"{name} would work {hours + self._shift_hours(shift):g}h, over their "
+                                   f"{worker.hours_per_week}h per week"))
+        return found
+
+    @staticmethod
+    def _shift_hours(shift):
+        return (shift.end - shift.start) / 60
+
+    def _tally(self, shift, step):
+        worker = self.workers.get(shift.worker_id)
+        if worker is None:
+            return
+        for period in shift_periods(shift):
+            for job in self.shop_jobs.get(shift.day, {}).get(period, []):
+                key = (shift.day, period, job)
+                if key in self.coverage and is_qualified(worker, job):
+                    self.coverage[key] += step
+                    if self.coverage[key]:
+                        self.gaps.discard(key)
+                    else:
+                        self.gaps.add(key)
+
+    def add_shift(self, shift):
+        if shift.shift_id in self.shifts:
+            self.remove_shift(shift.shift_id)
+        self.shifts[shift.shift_id] = shift
+        self.hours[shift.worker_id] = self.hours.get(shift.worker_id, 0.0) + self._shift_hours(shift)
+        self._tally(shift, 1)
+        self.shift_violations[shift.shift_id] = [
+            v for v in self.check_shift(shift) if v.kind != 'over_hours']
+
+    def remove_shift(self, shift_id):
+        shift = self.shifts.pop(shift_id, None)
+        if shift is None:
+            return
+        self.hours[shift.worker_id] -= self._shift_hours(shift)
+        self._tally(shift, -1)
+        self.shift_violations.pop(shift_id, None)
+
+    def sync(self, week_shifts):
+        # Apply only the difference between the tallied shifts and the stored week
+        current = {s.shift_id: s for s in week_shifts}
+        for shift_id in [i for i in self.shifts if i not in current]:
+            self.remove_shift(shift_id)
+        for shift_id, shift in current.items():
+            if self.shifts.get(shift_id) != shift:
+                self.add_shift(shift)
+
+    def violations(self):
+        found = [v for shift_violations in self.shift_violations.values() for v in shift_violations]
+        for worker_id, hours in self.hours.items():
+            worker = self.workers.get(worker_id)
+            if worker and hours > worker.hours_per_week:
+                found.append(Violation('over_hours', worker_id, None,
+                                       f"{worker.name} is rostered {hours:g}h, over their "
+                                       f"{worker.hours_per_week}h per week"))
+        return found
+
+    def coverage_gaps(self):
+        order = {day: i for i, day in enumerate(DAYS)}
+        return sorted(self.gaps, key=lambda g: (order[g[0]], PERIODS.index(g[1]), g[2]))
+
+    def report(self, week_key):
+        return WeekReport(week_key, self.violations(), self.coverage_gaps(), dict(self.hours))
+
+
+class RosterChecks:
+    """Process-wide validators, one per week, kept in step with the store.
+
+    Like the grid renderer, a validator is only touched when its week's
+    timetable version moves, and then only by the shifts that changed; a new
+    worker registry or edited shop jobs start it afresh. Shop jobs are read
+    again only when their change-feed position moves, and the least recently
+    checked weeks are dropped past `max_weeks`.
+    """
+
+    def __init__(self, store, max_weeks=52):
+        self.store = store
+        self.max_weeks = max_weeks
+        self._validators = OrderedDict()
+        self._shop_jobs = None
+        self._shop_jobs_seq = None
+        self._lock = threading.Lock()
+
+    def _current_shop_jobs(self):
+        seq = self.store.change_seq('shop_jobs')
+        if self._shop_jobs_seq != seq:
+            self._shop_jobs, self._shop_jobs_seq = self.store.get_shop_jobs(), seq
+        return self._shop_jobs
+
+    def for_week(self, start_of_week):
+        week_key = week_key_for(start_of_week)
+        version = self.store.timetable_version(week_key)
+        registry = self.store.worker_registry()
+        with self._lock:
+            shop_jobs = self._current_shop_jobs()
+            cached = self._validators.get(week_key)
+            if cached and cached[1] is registry and cached[0].shop_jobs is shop_jobs:
+                validator, _, cached_version = cached
+                if cached_version == version:
+                    self._validators.move_to_end(week_key)
+                    return validator
+            else:
+                validator = RosterValidator(registry.workers, shop_jobs, start_of_week)
+            validator.sync(self.store.get_week_shifts(week_key))
+            self._validators[week_key] = (validator, registry, version)
+            self._validators.move_to_end(week_key)
+            while len(self._validators) > self.max_weeks:
+                self._validators.popitem(last=False)
+            return validator
+
+
+def validate_weeks(store, week_keys):
+    # Batch check, e.g. the next few weeks or a whole year of rosters
+    registry = store.worker_registry()
+    shop_jobs = store.get_shop_jobs()
+    reports = []
+    for week_key in week_keys:
+        validator = RosterValidator(registry.workers, shop_jobs, week_start_from_key(week_key))
+        validator.sync(store.get_week_shifts(week_key))
+        reports.append(validator.report(week_key))
+    return reports
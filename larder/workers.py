@@ -0,0 +1,75 @@
+# Worker records and the registry: id-keyed lookups with the timetable markup precomputed
+import html
+from collections import namedtuple
+
+UNKNOWN_COLOR = '#CCCCCC'
+BLOCK_STYLE = "color: white; padding: 2px 6px; margin: 1px; border-radius: 3px; font-size: 0.8em;"
+
+
+def worker_initials(name):
+    return ''.join(part[0] for part in name.split())
+
+
+def worker_block_html(name, initials, color):
+    return (f'<span style="background-color: {color}; {BLOCK_STYLE}" '
+            f'title="{html.escape(name)}">{html.escape(initials)}</span>')
+
+
+UNKNOWN_BLOCK_HTML = worker_block_html("Unknown", "?", UNKNOWN_COLOR)
+
+
+class Worker(namedtuple('Worker', ['id', 'name', 'position', 'availability', 'unavailable_dates', 'hours_per_week',
+                                   'skills', 'color'])):
+    """One member of staff, read-only; the day and skill lists are tuples.
+
+    The registry hands the same records to every session, so nothing a page
+    does to one can leak into another.
+    """
+
+    __slots__ = ()
+
+
+class WorkerEntry:
+    __slots__ = ('worker', 'initials', 'color', 'label', 'block_html')
+
+    def __init__(self, worker):
+        self.worker = worker
+        self.initials = worker_initials(worker.name)
+        self.color = worker.color or UNKNOWN_COLOR
+        self.label = f"{worker.name} ({worker.position})"
+        self.block_html = worker_block_html(worker.name, self.initials, self.color)
+
+
+class WorkerRegistry:
+    """Workers keyed by id, built once from the store.
+
+    The store drops its registry whenever a worker is added or removed, so the
+    timetable renderer gets O(1) lookups without rescanning the worker list.
+    """
+
+    def __init__(self, workers):
+        self._entries = {w.id: WorkerEntry(w) for w in workers}
+        self.workers = list(workers)
+        self.ids = list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, worker_id):
+        entry = self._entries.get(worker_id)
+        return entry.worker if entry else None
+
+    def entry(self, worker_id):
+        return self._entries.get(worker_id)
+
+    def color(self, worker_id):
+        entry = self._entries.get(worker_id)
+        return entry.color if entry else UNKNOWN_COLOR
+
+    def label(self, worker_id):
+        entry = self._entries.get(worker_id)
+        return entry.label if entry else "Unknown"
+
+    def block_html(self, worker_id):
+        entry = self._entries.get(worker_id)
+        return entry.block_html if entry else UNKNOWN_BLOCK_HTML